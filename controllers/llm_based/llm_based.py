@@ -1,12 +1,22 @@
-from controller import Supervisor, Robot
-from openai import OpenAI
+from controller import Supervisor, Robot, Node
 import os
-import time
+import sys
 import dotenv
 import json
 import threading
 from queue import Queue
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "libraries", "python"))
+from step_scheduler import StepScheduler
+from action_executor import ActionExecutor, StepAction, ParallelAction
+from llm_backend import create_backend, tools_from_functions, freeze_tools, minify_tools, ResilientBackend, CircuitOpen, DeadlineExceeded
+from conversation import Conversation
+from intent_parser import IntentParser
+from planner_worker import PlannerWorker
+from request_intake import RequestIntake
+from reactive_steering import ReactiveSteering, parse_angles
+from stage_metrics import create_metrics, format_summary
+
 
 # ---------------- 이동 제어 함수들 ----------------
 
@@ -40,6 +50,20 @@ def move_right(left_wheel, right_wheel, speed=1.0):
     left_wheel.setVelocity(speed)
     right_wheel.setVelocity(-speed)
 
+def steer(speed):
+    """전진 중 매 스텝: 모든 거리 센서로 바퀴 속도를 조정 (바뀐 값만 쓴다)"""
+    global wheels
+    left, right = steering.command(speed)
+    if wheels is not None and abs(left - wheels[0]) < 0.01 and abs(right - wheels[1]) < 0.01:
+        return
+    left_wheel.setVelocity(left)
+    right_wheel.setVelocity(right)
+    wheels = (left, right)
+
+def set_led(led, on):
+    if led is not None:
+        led.set(1 if on else 0)
+
 
 # ---------------- 유틸 ----------------
 
@@ -50,54 +74,104 @@ def html_format(message: str) -> str:
     return msg
 
 
-# ---------------- 명령 큐 / 실행 스레드 ----------------
+# ---------------- 명령 큐 / 실행기 ----------------
 
+# LLM 처리 결과 → 메인 루프 전달용 큐. 실행은 메인 루프의 executor 가 매 스텝 tick 으로 진행한다.
 command_queue = Queue()
-is_executing = False
 
+WHEEL_MOVES = {
+    "forward": move_forward,
+    "backward": move_backward,
+    "left": move_left,
+    "right": move_right,
+}
 
-def execute_command_queue():
-    """큐에 쌓인 로봇 동작 명령을 순차적으로 실행"""
-    global is_executing
-    while True:
-        if not command_queue.empty():
-            is_executing = True
-            command = command_queue.get()
+# 동작별 장치. 서로 다른 장치를 쓰는 동작만 with_previous 로 동시에 실행할 수 있다
+LED_COMMANDS = {"led_on": True, "led_off": False}
 
-            try:
-                cmd = command["direction"]
-                speed = command.get("speed", 1.0)
-                duration = command.get("duration", 1.0)
-
-                print(f"명령 실행: {cmd}, 속도: {speed}, 지속시간: {duration}초")
-
-                if cmd == "forward":
-                    move_forward(left_wheel, right_wheel, speed)
-                elif cmd == "backward":
-                    move_backward(left_wheel, right_wheel, speed)
-                elif cmd == "left":
-                    move_left(left_wheel, right_wheel, speed)
-                elif cmd == "right":
-                    move_right(left_wheel, right_wheel, speed)
-                elif cmd == "stop":
-                    move_stop(left_wheel, right_wheel)
-
-                # stop은 즉시 멈추는 명령이라 지속시간 없이 끝나도 됨
-                if cmd != "stop":
-                    steps_to_run = int(duration * 1000 / robot.getBasicTimeStep())
-                    for _ in range(steps_to_run):
-                        robot.step(timestep)
-                    move_stop(left_wheel, right_wheel)
-
-            except Exception as e:
-                print(f"명령 실행 중 오류 발생: {e}")
-                move_stop(left_wheel, right_wheel)
-
-            finally:
-                command_queue.task_done()
-                is_executing = False
-        else:
-            time.sleep(0.1)  # 큐가 비어 있으면 잠깐 쉼
+
+def device_of(command):
+    return "led" if command.get("direction") in LED_COMMANDS else "wheels"
+
+
+def group_actions(actions):
+    """with_previous=true 인 동작을 바로 앞 동작과 한 그룹({"group": [...]})으로 묶는다.
+    같은 장치를 쓰는 동작이 겹치면 묶지 않고 순서대로 실행한다"""
+    out = []
+    for action in actions:
+        prev = out[-1] if out else None
+        if action.get("with_previous") and prev is not None:
+            members = prev.get("group", [prev])
+            if device_of(action) not in {device_of(m) for m in members}:
+                out[-1] = {"group": members + [action]}
+                continue
+            print(f"같은 장치를 쓰는 동작은 동시에 실행할 수 없어 순서대로 실행: {action}")
+        out.append(action)
+    return out
+
+
+def build_wheel_action(command):
+    """큐의 바퀴 명령 dict → Action (robot.step 은 메인 루프에서만 호출)"""
+    if "group" in command:
+        return ParallelAction([build_wheel_action(c) for c in command["group"]])
+
+    cmd = command["direction"]
+    speed = command.get("speed", 1.0)
+    duration = command.get("duration", 1.0)
+
+    print(f"명령 실행: {cmd}, 속도: {speed}, 지속시간: {duration}초")
+
+    # stop은 즉시 멈추는 명령이라 지속시간 없이 끝나도 됨
+    if cmd == "stop":
+        return StepAction(0, lambda: move_stop(left_wheel, right_wheel), name="stop")
+
+    # LED 는 상태만 바꾸고 바로 끝남 (같은 그룹의 바퀴 동작이 그룹 길이를 정한다)
+    if cmd in LED_COMMANDS:
+        return StepAction(0, lambda: set_led(led, LED_COMMANDS[cmd]), name=cmd)
+
+    move = WHEEL_MOVES.get(cmd)
+    if move is None:
+        print(f"알 수 없는 방향: {cmd}")
+        return None
+    def start():
+        global wheels
+        move(left_wheel, right_wheel, speed)
+        wheels = (speed, speed) if cmd == "forward" else None
+
+    # 전진은 유지하는 동안 반응형 조향으로 장애물을 비켜 간다
+    return StepAction(
+        scheduler.steps_for(duration),
+        start,
+        lambda: move_stop(left_wheel, right_wheel),
+        name=cmd,
+        on_tick=(lambda: steer(speed)) if steering is not None and cmd == "forward" else None,
+    )
+
+
+# ---------------- 우선 명령 (stop / 비상 정지) ----------------
+
+# 이 발화는 LLM 을 거치지 않고 메인 루프에서 바로 현재 동작을 취소하고 큐를 비운다.
+PRIORITY_WORDS = {
+    "stop", "halt", "emergency", "estop", "e-stop",
+    "정지", "멈춰", "멈춰줘", "그만", "비상", "비상정지", "비상 정지", "긴급 정지", "긴급정지",
+}
+STOP_COMMAND = {"direction": "stop"}
+
+
+def is_priority(message: str) -> bool:
+    return message.strip().lower().rstrip("!.? ") in PRIORITY_WORDS
+
+
+def preempt_stop():
+    """현재 동작 취소 + 큐 비우기 + 즉시 정지. 다음 robot.step 에 바로 반영된다"""
+    flushed = executor.preempt(dict(STOP_COMMAND))
+    print(f"즉시 정지: 취소된 대기 동작 {flushed}개")
+    return flushed
+
+
+def status_text():
+    st = executor.status()
+    return f"현재 큐 크기: {st['depth']}, 실행 중: {st['current'] or '없음'}"
 
 
 # ---------------- Function Calling 사양 ----------------
@@ -116,8 +190,8 @@ functions = [
                         "properties": {
                             "direction": {
                                 "type": "string",
-                                "enum": ["forward", "backward", "left", "right", "stop"],
-                                "description": "이동 방향"
+                                "enum": ["forward", "backward", "left", "right", "stop", "led_on", "led_off"],
+                                "description": "이동 방향 (led_on/led_off 는 LED 켜기/끄기)"
                             },
                             "speed": {
                                 "type": "number",
@@ -132,6 +206,10 @@ functions = [
                                 "maximum": 10.0,
                                 "default": 1.0,
                                 "description": "이동 지속시간 (초)"
+                            },
+                            "with_previous": {
+                                "type": "boolean",
+                                "description": "true 면 바로 앞 동작과 동시에 실행 (바퀴와 LED 처럼 서로 다른 장치일 때만)"
                             }
                         },
                         "required": ["direction"]
@@ -145,19 +223,40 @@ functions = [
 ]
 
 
+# chat completions tools 형식 (백엔드 공통). 불필요한 키를 빼고 한 번만 직렬화해 두고 재사용
+TOOLS = freeze_tools(minify_tools(tools_from_functions(functions)))
+
+# 시스템 프롬프트는 고정 문자열 하나 → 요청 앞부분(tools + system)이 매번 바이트 단위로 같다
+SYSTEM_PROMPT = (
+    "너는 로봇 제어 시스템의 AI Agent야.\n"
+    "사용자의 자연어 명령을 받아서 move_robot 함수를 호출하여 로봇을 제어해.\n\n"
+    "move_robot 함수는 actions 배열을 받아.\n"
+    "\"앞으로 가줘\" → actions: [{\"direction\": \"forward\"}]\n"
+    "\"앞으로 가다가 왼쪽으로 회전해줘\" → "
+    "actions: [{\"direction\": \"forward\"}, {\"direction\": \"left\"}]\n"
+    "\"뒤로 천천히 가줘\" → "
+    "actions: [{\"direction\": \"backward\", \"speed\": 0.5}]\n"
+    "\"불 켜고 앞으로 가줘\" → "
+    "actions: [{\"direction\": \"forward\"}, {\"direction\": \"led_on\", \"with_previous\": true}]\n\n"
+    "\"다시 해줘\", \"더 빠르게\" 처럼 이전 명령을 가리키면 앞선 대화의 move_robot 호출을 참고해.\n"
+    "로봇에 대한 이동 명령이 있으면 반드시 move_robot 함수를 호출해."
+)
+
+
 def process_function_call(function_name, arguments):
     """LLM이 호출한 함수 내용(arguments)을 실제 큐에 반영"""
     try:
         if function_name == "move_robot":
             actions = arguments.get("actions", [])
-            for action in actions:
+            # 첫 동작이 stop 이면 지금 하던 일을 멈추라는 뜻: 대기 중인 동작보다 먼저 선점
+            if actions and actions[0].get("direction") == "stop" and not actions[0].get("with_previous"):
+                preempt_stop()
+                actions = actions[1:]
+            for action in group_actions(actions):
                 command_queue.put(action)
                 print(f"동작 명령 추가: {action}")
 
-            return (
-                f"명령이 큐에 추가되었습니다. 총 {len(actions)}개 동작, "
-                f"현재 큐 크기: {command_queue.qsize()}"
-            )
+            return f"명령이 큐에 추가되었습니다. 총 {len(actions)}개 동작, {status_text()}"
 
         return "알 수 없는 함수 호출이 요청되었습니다."
 
@@ -168,81 +267,145 @@ def process_function_call(function_name, arguments):
 
 # ---------------- LLM 호출 래퍼 ----------------
 
-def handle_llm_function_calling(user_message):
-    """사용자 자연어 명령 → LLM → Function Calling → 큐 적재"""
-    if client is None:
-        print("OpenAI 클라이언트가 없습니다.")
-        return "OpenAI 클라이언트가 초기화되지 않았습니다."
+def handle_llm_function_calling(user_message, is_stale=None):
+    """사용자 자연어 명령 → LLM → Function Calling (플래너 스레드에서 실행)
+
+    (함수 이름, 인수, tool call id) 또는 (None, 답변 문자열, None) 을 돌려준다. 큐 반영과
+    tool 실행 결과 기록은 메인 루프의 apply_llm_result 가 한다 (정지 선점이 메인 루프에서만 일어나도록).
+    """
+    if backend is None:
+        print("LLM 백엔드가 없습니다.")
+        return None, "LLM 백엔드가 초기화되지 않았습니다.", None
 
     try:
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "너는 로봇 제어 시스템의 AI Agent야.\n"
-                    "사용자의 자연어 명령을 받아서 move_robot 함수를 호출하여 로봇을 제어해.\n\n"
-                    "move_robot 함수는 actions 배열을 받아.\n"
-                    "\"앞으로 가줘\" → actions: [{\"direction\": \"forward\"}]\n"
-                    "\"앞으로 가다가 왼쪽으로 회전해줘\" → "
-                    "actions: [{\"direction\": \"forward\"}, {\"direction\": \"left\"}]\n"
-                    "\"뒤로 천천히 가줘\" → "
-                    "actions: [{\"direction\": \"backward\", \"speed\": 0.5}]\n\n"
-                    "로봇에 대한 이동 명령이 있으면 반드시 move_robot 함수를 호출해."
-                )
-            },
-            {
-                "role": "user",
-                "content": user_message
-            }
-        ]
-
-        print(f"LLM Function Calling 요청: {user_message}")
-
-        response = client.chat.completions.create(
-            model="gpt-",  # 최신 reasoning 모델 (환경에 맞게 수정 가능)
-            messages=messages,
-            functions=functions,
-            function_call="auto",
-            max_completion_tokens=200,
+        messages = conversation.messages(user_message)
+
+        print(f"LLM Function Calling 요청: {user_message} (대화 기록 ~{conversation.tokens()} 토큰)")
+
+        metrics.mark(user_message, "plan_request")
+        response = backend.chat(
+            messages,
+            tools=TOOLS,
+            tool_choice="auto",
+            max_tokens=200,
             timeout=15
         )
+        metrics.mark(user_message, "first_token")
 
-        message = response.choices[0].message
-
-        if hasattr(message, "function_call") and message.function_call:
-            function_name = message.function_call.name
-            function_args = json.loads(message.function_call.arguments)
+        if response.tool_calls:
+            call = response.tool_calls[0]
+            function_name = call.name
+            function_args = json.loads(call.arguments)
+            metrics.mark(user_message, "parsed")
+            # 다음 요청이 바로 이 턴을 볼 수 있도록 호출은 지금 기록하고, 실행 결과는 큐 반영 뒤 채운다
+            call_ids = conversation.record(user_message, response.content, [call])
 
             print(f"함수 호출: {function_name}")
             print(f"함수 인수: {function_args}")
-
-            result = process_function_call(function_name, function_args)
-            return result
+            return function_name, function_args, call_ids[0] if call_ids else None
 
         # 함수 호출이 아닌 단순 답변 (예: "이미 정지중입니다")
-        return message.content if getattr(message, "content", None) else "명령을 처리할 수 없습니다."
+        conversation.record(user_message, response.content)
+        return None, response.content or "명령을 처리할 수 없습니다.", None
 
+    except (CircuitOpen, DeadlineExceeded) as e:
+        print(f"LLM Function Calling 포기: {e}")
+        return None, "LLM 이 응답하지 않아 명령을 처리하지 못했습니다. 단순 명령(예: 앞으로 2초, 좌회전, 정지)은 바로 처리됩니다.", None
     except Exception as e:
         print(f"LLM Function Calling 오류: {e}")
-        return f"명령 처리 중 오류가 발생했습니다: {e}"
+        return None, f"명령 처리 중 오류가 발생했습니다: {e}", None
+
+
+def apply_llm_result(user_message, outcome):
+    """handle_llm_function_calling 결과를 큐에 반영하고 답장 문자열을 돌려준다 (메인 루프)"""
+    function_name, payload, call_id = outcome
+    if function_name is None:
+        return payload
+    queued = command_queue.qsize()
+    result = process_function_call(function_name, payload)
+    metrics.enqueued(user_message, command_queue.qsize() - queued)
+    if call_id:
+        conversation.tool_result(call_id, result)
+    return result
+
+
+def try_fast_path(text):
+    """문법 파서로 바로 풀리는 명령이면 LLM 없이 큐에 넣고 답장 문자열, 아니면 None"""
+    if fast_parser is None:
+        return None
+    actions = fast_parser.parse(text)
+    if actions is None:
+        return None
+    metrics.begin(text)
+    arguments = {"actions": actions}
+    result = apply_llm_result(text, ("move_robot", arguments, None))
+    # LLM 을 거친 턴과 똑같이 (tool call + 결과) 기록해 두어야 "다시 해줘" 같은 후속 명령이 이어진다
+    call = ("move_robot", json.dumps(arguments, ensure_ascii=False, separators=(",", ":")))
+    conversation.record(text, tool_calls=[call], tool_results=[result])
+    metrics.planned(text)
+    print(f"빠른 경로 처리: {text} → {actions}")
+    return result
 
 
 # ---------------- 초기화 (env, OpenAI, Webots) ----------------
 
-dotenv.load_dotenv()  # .env에서 OPENAI_API_KEY 로드
+dotenv.load_dotenv()  # .env에서 OPENAI_API_KEY / LLM_BACKEND 등 로드
 
+# LLM_BACKEND=auto 이면 로컬 Ollama 를 먼저 쓰고 실패 시 OpenAI 로 폴백
 try:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    print("OpenAI 클라이언트 초기화 완료")
+    backend = create_backend()
+    print(f"LLM 백엔드 초기화 완료: {backend}")
 except Exception as e:
-    print(f"OpenAI 클라이언트 초기화 실패: {e}")
+    print(f"LLM 백엔드 초기화 실패: {e}")
     print("API 키가 없거나 네트워크 문제일 수 있습니다.")
-    client = None
+    backend = None
+
+# 대화 기록: LLM_HISTORY_TOKENS 추정 토큰 안에서 최근 턴 유지, 넘치면 오래된 턴 요약 (0 이면 끔)
+conversation = Conversation(SYSTEM_PROMPT, budget=int(os.getenv("LLM_HISTORY_TOKENS", "600")))
+
+# 발화 접수: WWI_DEBOUNCE 초 안에 몰린 발화는 한 요청으로 묶고, 대기 발화/동작 수에 상한을 둔다
+intake = RequestIntake(
+    window=float(os.getenv("WWI_DEBOUNCE", "0.15")),
+    max_batch=int(os.getenv("WWI_MAX_BATCH", "4")),
+    max_pending=int(os.getenv("WWI_MAX_PENDING", "6")),
+)
+MAX_QUEUED_ACTIONS = int(os.getenv("MAX_QUEUED_ACTIONS", "20"))
+
+# 빠른 경로: "forward 1.0 2", "좌회전", "앞으로 가다가 왼쪽" 같은 단순 명령은 LLM 없이 바로 처리 (FAST_PATH=0 이면 끔)
+# UNIT_SPEED(속도 1 일 때 m/s) / TURN_RATE(°/s) 를 주면 "1미터", "90도" 같은 명령도 직접 푼다
+fast_parser = IntentParser(
+    unit_speed=float(os.environ["UNIT_SPEED"]) if os.getenv("UNIT_SPEED") else None,
+    turn_rate=float(os.environ["TURN_RATE"]) if os.getenv("TURN_RATE") else None,
+) if os.getenv("FAST_PATH", "1") == "1" else None
+
+# LLM 호출은 플래너 스레드 하나에서 (메인 루프는 robot.step 을 계속 돈다)
+planner = PlannerWorker(handle_llm_function_calling, max_workers=1, cancel_stale=False)
+
+# 단계별 지연 계측 (STAGE_METRICS=1 일 때만; 아니면 모든 호출이 no-op)
+metrics = create_metrics("llm_based")
+
+# 첫 명령이 연결/모델 로드 비용을 치르지 않도록 백그라운드에서 미리 연결
+if backend is not None:
+    threading.Thread(target=backend.warmup, name="llm-warmup", daemon=True).start()
 
 robot = Robot()
 timestep = int(robot.getBasicTimeStep())
 print(f"기본 시간 스텝: {timestep} ms")
 
+# LLM 호출 마감 시간은 제어 루프가 명령 하나를 기다려 줄 수 있는 스텝 수(LLM_DEADLINE_STEPS)에서 정한다.
+# 느린 꼬리 요청은 p95 뒤 중복 요청(헤징)으로 줄이고, 연속 실패하면 회로를 열어 LLM 을 건너뛴다
+if backend is not None:
+    backend = ResilientBackend(
+        backend,
+        deadline=int(os.getenv("LLM_DEADLINE_STEPS", "300")) * timestep / 1000.0,
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+        cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "20")),
+    )
+    print(f"LLM 호출 마감 시간: {backend.deadline:.1f}초")
+
+# duration(초) → 정확한 스텝 수. FAST_FORWARD=1 이면 헤드리스 fast 모드 요청
+scheduler = StepScheduler(robot, timestep, fast_forward=os.getenv("FAST_FORWARD", "0") == "1")
+
 # 로봇 노드 (주의: 일반 Robot 컨트롤러면 getSelf() 안 됨)
 # Supervisor 컨트롤러에서 자기 자신이 아니라 특정 로봇을 추적하려면
 # world의 DEF 이름으로 getFromDef("MY_ROBOT") 써야 할 수도 있음.
@@ -254,18 +417,33 @@ except Exception:
 # 바퀴 디바이스
 left_wheel = robot.getDevice("MLW")
 right_wheel = robot.getDevice("MRW")
-
-# 명령 실행 스레드 시작
-command_thread = threading.Thread(target=execute_command_queue, daemon=True)
-command_thread.start()
-print("명령 큐 처리 스레드 시작됨")
+led = robot.getDevice("led")
+
+# 반응형 조향: 로봇의 모든 DistanceSensor 를 켜고 forward 동작 중 장애물 쪽에서 방향을 튼다
+# (REACTIVE_STEERING=0 이면 끔, 센서가 없으면 자동으로 꺼진다. 센서 방향은 STEERING_ANGLES="DS_0:0,DS_1:30" 도 단위)
+steering = None
+if os.getenv("REACTIVE_STEERING", "1") == "1":
+    steering = ReactiveSteering.from_robot(robot, timestep, Node.DISTANCE_SENSOR,
+                                           angles=parse_angles(os.getenv("STEERING_ANGLES")),
+                                           max_speed=left_wheel.getMaxVelocity())
+wheels = None   # forward 동작 중 마지막으로 쓴 (왼쪽, 오른쪽) 속도
+
+# 명령 실행기 (메인 루프에서 매 스텝 tick)
+executor = ActionExecutor(
+    command_queue, build_wheel_action,
+    on_error=lambda e: move_stop(left_wheel, right_wheel),
+    on_start=metrics.command_started if metrics else None,
+    on_finish=metrics.command_finished if metrics else None,
+)
 
 
 # ---------------- 메인 루프 ----------------
 
 step = 0
-while robot.step(timestep) != -1:
+fast_missed = None   # 접수 때 이미 빠른 경로에서 실패한 발화 (묶음에서 다시 파싱하지 않음)
+while scheduler.step():
     step += 1
+    executor.tick()
 
     # 상태 출력 (10 스텝마다)
     if step % 10 == 0:
@@ -276,20 +454,71 @@ while robot.step(timestep) != -1:
             except Exception:
                 pass
 
-        if command_queue.qsize() > 0:
-            print(f"현재 큐 크기: {command_queue.qsize()}, 실행 중: {is_executing}")
+        if executor.depth > 0:
+            print(status_text())
 
-    # Webots ↔ 브라우저 메시지 수신
+    # 끝난 LLM 요청을 큐에 반영하고 답장
+    for text, outcome, latency in planner.poll():
+        result = apply_llm_result(text, outcome)
+        metrics.planned(text)
+        print(f"Function Calling 결과 ({latency * 1000:.0f}ms): {result}")
+        robot.wwiSendText(html_format(f"명령 처리 결과: {result}\n{status_text()}"))
+
+    # Webots ↔ 브라우저 메시지 수신 (이번 스텝에 들어온 것을 모두 접수만 하고 바로 다음 스텝으로)
     message = robot.wwiReceiveText()
-    if message:
+    while message:
         print('USER_MESSAGE: ' + message)
-
-        result = handle_llm_function_calling(message)
-        print(f"Function Calling 결과: {result}")
-
-        reply = (
-            f"명령 처리 결과: {result}\n"
-            f"현재 큐 크기: {command_queue.qsize()}"
-        )
-        reply = html_format(reply)
-        robot.wwiSendText(reply)
+        if is_priority(message):
+            # 정지는 대기 중인 발화와 처리 중인 LLM 요청까지 모두 대체한다
+            metrics.begin(message)
+            dropped = intake.clear()
+            planner.supersede()
+            flushed = preempt_stop()
+            metrics.planned(message)
+            reply = f"즉시 정지했습니다 (취소된 동작 {flushed}개, 버린 대기 명령 {dropped}개)"
+        elif executor.depth >= MAX_QUEUED_ACTIONS:
+            reply = f"동작 큐가 가득 찼습니다 ({executor.depth}개). 잠시 후 다시 보내 주세요."
+        else:
+            # 앞선 요청이 없을 때만 바로 처리 (있으면 순서를 지키도록 묶음을 꺼낼 때 시도)
+            fast = None
+            if not intake.pending and planner.in_flight == 0:
+                fast = try_fast_path(message)
+                fast_missed = None if fast else message
+            reply = f"명령 처리 결과: {fast}" if fast else intake.offer(message)
+        if reply:
+            print(reply)
+            robot.wwiSendText(html_format(f"{reply}\n{status_text()}"))
+        message = robot.wwiReceiveText()
+
+    # 묶인 발화를 빠른 경로로 풀지 못하면 LLM 에 넘긴다 (처리 중인 요청이 있으면 끝날 때까지 계속 모음)
+    batch = intake.take(busy=planner.in_flight > 0)
+    if batch:
+        text = intake.join(batch)
+        if len(batch) > 1:
+            print(f"명령 {len(batch)}개를 한 요청으로 묶음: {text}")
+        fast = try_fast_path(text) if batch != [fast_missed] else None
+        if fast:
+            robot.wwiSendText(html_format(f"명령 처리 결과: {fast}\n{status_text()}"))
+        elif backend is not None and not backend.available():
+            # 회로가 열려 있으면 마감 시간까지 기다리지 않고 바로 알린다 (빠른 경로 명령은 계속 동작)
+            reply = f"LLM 이 응답하지 않아 잠시 단순 명령만 처리합니다 (예: 앞으로 2초, 좌회전, 정지): {text}"
+            print(reply)
+            robot.wwiSendText(html_format(f"{reply}\n{status_text()}"))
+        else:
+            metrics.begin(text)
+            planner.submit(text)
+
+    if metrics:
+        summary = metrics.due_summary()
+        if summary:
+            robot.wwiSendText(format_summary(summary))
+
+print(f"발화 접수 통계: {intake.stats()}")
+if fast_parser is not None:
+    print(f"빠른 경로 통계: {fast_parser.stats()}")
+if backend is not None:
+    print(f"LLM 호출 통계: {backend.stats()}")
+if steering is not None:
+    print(f"조향 통계: {steering.stats()}")
+planner.shutdown()
+metrics.close()
@@ -1,5 +1,11 @@
-from controller import Supervisor
+from controller import Supervisor, Node
 import math
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "libraries", "python"))
+from avoidance import AvoidanceFSM, BACKUP, TURN, CRUISE
+from reactive_steering import ReactiveSteering, parse_angles
 
 
 def move_stop(left_wheel, right_wheel):
@@ -37,6 +43,40 @@ def move_right(left_wheel, right_wheel, speed=1.0):
     right_wheel.setVelocity(-speed)
 
 
+MOVES = {
+    "forward": move_forward,
+    "backward": move_backward,
+    "left": move_left,
+    "right": move_right,
+}
+
+
+def drive(motion):
+    """(명령, 속도) 를 바퀴에 반영. None 이면 정지"""
+    global wheels
+    wheels = None
+    if motion is None:
+        move_stop(left_wheel, right_wheel)
+    else:
+        cmd, speed = motion
+        MOVES[cmd](left_wheel, right_wheel, speed)
+        if cmd == "forward":
+            wheels = (speed, speed)
+
+
+def steer(speed):
+    """전진 중 모든 거리 센서로 바퀴 속도를 조정. 바뀐 값만 쓴다"""
+    global wheels
+    left, right = steering.command(speed)
+    if abs(left - wheels[0]) < 0.01 and abs(right - wheels[1]) < 0.01:
+        return
+    left_wheel.setPosition(float('inf'))
+    right_wheel.setPosition(float('inf'))
+    left_wheel.setVelocity(left)
+    right_wheel.setVelocity(right)
+    wheels = (left, right)
+
+
 def html_format(message):
     message = message.replace("<", "&lt;")
     message = message.replace(">", "&gt;")
@@ -63,6 +103,22 @@ led.set(0)
 if distance_sensor:
     distance_sensor.enable(timestep)
 
+# 회피 상태 기계: 매 스텝 센서를 읽고, 상태가 바뀔 때만 바퀴/LED 를 설정한다
+# (기존 100 스텝 후진 + 100 스텝 회전을 최대값으로 두고 일찍 벗어나면 바로 끝낸다)
+avoidance = AvoidanceFSM(near=350, clear=450, max_backup=100, turn_steps=100, max_turn=250)
+motion = ("forward", 1.0)   # 회피가 끝나면 되돌아갈 사용자 동작 (None 은 정지)
+
+# 반응형 조향: 로봇의 모든 DistanceSensor 로 전진 중 장애물 쪽에서 방향을 튼다 (REACTIVE_STEERING=0 이면 끔)
+# 센서 방향은 STEERING_ANGLES="DS_0:0,DS_1:30" (도) 또는 Supervisor 로 읽은 장치 rotation
+# 가까운 장애물은 여전히 위 회피 상태 기계가 맡는다
+steering = None
+if os.getenv("REACTIVE_STEERING", "1") == "1":
+    steering = ReactiveSteering.from_robot(robot, timestep, Node.DISTANCE_SENSOR,
+                                           angles=parse_angles(os.getenv("STEERING_ANGLES")),
+                                           max_speed=left_wheel.getMaxVelocity())
+wheels = None               # 전진 중 마지막으로 쓴 (왼쪽, 오른쪽) 속도 (None 이면 전진 중이 아님)
+message = None
+
 step = 0
 while robot.step(timestep) != -1:
     step += 1
@@ -86,30 +142,28 @@ while robot.step(timestep) != -1:
 
         robot.wwiSendText(reply)
 
-    # 거리 센서 값 확인
+    # 거리 센서 값 확인 + 충돌 회피 (매 스텝 한 번 읽고 상태가 바뀔 때만 구동)
     if distance_sensor:
         distance_value = distance_sensor.getValue()
         if step % 10 == 0:
             print(f"거리 센서 값: {distance_value:.1f}mm")
 
-    # 충돌 회피 로직
-    if distance_sensor.getValue() < 350:
-        print(f"충돌 감지({distance_sensor.getValue():.1f} mm)!  회피 동작 실행")
-
-        led.set(255)
-        print('LED ON')
-
-        move_backward(left_wheel, right_wheel, 1.0)
-        robot.step(timestep * 100)
-
-        move_left(left_wheel, right_wheel, 1.0)
-        robot.step(timestep * 100)
-
-        print("회피 동작 완료")
-
-        led.set(0)
-        print('LED OFF')
-        move_forward(left_wheel, right_wheel, 1.0)
+        changed = avoidance.update(distance_value)
+        if changed == BACKUP:
+            print(f"충돌 감지({distance_value:.1f} mm)!  회피 동작 실행")
+            led.set(255)
+            print('LED ON')
+            move_backward(left_wheel, right_wheel, 1.0)
+        elif changed == TURN:
+            move_left(left_wheel, right_wheel, 1.0)
+        elif changed == CRUISE:
+            print("회피 동작 완료")
+            led.set(0)
+            print('LED OFF')
+            drive(motion)
+
+    if steering is not None and wheels is not None and not avoidance.active:
+        steer(motion[1])
 
     message = robot.wwiReceiveText()
     if message:
@@ -124,13 +178,20 @@ while robot.step(timestep) != -1:
             speed = 1.0
             duration = 1.0
 
-        if cmd == "forward":
-            move_forward(left_wheel, right_wheel, speed)
-        elif cmd == "backward":
-            move_backward(left_wheel, right_wheel, speed)
-        elif cmd == "left":
-            move_left(left_wheel, right_wheel, speed)
-        elif cmd == "right":
-            move_right(left_wheel, right_wheel, speed)
+        if cmd in MOVES:
+            motion = (cmd, speed)
         elif cmd == "stop":
-            move_stop(left_wheel, right_wheel)
\ No newline at end of file
+            motion = None
+            # 정지는 진행 중인 회피도 취소한다
+            if avoidance.reset():
+                print("회피 동작 취소")
+                led.set(0)
+        else:
+            continue
+        # 회피 중이면 끝난 뒤에 반영
+        if not avoidance.active:
+            drive(motion)
+
+print(f"회피 통계: {avoidance.stats()}")
+if steering is not None:
+    print(f"조향 통계: {steering.stats()}")
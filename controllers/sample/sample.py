@@ -1,6 +1,10 @@
 from controller import Supervisor
+import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "libraries", "python"))
+from avoidance import AvoidanceFSM, BACKUP, TURN, CRUISE
+
 # === 이동 함수들 =====================================================
 
 def move_stop(left_wheel, right_wheel):
@@ -64,6 +68,13 @@ if led:
 if distance_sensor:
     distance_sensor.enable(timestep)
 
+# 회피 상태 기계: 매 스텝 센서를 읽고, 상태가 바뀔 때만 바퀴/LED 를 설정한다
+# (기존 100 스텝 후진 + 100 스텝 회전을 최대값으로 두고 일찍 벗어나면 바로 끝낸다)
+avoidance = AvoidanceFSM(near=350, clear=450, max_backup=100, turn_steps=100, max_turn=250)
+
+# 정상 전진으로 시작
+move_forward(left_wheel, right_wheel, 1.0)
+
 step = 0
 
 while supervisor.step(timestep) != -1:
@@ -81,29 +92,30 @@ while supervisor.step(timestep) != -1:
         if step % 10 == 0:
             print(f"거리 센서 값: {distance_value:.1f}mm")
 
-    # 충돌 회피 로직
-    if distance_value is not None and distance_value < 350:
+    if distance_value is None:
+        continue
+
+    # 충돌 회피 로직 (상태가 바뀐 스텝에만 바퀴/LED 설정)
+    changed = avoidance.update(distance_value)
+    if changed == BACKUP:
         print(f"충돌 감지({distance_value:.1f} mm)! 회피 동작 실행")
 
         if led:
             led.set(0xff0000)
             print('LED ON')
 
-        # 1) 잠깐 후진
+        # 1) 후진 (멀어지면 일찍, 아니면 최대 100 스텝)
         move_backward(left_wheel, right_wheel, 1.0)
-        supervisor.step(timestep * 100)
-
-        # 2) 왼쪽으로 회전
+    elif changed == TURN:
+        # 2) 왼쪽으로 회전 (앞이 트일 때까지, 막혀 있으면 연장)
         turn_left(left_wheel, right_wheel, 1.0)
-        supervisor.step(timestep * 100)
-
+    elif changed == CRUISE:
         print("회피 동작 완료")
-    else:
         if led:
             led.set(0x000000)
-            # LED OFF 메시지 너무 많이 찍히면 로그 폭주하므로 step % 10 에만 찍어도 됨
-            if step % 10 == 0:
-                print('LED OFF')
+            print('LED OFF')
 
         # 정상 전진
         move_forward(left_wheel, right_wheel, 1.0)
+
+print(f"회피 통계: {avoidance.stats()}")
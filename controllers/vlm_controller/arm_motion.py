@@ -0,0 +1,182 @@
+"""PositionSensor 피드백으로 완료를 판정하는 UR10e 팔/그리퍼 동작.
+
+고정 시간만큼 기다리는 대신, 매 스텝 관절 위치를 읽어 모든 목표가 허용 오차
+안에 들어오면 즉시 끝난다. 진전이 없으면(stall) 또는 제한 시간이 지나면 그 시점에
+종료하며, 실제 걸린 시간과 종료 사유를 on_done 으로 알려준다.
+
+관절별 속도/가속도 한계(vmax/amax)를 주면 모든 관절에 같은 속도를 주는 대신
+motion_profile.sync_profile 로 관절마다 속도를 골라 동시에 도착하게 한다.
+blend 를 주면 남은 오차가 그 안에 들어왔을 때 멈추기 전에 끝내 다음 이동이 바로 이어진다.
+"""
+import math
+
+from action_executor import Action
+from motion_profile import sync_profile
+
+# 모터별 원래 가속도 (프로파일이 바꾸기 전 값, -1 은 무제한).
+# 가속도 한계가 없는 이동은 이 값으로 되돌린다
+_DEFAULT_ACCEL = {}
+
+
+def _default_acceleration(motor):
+    if motor not in _DEFAULT_ACCEL:
+        try:
+            a = motor.getAcceleration()
+        except AttributeError:
+            a = -1
+        _DEFAULT_ACCEL[motor] = a if a > 0 else -1
+    return _DEFAULT_ACCEL[motor]
+
+
+class JointMoveAction(Action):
+    name = "move_joints"
+
+    def __init__(self, motors, sensors, targets, speed, timestep, tolerance=0.01,
+                 timeout_steps=300, stall_steps=12, stall_eps=1e-4, fallback_steps=None, on_done=None,
+                 vmax=None, amax=None, blend=0.0):
+        """targets: {실제 관절 이름: 각도}. 센서가 없는 관절은 완료 판정에서 제외하고,
+        추적할 센서가 하나도 없으면 fallback_steps 동안 고정 시간으로 움직인다.
+        vmax/amax: {관절 이름: 한계} (없으면 모든 관절에 speed, 있어도 속도는 speed 를 넘지 않음)
+        blend: 이 오차 안이면 멈추지 않고 끝낸다 (rad)"""
+        self.motors = motors
+        self.sensors = sensors
+        self.targets = targets
+        self.speed = speed
+        self.timestep = timestep
+        self.tolerance = tolerance
+        self.timeout_steps = timeout_steps
+        self.stall_steps = stall_steps
+        self.stall_eps = stall_eps
+        self.fallback_steps = fallback_steps or timeout_steps
+        self.on_done = on_done
+        self.vmax = vmax
+        self.amax = amax
+        self.blend = blend
+        self._tracked = [(sensors[n], a) for n, a in targets.items() if sensors.get(n) is not None]
+        self.steps = 0
+        self.planned = None
+
+    def start(self):
+        self.steps = 0
+        self._best = float("inf")
+        self._last_progress = 0
+        velocities, accelerations = self._profile() if self.vmax else ({}, {})
+        for n, a in self.targets.items():
+            m = self.motors[n]
+            m.setVelocity(velocities.get(n, abs(self.speed)))
+            # 이전 이동의 프로파일 가속도가 남지 않도록 한계가 없으면 원래 값으로
+            default = _default_acceleration(m)   # 처음 바꾸기 전에 기억해 둔다
+            acc = accelerations.get(n, math.inf)
+            m.setAcceleration(acc if math.isfinite(acc) else default)
+            m.setPosition(a)
+
+    def _profile(self):
+        """현재 위치(센서, 없으면 모터 목표값) → 동시에 도착하는 관절별 속도/가속도"""
+        names = list(self.targets)
+        deltas = []
+        for n in names:
+            s = self.sensors.get(n)
+            cur = s.getValue() if s is not None else self.motors[n].getTargetPosition()
+            deltas.append(self.targets[n] - cur if math.isfinite(cur) else 0.0)
+        # 관절 한계는 상한일 뿐: 느린 명령(speed)은 프로파일에서도 느리게
+        vmax = [min(self.vmax.get(n, abs(self.speed)), abs(self.speed)) for n in names]
+        amax = [self.amax.get(n, math.inf) for n in names] if self.amax else None
+        # 아주 작은 속도로라도 움직여야 이미 도착한 관절의 오차가 보정된다
+        self.planned, vel, acc = sync_profile(deltas, vmax, amax, min_velocity=0.05)
+        return dict(zip(names, vel)), dict(zip(names, acc))
+
+    def error(self):
+        return max((abs(s.getValue() - a) for s, a in self._tracked), default=0.0)
+
+    def tick(self) -> bool:
+        self.steps += 1
+        if not self._tracked:
+            return self._finish("no_sensor", 0.0) if self.steps >= self.fallback_steps else False
+        err = self.error()
+        if err <= self.tolerance:
+            return self._finish("reached", err)
+        if err <= self.blend:
+            return self._finish("blended", err)
+        if err < self._best - self.stall_eps:
+            self._best = err
+            self._last_progress = self.steps
+        elif self.steps - self._last_progress >= self.stall_steps:
+            return self._finish("stalled", err)
+        if self.steps >= self.timeout_steps:
+            return self._finish("timeout", err)
+        return False
+
+    def cancel(self):
+        self._finish("cancelled", self.error())
+
+    def _finish(self, status, err):
+        if self.on_done:
+            result = {"status": status, "settle_s": self.steps * self.timestep / 1000.0,
+                      "steps": self.steps, "error": err}
+            if self.planned is not None:
+                result["planned_s"] = round(self.planned, 4)
+            self.on_done(result)
+        return True
+
+
+class GripperAction(Action):
+    """속도 제어 그리퍼: 한계 위치 도달 또는 손가락이 멈추면(물체 접촉) 완료"""
+
+    def __init__(self, motors, sensors, action, speed, timestep, tolerance=0.01,
+                 timeout_steps=120, stall_steps=6, stall_eps=1e-4, fallback_steps=None, on_done=None):
+        """motors/sensors: 같은 순서의 목록 (센서가 없으면 None). 센서가 하나도 없으면
+        fallback_steps 동안 고정 시간으로 움직인다."""
+        self.motors = motors
+        self.action = action
+        self.name = f"{action}_gripper"
+        self.velocity = -abs(speed) if action == "open" else abs(speed)
+        self.timestep = timestep
+        self.tolerance = tolerance
+        self.timeout_steps = timeout_steps
+        self.stall_steps = stall_steps
+        self.stall_eps = stall_eps
+        self.fallback_steps = fallback_steps or timeout_steps
+        self.on_done = on_done
+        # (센서, 한계 위치). min == max 이면 제한 없음 → stall 로만 판정
+        self.tracked = []
+        for m, s in zip(motors, sensors):
+            if s is None:
+                continue
+            lo, hi = m.getMinPosition(), m.getMaxPosition()
+            self.tracked.append((s, None if lo == hi else (lo if self.velocity < 0 else hi)))
+        self.steps = 0
+
+    def start(self):
+        self.steps = 0
+        self._still = 0
+        self._last = [s.getValue() for s, _ in self.tracked]
+        for m in self.motors:
+            m.setVelocity(self.velocity)
+
+    def tick(self) -> bool:
+        self.steps += 1
+        if not self.tracked:
+            return self._finish("no_sensor") if self.steps >= self.fallback_steps else False
+        pos = [s.getValue() for s, _ in self.tracked]
+        if all(lim is not None and abs(p - lim) <= self.tolerance
+               for p, (_, lim) in zip(pos, self.tracked)):
+            return self._finish("reached")
+        moved = max(abs(p - q) for p, q in zip(pos, self._last))
+        self._last = pos
+        self._still = self._still + 1 if moved < self.stall_eps else 0
+        if self._still >= self.stall_steps:
+            return self._finish("stalled")
+        if self.steps >= self.timeout_steps:
+            return self._finish("timeout")
+        return False
+
+    def cancel(self):
+        self._finish("cancelled")
+
+    def _finish(self, status):
+        for m in self.motors:
+            m.setVelocity(0.0)
+        if self.on_done:
+            self.on_done({"status": status, "settle_s": self.steps * self.timestep / 1000.0,
+                          "steps": self.steps})
+        return True
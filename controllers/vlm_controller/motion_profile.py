@@ -0,0 +1,51 @@
+"""동기화된 시간 최적 관절 속도 프로파일.
+
+모든 관절에 같은 속도를 주면 변위가 작은 관절은 먼저 도착하고, 이동 시간은
+가장 많이 움직이는 관절이 그 속도로 가는 시간이 된다. 여기서는 관절마다 자기
+속도/가속도 한계를 쓰되 모든 관절이 같은 모양의 사다리꼴(가속 ta, 전체 T)을 따라
+동시에 도착하도록 관절별 최대 속도와 가속도를 고른다:
+
+    v_j = |d_j| / (T - ta),   a_j = v_j / ta
+    제약: v_j <= vmax_j, a_j <= amax_j  →  c = T - ta >= max |d_j| / vmax_j = c1
+                                        c * ta >= max |d_j| / amax_j = k
+    T = c + k / c 는 c = max(c1, √k) 에서 최소 (√k 이면 삼각형 프로파일)
+
+모양이 같으므로 관절 공간에서 직선 경로가 된다 (trajectory_check 의 profile="linear").
+"""
+import math
+
+
+def sync_profile(deltas, vmax, amax=None, min_velocity=0.0):
+    """deltas: 관절별 변위 (rad), vmax / amax: 관절별 한계 (amax 없음/inf 면 가속 제한 없음)
+    → (이동 시간 s, 관절별 속도 목록, 관절별 가속도 목록 (제한 없으면 inf))"""
+    dist = [abs(d) for d in deltas]
+    amax = amax or [math.inf] * len(dist)
+    c1 = max((d / v for d, v in zip(dist, vmax) if v > 0), default=0.0)
+    k = max((d / a for d, a in zip(dist, amax) if 0 < a < math.inf), default=0.0)
+    c = max(c1, math.sqrt(k))
+    if c <= 0.0:
+        return 0.0, [max(min_velocity, 0.0)] * len(dist), [math.inf] * len(dist)
+    ta = k / c
+    velocities = [max(min_velocity, d / c) for d in dist]
+    accelerations = [v / ta if ta > 0 else math.inf for v in velocities]
+    return c + ta, velocities, accelerations
+
+
+def joint_limits_from_motors(motors, names, accel=math.inf):
+    """모터의 최대 속도와 (있으면) 가속도 → ({이름: vmax}, {이름: amax})"""
+    vmax, amax = {}, {}
+    for n in names:
+        m = motors.get(n)
+        if m is None:
+            continue
+        v = m.getMaxVelocity()
+        vmax[n] = v if v > 0 else 1.0
+        a = accel
+        try:
+            ma = m.getAcceleration()
+            if ma > 0:
+                a = min(a, ma)
+        except AttributeError:
+            pass
+        amax[n] = a
+    return vmax, amax
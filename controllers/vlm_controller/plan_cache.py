@@ -0,0 +1,177 @@
+"""반복 발화용 계획 캐시 (LRU + TTL, 디스크 저장).
+
+같은 명령("home", "lift", "그리퍼 열고 내려")이 반복되면 LLM 왕복 없이
+저장된 계획을 바로 돌려준다. 키는 정규화된 발화이고, 기본은 정확 일치만 쓴다.
+similarity > 0 이면 정확히 일치하지 않을 때 토큰 유사도(Jaccard)로 가장 가까운 항목을
+찾는다. 단, 숫자(각도, 시간 등)가 하나라도 다르거나, 두 발화에서 한쪽에만 있는 토큰에
+동작/방향 단어(열/닫, open/close, left/right, 올/내려 …)가 있으면 후보로 삼지 않는다 —
+"90도 돌려" 가 "45도 돌려" 의, "그리퍼 열어" 가 "그리퍼 닫아" 의 계획을 쓰면 안 된다.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 소수점과 음수 부호는 남긴다 (0.5 ≠ 0 5, -90 ≠ 90)
+_PUNCT_RE = re.compile(r"[^\w\s.-]+|(?<!\d)\.|\.(?!\d)|-(?!\d)|(?<=\w)-")
+_SPACE_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# 뜻을 뒤집는 동작/방향 단어 (접두어로 비교: 열어/열고, opening/opened 를 함께 잡는다)
+_POLAR_PREFIXES = (
+    "open", "clos", "grab", "grip", "grasp", "releas", "drop", "pick", "plac",
+    "left", "right", "up", "down", "rais", "lower", "lift", "forward", "back",
+    "clockwise", "counter", "cw", "ccw", "in", "out", "on", "off", "start", "stop",
+    "열", "닫", "잡", "놓", "풀", "왼", "오른", "좌", "우", "위", "아래", "올", "내",
+    "들", "앞", "뒤", "시계", "반시계", "펴", "굽", "접",
+)
+
+# 토큰 끝에서 떼어낼 조사/어미 (긴 것부터 검사)
+_PARTICLES = ("으로", "에서", "해줘", "해라", "줘", "을", "를", "은", "는", "이", "가", "로", "에", "좀")
+_STOPWORDS = {"좀", "please", "the", "a", "an", "to", "now", "해줘", "줘"}
+
+
+def normalize_utterance(text: str) -> str:
+    t = _PUNCT_RE.sub(" ", (text or "").lower())
+    tokens = []
+    for tok in _SPACE_RE.split(t.strip()):
+        if not tok or tok in _STOPWORDS:
+            continue
+        for p in _PARTICLES:
+            if tok.endswith(p) and len(tok) > len(p):
+                tok = tok[: -len(p)]
+                break
+        tokens.append(tok)
+    return " ".join(tokens)
+
+
+def _numbers(key: str) -> tuple:
+    """키에 나온 숫자 (순서대로, 0.50 과 0.5 는 같게)"""
+    return tuple(float(n) for n in _NUMBER_RE.findall(key))
+
+
+def _polar(tok: str) -> bool:
+    return tok.startswith(_POLAR_PREFIXES)
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PlanCache:
+    def __init__(self, path=None, max_size=256, ttl=86400.0, similarity=0.0):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (plan, stored_at)
+        self._tokens = {}              # key -> frozenset(tokens)
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._load()
+
+    # ---------------- 조회 / 저장 ----------------
+
+    def get(self, utterance):
+        key = normalize_utterance(utterance)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.similarity > 0:
+                key = self._nearest(key)
+                entry = self._entries.get(key) if key else None
+                if entry is not None:
+                    self.fuzzy_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            plan, stored_at = entry
+            if now - stored_at > self.ttl:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def peek(self, utterance):
+        """통계/LRU 순서를 건드리지 않는 정확 일치 확인"""
+        entry = self._entries.get(normalize_utterance(utterance))
+        return entry is not None and time.time() - entry[1] <= self.ttl
+
+    def put(self, utterance, plan):
+        key = normalize_utterance(utterance)
+        if not key or not plan:
+            return
+        with self._lock:
+            self._entries[key] = (plan, time.time())
+            self._entries.move_to_end(key)
+            self._tokens[key] = frozenset(key.split())
+            while len(self._entries) > self.max_size:
+                old, _ = self._entries.popitem(last=False)
+                self._tokens.pop(old, None)
+                self.evictions += 1
+        if self.path:
+            self._save()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries), "hits": self.hits, "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses, "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    # ---------------- 내부 ----------------
+
+    def _nearest(self, key):
+        toks = frozenset(key.split())
+        nums = _numbers(key)
+        best, best_score = None, self.similarity
+        for k, kt in self._tokens.items():
+            if _numbers(k) != nums or any(_polar(t) for t in toks ^ kt):
+                continue
+            score = _jaccard(toks, kt)
+            if score >= best_score:
+                best, best_score = k, score
+        return best
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self._tokens.pop(key, None)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, item in sorted(data.items(), key=lambda kv: kv[1].get("t", 0)):
+            if now - item.get("t", 0) <= self.ttl and item.get("plan"):
+                self._entries[key] = (item["plan"], item["t"])
+                self._tokens[key] = frozenset(key.split())
+        while len(self._entries) > self.max_size:
+            old, _ = self._entries.popitem(last=False)
+            self._tokens.pop(old, None)
+
+    def _save(self):
+        with self._lock:
+            data = {k: {"plan": p, "t": t} for k, (p, t) in self._entries.items()}
+        tmp = f"{self.path}.tmp"
+        with self._save_lock:
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"⚠️ plan cache save failed: {e}")
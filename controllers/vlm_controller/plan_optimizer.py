@@ -0,0 +1,256 @@
+"""LLM 계획 → 압축 명령 컴파일러 및 최적화 패스.
+
+LLM 이 만든 steps 를 그대로 실행하지 않고 한 번 훑으며
+  - 연속된 move_arm 목표를 하나로 합치고
+  - 어떤 관절도 바꾸지 않는 이동과 0초 wait 를 버리고
+  - 연속된 wait 를 합치고
+  - 이미 같은 상태인 그리퍼 명령을 제거한 뒤
+관절 인덱스 + float 배열로 된 압축 명령(MoveCmd/GripperCmd/WaitCmd)으로 만든다.
+관절 이름 정규화는 컴파일할 때 한 번만 한다.
+move_to_pose 는 PoseCmd 로 내린 뒤, 최적화할 때 계획 안의 모든 목표 자세를 IK 로
+한 번에 풀고 그 시점의 관절 상태에 가장 가까운 해를 골라 MoveCmd 로 바꾼다.
+guard(TrajectoryChecker 등)가 있으면 최적화된 명령 전체의 궤적을 검사해 위험한 이동을
+잘라내거나 버린 뒤 돌려준다.
+parallel 단계는 ParallelCmd(서로 다른 액추에이터를 쓰는 명령 묶음)로 내리며, 같은 패스를
+그룹 안 명령마다 적용하고 남은 명령이 하나뿐이면 그룹을 푼다.
+"""
+import itertools
+import threading
+from array import array
+from collections import namedtuple
+
+MoveCmd = namedtuple("MoveCmd", "joints angles speed")    # joints: 관절 인덱스 tuple, angles: array('d')
+GripperCmd = namedtuple("GripperCmd", "action")          # "open" / "close"
+WaitCmd = namedtuple("WaitCmd", "seconds")
+PoseCmd = namedtuple("PoseCmd", "position orientation speed")  # 최적화 전 중간 명령 (IK 전)
+ParallelCmd = namedtuple("ParallelCmd", "cmds")          # 같은 스텝에 함께 실행할 명령 tuple
+
+
+class PlanCompiler:
+    def __init__(self, joint_names, normalize, default_targets=None, speed=2.0,
+                 max_wait=0.1, gripper_time=0.25, cmd_overhead=0.05, eps=1e-3, initial=None, ik=None,
+                 guard=None, joint_speeds=None):
+        """initial: 현재 관절 각도 목록 (없으면 sync() 전까지 guard 가 시작 상태를 모르는 이동을 버린다)
+        cmd_overhead: 추정 시간에 명령마다 더하는 최소 실행 시간(초)
+        ik: prepare([(position, orientation)]) -> pick(i, seed) 를 제공하는 객체 (없으면 move_to_pose 미지원)
+        guard: check(cmds, state) -> (cmds, 실행 후 상태, 문제 목록) 를 제공하는 궤적 검사기
+        joint_speeds: 관절별 최대 속도 목록 (동기화 프로파일로 실행할 때 추정 시간에 사용)"""
+        self.joint_names = list(joint_names)
+        self.index = {n: i for i, n in enumerate(self.joint_names)}
+        self.normalize = normalize
+        self.default_targets = default_targets or {}
+        self.speed = speed
+        self.max_wait = max_wait
+        self.gripper_time = gripper_time
+        self.cmd_overhead = cmd_overhead
+        self.eps = eps
+        self.ik = ik
+        self.guard = guard
+        self.joint_speeds = joint_speeds
+        # 큐에 마지막으로 넣은 목표 상태 (계획이 순서대로 실행되므로 다음 계획의 기준이 된다)
+        self.joints = list(initial) if initial is not None else [None] * len(self.joint_names)
+        self.gripper = None
+        self._lock = threading.Lock()
+
+    # ---------------- 공개 API ----------------
+
+    def compile(self, plan):
+        """상태와 무관한 1차 컴파일 (step → 압축 명령). 프리셋 등 미리 만들어 둘 때 사용"""
+        raw = []
+        for step in plan:
+            raw.extend(self._lower(step))
+        return raw
+
+    def optimize(self, plan):
+        """계획 전체를 최적화. (명령 목록, 보고서 dict) 반환"""
+        return self.optimize_compiled(self.compile(plan), len(plan))
+
+    def optimize_compiled(self, raw, steps_before=None):
+        """compile() 결과에 병합/제거 패스를 적용. (명령 목록, 보고서 dict) 반환"""
+        poses = [(c.position, c.orientation) for c in self._flat(raw) if isinstance(c, PoseCmd)]
+        pick = self.ik.prepare(poses) if poses else None
+        with self._lock:
+            before_state = list(self.joints)
+            # 전/후 추정은 둘 다 IK 로 푼 명령으로 (PoseCmd 는 관절 변위를 모르므로)
+            resolved = self._resolve(raw, pick, before_state)
+            est_before = self._estimate(resolved, before_state)
+            cmds = self._fold(resolved)
+            unsafe = []
+            if self.guard is not None:
+                cmds, self.joints, unsafe = self.guard.check(cmds, before_state)
+        report = {
+            "steps_before": len(raw) if steps_before is None else steps_before,
+            "steps_after": len(cmds),
+            "est_before_s": round(est_before, 3),
+            "est_after_s": round(self._estimate(cmds, before_state), 3),
+        }
+        if unsafe:
+            report["unsafe"] = unsafe
+        return cmds, report
+
+    def sync(self, joints):
+        """실제 관절 각도로 기준 상태를 맞춘다 (큐가 비었을 때 호출; timeout/stall 보정)"""
+        with self._lock:
+            self.joints = list(joints)
+            # timeout/stall 뒤에는 그리퍼도 명령한 상태라고 믿을 수 없다 → 다음 그리퍼 명령을 생략하지 않는다
+            self.gripper = None
+
+    # ---------------- 내부 ----------------
+
+    def _lower(self, step):
+        """단일 step → 최적화 전 명령 (parallel 의 then 이 있을 때만 2개 이상)"""
+        a, p = step.get("action"), step.get("params") or {}
+        if a == "parallel":
+            group = list(self._flat(c for sub in p.get("steps") or [] for c in self._lower(sub)))
+            then = [c for sub in p.get("then") or [] for c in self._lower(sub)]
+            return ([ParallelCmd(tuple(group))] if len(group) > 1 else group) + then
+        if a == "move_arm":
+            targets = p.get("targets") or self.default_targets
+            if isinstance(targets, list):
+                targets = {i["joint"]: i["angle"] for i in targets
+                           if isinstance(i, dict) and "joint" in i and "angle" in i}
+            joints, angles = [], array("d")
+            for n, ang in targets.items():
+                idx = self.index.get(self.normalize(n))
+                if idx is None:
+                    print(f"⚠️ Unknown joint: {n}")
+                    continue
+                try:
+                    ang = float(ang)
+                except (TypeError, ValueError):
+                    print(f"⚠️ Bad angle for {n}: {ang!r}")
+                    continue
+                if idx in joints:
+                    angles[joints.index(idx)] = ang
+                else:
+                    joints.append(idx)
+                    angles.append(ang)
+            return [MoveCmd(tuple(joints), angles, self.speed)] if joints else []
+        if a == "move_to_pose" and self.ik is not None:
+            pos = p.get("position")
+            try:
+                pos = tuple(float(v) for v in pos)
+                ori = p.get("orientation")
+                ori = tuple(float(v) for v in ori) if ori is not None else None
+            except (TypeError, ValueError):
+                print(f"⚠️ Bad pose: {p!r}")
+                return []
+            return [PoseCmd(pos, ori, self.speed)]
+        if a == "control_gripper":
+            act = str(p.get("action", "")).lower()
+            return [GripperCmd("open" if act == "open" else "close")]
+        if a == "wait":
+            try:
+                sec = float(p.get("seconds", 0.1))
+            except (TypeError, ValueError):
+                sec = 0.1
+            return [WaitCmd(min(self.max_wait, max(0.0, sec)))]
+        print(f"⚠️ Unknown action: {a}")
+        return []
+
+    @staticmethod
+    def _flat(cmds):
+        for c in cmds:
+            if isinstance(c, ParallelCmd):
+                yield from c.cmds
+            else:
+                yield c
+
+    def _resolve(self, raw, pick, state):
+        """PoseCmd 를 IK 해로 MoveCmd 로 바꾼다 (병합/제거 없음). 해가 없는 자세는 버린다.
+        각 자세의 seed 는 그 시점까지 쌓인 목표 상태 (IK 는 이미 한 번에 풀어 둠)"""
+        if pick is None:
+            return list(raw)
+        seed = [0.0 if a is None else a for a in state]
+        pose_index = itertools.count()
+
+        def resolve(cmd):
+            if isinstance(cmd, PoseCmd):
+                angles = pick(next(pose_index), seed)
+                if angles is None:
+                    print(f"⚠️ IK failed for pose {cmd.position}")
+                    return None
+                cmd = MoveCmd(tuple(range(len(angles))), array("d", angles), cmd.speed)
+            if isinstance(cmd, MoveCmd):
+                for j, a in zip(cmd.joints, cmd.angles):
+                    seed[j] = a
+            return cmd
+
+        out = []
+        for cmd in raw:
+            if isinstance(cmd, ParallelCmd):
+                subs = tuple(c for c in map(resolve, cmd.cmds) if c is not None)
+                cmd = ParallelCmd(subs) if len(subs) > 1 else (subs[0] if subs else None)
+            else:
+                cmd = resolve(cmd)
+            if cmd is not None:
+                out.append(cmd)
+        return out
+
+    def _fold(self, raw):
+        """병합/제거 패스 (PoseCmd 는 _resolve 로 미리 푼다). self.joints / self.gripper 를 실행 후 상태로 갱신"""
+        out = []
+        for cmd in raw:
+            prev = out[-1] if out else None
+            if isinstance(cmd, ParallelCmd):
+                subs = [c for c in map(self._reduce, cmd.cmds) if c is not None]
+                if len(subs) > 1:
+                    out.append(ParallelCmd(tuple(subs)))
+                    continue
+                cmd = subs[0] if subs else None
+            else:
+                cmd = self._reduce(cmd)
+            if cmd is None:
+                continue
+            if isinstance(cmd, MoveCmd) and isinstance(prev, MoveCmd):
+                merged = dict(zip(prev.joints, prev.angles))
+                merged.update(zip(cmd.joints, cmd.angles))
+                out[-1] = MoveCmd(tuple(merged), array("d", merged.values()), max(prev.speed, cmd.speed))
+            elif isinstance(cmd, WaitCmd) and isinstance(prev, WaitCmd):
+                out[-1] = WaitCmd(min(self.max_wait, prev.seconds + cmd.seconds))
+            else:
+                out.append(cmd)
+        return out
+
+    def _reduce(self, cmd):
+        """명령 하나를 현재 상태 기준으로 줄인다 (바뀌는 관절만 남김, 효과 없으면 None). 상태 갱신"""
+        if isinstance(cmd, MoveCmd):
+            changed = [(j, a) for j, a in zip(cmd.joints, cmd.angles)
+                       if self.joints[j] is None or abs(self.joints[j] - a) > self.eps]
+            if not changed:
+                return None
+            for j, a in changed:
+                self.joints[j] = a
+            return MoveCmd(tuple(j for j, _ in changed), array("d", (a for _, a in changed)), cmd.speed)
+        if isinstance(cmd, GripperCmd):
+            if cmd.action == self.gripper:
+                return None
+            self.gripper = cmd.action
+            return cmd
+        if isinstance(cmd, WaitCmd):
+            return cmd if cmd.seconds > 0 else None
+        return None
+
+    def _estimate(self, cmds, state):
+        """대략적인 실행 시간(초): 이동은 가장 오래 걸리는 관절의 변위/속도, 그리퍼는 고정값,
+        parallel 그룹은 그 안에서 가장 오래 걸리는 명령"""
+        state = list(state)
+        return self.cmd_overhead * len(cmds) + sum(self._duration(cmd, state) for cmd in cmds)
+
+    def _duration(self, cmd, state):
+        """명령 하나의 추정 시간. state 를 실행 후 상태로 갱신한다"""
+        if isinstance(cmd, ParallelCmd):
+            return max((self._duration(c, state) for c in cmd.cmds), default=0.0)
+        if isinstance(cmd, MoveCmd):
+            # 관절 최대 속도가 있어도 명령 속도보다 빠르게 움직이지 않는다 (JointMoveAction 과 같음)
+            speeds = [min(v, cmd.speed) for v in self.joint_speeds or [cmd.speed] * len(state)]
+            d = max((abs(a - state[j]) / max(speeds[j], 1e-6) for j, a in zip(cmd.joints, cmd.angles)
+                     if state[j] is not None), default=0.0)
+            for j, a in zip(cmd.joints, cmd.angles):
+                state[j] = a
+            return d
+        if isinstance(cmd, GripperCmd):
+            return self.gripper_time
+        if isinstance(cmd, WaitCmd):
+            return cmd.seconds
+        return 0.0
@@ -0,0 +1,116 @@
+"""produce_plan 인자 스트림의 증분 파서.
+
+LLM 이 tool call 인자를 토큰 단위로 흘려보내는 동안 `steps` 배열을 따라가며,
+원소 객체 하나가 닫히는 즉시 dict 로 돌려준다. 전체 JSON 이 끝날 때까지
+기다리지 않으므로 첫 단계는 첫 단계 분량만 생성되면 바로 실행할 수 있다.
+
+단계를 하나씩 컴파일하면 연속된 move_arm 을 하나로 접는 최적화가 적용되지 않는다.
+StepBatcher 는 로봇이 아직 앞 명령을 실행하는 동안 들어온 연속 move_arm 을 모아 두었다가
+한 묶음으로 넘긴다. 로봇이 놀고 있으면 바로 넘기므로 첫 단계 지연은 늘지 않는다.
+"""
+import json
+import threading
+
+
+class StepStreamParser:
+    def __init__(self, key="steps"):
+        self.key = key
+        self._text = ""
+        self._pos = 0
+        self._stack = []          # 열린 괄호 ('{' / '[')
+        self._in_string = False
+        self._escape = False
+        self._str_start = 0
+        self._last_string = None  # 최상위 객체에서 마지막으로 닫힌 문자열 (키 후보)
+        self._array_depth = None  # steps 배열이 열린 스택 깊이
+        self._item_start = None
+        self.steps = []
+
+    def feed(self, chunk: str):
+        """인자 조각을 넣고, 이번에 완성된 step 목록을 돌려준다."""
+        if not chunk:
+            return []
+        self._text += chunk
+        text = self._text
+        done = []
+        i = self._pos
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = text[self._str_start:i]
+            elif c == '"':
+                self._in_string = True
+                self._str_start = i + 1
+            elif c in "{[":
+                self._stack.append(c)
+                depth = len(self._stack)
+                if (c == "[" and depth == 2 and self._array_depth is None
+                        and self._last_string == self.key):
+                    self._array_depth = depth
+                elif c == "{" and self._array_depth is not None and depth == self._array_depth + 1:
+                    self._item_start = i
+            elif c in "}]":
+                depth = len(self._stack)
+                if self._stack:
+                    self._stack.pop()
+                if c == "}" and self._item_start is not None and depth == self._array_depth + 1:
+                    step = self._decode(text[self._item_start:i + 1])
+                    self._item_start = None
+                    if step is not None:
+                        self.steps.append(step)
+                        done.append(step)
+                elif c == "]" and depth == self._array_depth:
+                    self._array_depth = -1  # 배열 종료, 이후 입력은 무시
+            i += 1
+        self._pos = n
+        return done
+
+    def text(self):
+        return self._text
+
+    @staticmethod
+    def _decode(s):
+        try:
+            step = json.loads(s)
+        except ValueError:
+            return None
+        return step if isinstance(step, dict) else None
+
+
+class StepBatcher:
+    def __init__(self, emit, hold, mergeable=lambda step: step.get("action") == "move_arm"):
+        """emit(steps): 묶음 전달 (한 번에 컴파일/큐 등록)
+        hold(): 참이면 합칠 수 있는 단계를 붙잡아 둔다 (로봇이 앞 명령을 실행 중일 때)
+        mergeable(step): 다음 단계와 합쳐질 수 있는 단계인지"""
+        self.emit = emit
+        self.hold = hold
+        self.mergeable = mergeable
+        self._pending = []
+        self._lock = threading.Lock()   # 묶음 전달 순서를 지키기 위해 emit 도 잠금 안에서
+        self.batches = 0
+
+    def feed(self, step):
+        """단계 하나를 넣는다. 합칠 수 없는 단계는 붙잡아 둔 단계와 함께 바로 넘긴다"""
+        with self._lock:
+            self._pending.append(step)
+            if not (self.mergeable(step) and self.hold()):
+                self._flush()
+
+    def flush(self):
+        """붙잡아 둔 단계를 넘긴다 (로봇이 놀게 됐을 때, 스트림이 끝났을 때)"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self.batches += 1
+            self.emit(batch)
@@ -0,0 +1,325 @@
+"""produce_plan 결과 검증/자동 수정.
+
+TOOLS 스키마(action/gripper enum, 필수 필드)와 UR10e 관절 한계를 한 번만 읽어
+검사기를 만들어 두고, 계획 전체를 한 번 훑으며
+  - 관절 별칭(JOINT_ALIAS) → 실제 이름, [{joint, angle}] / 6개 숫자 목록 → dict
+  - 숫자 문자열 → float, 한계 밖 각도 → clamp
+  - 그리퍼 동작 동의어(열어/release/grip …) → open/close, wait 초 → 0 이상
+  - move_to_pose 위치 {x, y, z} → [x, y, z], 도달할 수 없는 자세는 실패
+  - parallel 그룹: 하위 단계를 같은 방식으로 검사하고, 같은 액추에이터를 쓰는 단계가
+    겹치면 뒤 단계는 그룹 밖(바로 다음 순서)으로 뺀다
+을 고친다. 고칠 수 없는 단계(모르는 action, 유효한 관절이 없는 이동 등)만 실패로
+돌려주므로 호출 측은 그 부분만 모델에 다시 물으면 된다.
+
+StepGate 는 스트리밍으로 들어오는 단계를 순서대로 검사해 통과한 단계만 내보내다가,
+실패한 단계를 만나면 그 뒤 단계를 붙잡아 두고 계획이 끝난 뒤 실패 부분만 교체해
+순서대로 내보낸다 (이미 실행된 단계와 순서가 어긋나지 않는다).
+"""
+import math
+
+# UR10e 관절 한계 (rad). 모터에서 읽을 수 없을 때 쓰는 기본값
+UR10E_LIMITS = {
+    "shoulder_pan_joint": (-2 * math.pi, 2 * math.pi),
+    "shoulder_lift_joint": (-2 * math.pi, 2 * math.pi),
+    "elbow_joint": (-math.pi, math.pi),
+    "wrist_1_joint": (-2 * math.pi, 2 * math.pi),
+    "wrist_2_joint": (-2 * math.pi, 2 * math.pi),
+    "wrist_3_joint": (-2 * math.pi, 2 * math.pi),
+}
+
+ACTION_ALIAS = {
+    "move": "move_arm", "arm": "move_arm", "move_joints": "move_arm",
+    "gripper": "control_gripper", "grip": "control_gripper",
+    "sleep": "wait", "pause": "wait", "delay": "wait",
+    "group": "parallel", "together": "parallel", "simultaneous": "parallel",
+}
+# 동작별 액추에이터 (parallel 그룹 안에서 겹치면 안 됨). wait 은 액추에이터가 없다
+ACTUATORS = {"move_arm": "arm", "move_to_pose": "arm", "control_gripper": "gripper"}
+
+GRIPPER_ALIAS = {
+    "open": "open", "opened": "open", "release": "open", "열어": "open", "열기": "open",
+    "close": "close", "closed": "close", "grasp": "close", "grip": "close", "grab": "close",
+    "닫아": "close", "닫기": "close", "잡아": "close",
+}
+
+
+def joint_limits(motors, joint_names, defaults=UR10E_LIMITS):
+    """모터에서 관절 한계를 읽는다 (min == max 이면 무제한으로 보고 기본값 사용)"""
+    limits = {}
+    for n in joint_names:
+        lo, hi = defaults.get(n, (-math.inf, math.inf))
+        m = motors.get(n)
+        if m is not None:
+            try:
+                mlo, mhi = m.getMinPosition(), m.getMaxPosition()
+                if mlo < mhi:
+                    lo, hi = mlo, mhi
+            except Exception:
+                pass
+        limits[n] = (lo, hi)
+    return limits
+
+
+class PlanValidator:
+    def __init__(self, tools, joint_names, normalize, limits=None, default_targets=None, pose_check=None):
+        """tools: produce_plan 을 포함한 TOOLS, normalize: 관절 별칭 → 실제 이름
+        pose_check(position, orientation) -> bool: move_to_pose 도달 가능 여부 (없으면 검사 안 함)"""
+        self.joint_names = list(joint_names)
+        self.normalize = normalize
+        self.limits = limits or {n: UR10E_LIMITS.get(n, (-math.inf, math.inf)) for n in self.joint_names}
+        self.default_targets = default_targets
+        self.pose_check = pose_check
+        item = self._step_schema(tools)
+        props = item.get("properties", {})
+        self.actions = tuple(props.get("action", {}).get("enum") or ())
+        self.required = tuple(item.get("required") or ())
+        param_props = props.get("params", {}).get("properties", {})
+        self.gripper_actions = tuple(param_props.get("action", {}).get("enum") or ("open", "close"))
+        # 스키마에 있는 action 마다 검사 함수 (없으면 params 가 dict 인지만 본다)
+        self._checks = {a: getattr(self, f"_check_{a}", self._check_any) for a in self.actions}
+        self._lower_names = {n.lower(): n for n in self.joint_names}
+
+    @staticmethod
+    def _step_schema(tools):
+        for t in tools:
+            fn = t.get("function", t)
+            if fn.get("name") == "produce_plan":
+                return fn["parameters"]["properties"]["steps"]["items"]
+        raise ValueError("produce_plan tool not found")
+
+    # ---------------- 공개 API ----------------
+
+    def check_step(self, step):
+        """단계 하나 검사. (수정된 단계 또는 None, 수정/오류 메시지 목록)"""
+        notes = []
+        if isinstance(step, str):
+            step = {"action": step, "params": {}}
+        if not isinstance(step, dict):
+            return None, [f"step is not an object: {step!r}"]
+        action = str(step.get("action") or "").strip().lower()
+        action = ACTION_ALIAS.get(action, action)
+        if action != step.get("action"):
+            notes.append(f"action {step.get('action')!r} → {action!r}")
+        check = self._checks.get(action)
+        if check is None:
+            return None, notes + [f"unknown action {step.get('action')!r} (allowed: {', '.join(self.actions)})"]
+        params = step.get("params")
+        if params is None:
+            # 일부 모델은 params 없이 평평하게 보낸다
+            params = {k: v for k, v in step.items() if k != "action"}
+        if not isinstance(params, dict):
+            return None, notes + [f"params is not an object: {params!r}"]
+        params, errs = check(params, notes)
+        if params is None:
+            return None, notes + errs
+        return {"action": action, "params": params}, notes
+
+    def validate(self, plan):
+        """계획 전체 검사. (수정된 계획, 실패 목록 [(index, 원래 단계, 오류)], 수정 메시지 목록)"""
+        fixed, failures, repairs = [], [], []
+        if not isinstance(plan, list):
+            return [], [(0, plan, [f"plan is not a list: {type(plan).__name__}"])], []
+        for i, step in enumerate(plan):
+            ok, notes = self.check_step(step)
+            if ok is None:
+                failures.append((i, step, notes))
+            else:
+                fixed.append(ok)
+                repairs.extend(f"step {i + 1}: {n}" for n in notes)
+        return fixed, failures, repairs
+
+    # ---------------- action 별 검사 ----------------
+
+    def _check_any(self, params, notes):
+        return dict(params), []
+
+    def _check_move_arm(self, params, notes):
+        targets = params.get("targets")
+        if targets is None and self.default_targets:
+            notes.append("missing targets → default pose")
+            targets = self.default_targets
+        if isinstance(targets, list):
+            if len(targets) == len(self.joint_names) and all(isinstance(a, (int, float, str)) for a in targets):
+                notes.append("positional angle list → dict")
+                targets = dict(zip(self.joint_names, targets))
+            else:
+                pairs = {}
+                for t in targets:
+                    if isinstance(t, dict) and "joint" in t and "angle" in t:
+                        pairs[t["joint"]] = t["angle"]
+                    elif isinstance(t, (list, tuple)) and len(t) == 2:
+                        pairs[t[0]] = t[1]
+                notes.append("target list → dict")
+                targets = pairs
+        if not isinstance(targets, dict) or not targets:
+            return None, [f"targets must be a non-empty object, got {params.get('targets')!r}"]
+        out, errs = {}, []
+        for name, angle in targets.items():
+            joint = self._joint(name)
+            if joint is None:
+                errs.append(f"unknown joint {name!r}")
+                continue
+            if joint != name:
+                notes.append(f"joint {name!r} → {joint!r}")
+            try:
+                a = float(angle)
+            except (TypeError, ValueError):
+                errs.append(f"bad angle for {name}: {angle!r}")
+                continue
+            if not math.isfinite(a):
+                errs.append(f"non-finite angle for {name}: {angle!r}")
+                continue
+            lo, hi = self.limits.get(joint, (-math.inf, math.inf))
+            if a < lo or a > hi:
+                clamped = min(hi, max(lo, a))
+                notes.append(f"{joint} {a:.3f} clamped to {clamped:.3f}")
+                a = clamped
+            out[joint] = a
+        if not out:
+            return None, errs or ["no valid joint targets"]
+        # 일부 관절만 틀렸으면 나머지로 진행하고 버린 관절은 기록만 한다
+        notes.extend(f"dropped: {e}" for e in errs)
+        return {"targets": out}, []
+
+    def _check_control_gripper(self, params, notes):
+        raw = params.get("action", params.get("state"))
+        act = GRIPPER_ALIAS.get(str(raw or "").strip().lower())
+        if act not in self.gripper_actions:
+            return None, [f"bad gripper action {raw!r} (allowed: {', '.join(self.gripper_actions)})"]
+        if act != raw:
+            notes.append(f"gripper {raw!r} → {act!r}")
+        return {"action": act}, []
+
+    def _check_move_to_pose(self, params, notes):
+        pos = params.get("position")
+        if isinstance(pos, dict):
+            notes.append("position object → [x, y, z]")
+            pos = [pos.get("x"), pos.get("y"), pos.get("z")]
+        ori = params.get("orientation")
+        if isinstance(ori, dict):
+            notes.append("orientation object → [roll, pitch, yaw]")
+            ori = [ori.get("roll", 0.0), ori.get("pitch", 0.0), ori.get("yaw", 0.0)]
+        try:
+            pos = [float(v) for v in pos]
+            ori = [float(v) for v in ori] if ori is not None else None
+        except (TypeError, ValueError):
+            return None, [f"position must be [x, y, z] and orientation [roll, pitch, yaw] numbers, got {params!r}"]
+        if len(pos) != 3 or (ori is not None and len(ori) != 3) \
+                or not all(map(math.isfinite, pos + (ori or []))):
+            return None, [f"position must be [x, y, z] and orientation [roll, pitch, yaw], got {params!r}"]
+        if self.pose_check is not None and not self.pose_check(pos, ori):
+            return None, [f"pose {pos} is unreachable within joint limits"]
+        out = {"position": pos}
+        if ori is not None:
+            out["orientation"] = ori
+        return out, []
+
+    def _check_parallel(self, params, notes):
+        subs = params.get("steps", params.get("actions"))
+        if not isinstance(subs, list) or not subs:
+            return None, [f"parallel needs a non-empty steps list, got {params!r}"]
+        group, after, used, errs = [], [], set(), []
+        for j, sub in enumerate(subs):
+            ok, sub_notes = self.check_step(sub)
+            if ok is None:
+                errs.extend(f"parallel step {j + 1}: {e}" for e in sub_notes)
+                continue
+            notes.extend(f"parallel step {j + 1}: {n}" for n in sub_notes)
+            if ok["action"] == "parallel":
+                notes.append(f"parallel step {j + 1}: nested group flattened")
+                subs_ok = ok["params"]["steps"] + ok["params"].get("then", [])
+            else:
+                subs_ok = [ok]
+            for step in subs_ok:
+                res = ACTUATORS.get(step["action"])
+                if res is not None and res in used:
+                    notes.append(f"parallel: second {res} step moved after the group")
+                    after.append(step)
+                    continue
+                if res is not None:
+                    used.add(res)
+                group.append(step)
+        if errs:
+            return None, errs
+        out = {"steps": group}
+        if after:
+            out["then"] = after
+        return out, []
+
+    def _check_wait(self, params, notes):
+        raw = params.get("seconds", params.get("duration", 0.1))
+        try:
+            sec = float(raw)
+        except (TypeError, ValueError):
+            return None, [f"bad wait seconds {raw!r}"]
+        if not math.isfinite(sec) or sec < 0:
+            notes.append(f"wait {raw!r} → 0")
+            sec = 0.0
+        return {"seconds": sec}, []
+
+    def _joint(self, name):
+        if not isinstance(name, str):
+            return None
+        n = self.normalize(name)
+        if n in self.limits:
+            return n
+        key = name.lower().strip().replace(" ", "_").replace("-", "_")
+        key = self._lower_names.get(key) or self._lower_names.get(key + "_joint") or self.normalize(key)
+        return key if key in self.limits else None
+
+
+class StepGate:
+    """스트리밍 단계 검사기. 실패한 단계 이후는 붙잡아 두었다가 finish() 에서 교체 후 내보낸다"""
+
+    def __init__(self, validator, emit):
+        self.validator = validator
+        self.emit = emit
+        self.steps = []          # 최종적으로 내보낸 (수정된) 단계
+        self.repairs = []
+        self._held = []          # [(index, 수정된 단계 또는 None, 원래 단계, 오류)]
+        self._count = 0
+
+    @property
+    def failures(self):
+        return [(i, orig, errs) for i, ok, orig, errs in self._held if ok is None]
+
+    def feed(self, step):
+        i = self._count
+        self._count += 1
+        ok, notes = self.validator.check_step(step)
+        if ok is not None:
+            self.repairs.extend(f"step {i + 1}: {n}" for n in notes)
+        if ok is None or self._held:
+            self._held.append((i, ok, step, notes))
+            return
+        self._emit(ok)
+
+    def finish(self, repair=None):
+        """repair(failures) -> 교체할 단계 목록 (실패 단계마다 하나씩, 순서대로). 없거나 틀리면 실패 단계는 버린다"""
+        failures = self.failures
+        replacements = {}
+        if failures and repair is not None:
+            try:
+                fixed = repair(failures) or []
+            except Exception as e:
+                print(f"⚠️ Plan repair failed: {e}")
+                fixed = []
+            for (i, _, _), step in zip(failures, fixed):
+                ok, notes = self.validator.check_step(step)
+                if ok is not None:
+                    replacements[i] = ok
+                    self.repairs.extend(f"step {i + 1} (re-queried): {n}" for n in notes)
+        dropped = []
+        for i, ok, orig, errs in self._held:
+            ok = ok if ok is not None else replacements.get(i)
+            if ok is None:
+                dropped.append((i, orig, errs))
+                continue
+            self._emit(ok)
+        self._held = []
+        return dropped
+
+    def _emit(self, step):
+        self.steps.append(step)
+        if self.emit:
+            self.emit(step)
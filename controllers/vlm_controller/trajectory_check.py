@@ -0,0 +1,224 @@
+"""큐에 넣기 전 팔 궤적 안전 검사 (NumPy, 배치).
+
+컴파일된 MoveCmd 마다 시작 → 목표 관절 경로를 샘플링하고, 계획 안 모든 이동의 모든
+샘플을 한 번에 FK(UR10eKinematics.joint_positions) 에 넣어
+  - 관절 한계
+  - 바닥/테이블 높이 (관절 원점 + 링크 반지름)
+  - 자기 충돌 (링크를 캡슐로 보고 인접하지 않은 링크 쌍의 선분 거리)
+를 검사한다. 처음으로 위험해지는 샘플 직전까지 진행한 이동은 거기까지 잘라 쓰고
+(trim), 거의 움직이지 못하는 이동은 버린다 (reject). 자른 뒤 상태가 바뀌므로 그
+뒤 이동은 다시 검사한다 — 샘플 단위 Python 루프는 없고 이동 단위 반복만 있다.
+시작 관절 각도를 모르는 이동(기준 상태에 None 이 남은 관절)은 경로를 검사할 수 없으므로
+건너뛰지 않고 버린다 (reason="unknown_start").
+
+parallel 그룹(cmds 속성이 있는 명령) 안의 이동은 그룹 단위로 검사하고, 잘라낼 때는
+그룹 안의 이동만 바꾸거나 빼고 나머지 명령(그리퍼 등)은 남긴다.
+
+경로 모델은 move_joints 와 같다: 모든 관절이 같은 속도로 움직이므로 변위가 작은
+관절이 먼저 도착한다 (profile="uniform"). 관절이 함께 도착하는 직선 경로는
+profile="linear".
+"""
+import math
+
+import numpy as np
+
+# (시작 점, 끝 점, 반지름 m) — joint_positions 의 점 번호: 0 베이스, 1~6 관절 프레임 원점, 7 tool 끝
+LINKS = (
+    (0, 1, 0.09),    # 베이스 기둥
+    (1, 2, 0.065),   # 상완
+    (2, 3, 0.055),   # 전완
+    (3, 4, 0.05),    # wrist 1
+    (4, 5, 0.05),    # wrist 2
+    (5, 6, 0.045),   # wrist 3 → 플랜지
+    (6, 7, 0.04),    # 그리퍼
+)
+# 서로 닿을 수 있는 (인접하지 않은) 링크 쌍
+COLLISION_PAIRS = (
+    (0, 2), (0, 3), (0, 4), (0, 5), (0, 6),
+    (1, 3), (1, 4), (1, 5), (1, 6),
+    (2, 5), (2, 6),
+)
+
+
+def segment_distance(p0, p1, q0, q1):
+    """선분 p0-p1 과 q0-q1 사이 최단 거리 (배치). 입력 (..., 3) → (...)"""
+    d1, d2, r = p1 - p0, q1 - q0, p0 - q0
+    a = np.einsum("...i,...i->...", d1, d1)
+    e = np.einsum("...i,...i->...", d2, d2)
+    f = np.einsum("...i,...i->...", d2, r)
+    c = np.einsum("...i,...i->...", d1, r)
+    b = np.einsum("...i,...i->...", d1, d2)
+    denom = a * e - b * b
+    tiny = 1e-12
+    s = np.where(denom > tiny, np.clip((b * f - c * e) / np.maximum(denom, tiny), 0.0, 1.0), 0.0)
+    t = (b * s + f) / np.maximum(e, tiny)
+    # t 가 범위를 벗어나면 끝점으로 고정하고 s 를 다시 계산
+    s = np.where(t < 0.0, np.clip(-c / np.maximum(a, tiny), 0.0, 1.0), s)
+    s = np.where(t > 1.0, np.clip((b - c) / np.maximum(a, tiny), 0.0, 1.0), s)
+    t = np.clip(t, 0.0, 1.0)
+    gap = (p0 + d1 * s[..., None]) - (q0 + d2 * t[..., None])
+    return np.sqrt(np.einsum("...i,...i->...", gap, gap))
+
+
+class TrajectoryChecker:
+    def __init__(self, kinematics, table_z=0.0, margin=0.02, resolution=0.05, max_samples=64,
+                 min_progress=0.2, profile="uniform"):
+        """kinematics: UR10eKinematics (관절 한계도 여기서 가져온다)
+        table_z: 베이스 기준 바닥/테이블 높이 (m), margin: 링크 반지름에 더하는 여유 (m)
+        resolution: 샘플 간 최대 관절 변위 (rad), min_progress: 이보다 덜 가는 trim 은 reject"""
+        self.kin = kinematics
+        self.table_z = table_z
+        self.margin = margin
+        self.resolution = resolution
+        self.max_samples = max_samples
+        self.min_progress = min_progress
+        self.profile = profile
+        self._link_a = np.array([a for a, _, _ in LINKS])
+        self._link_b = np.array([b for _, b, _ in LINKS])
+        radius = np.array([r for _, _, r in LINKS])
+        self._pair_i = np.array([i for i, _ in COLLISION_PAIRS])
+        self._pair_j = np.array([j for _, j in COLLISION_PAIRS])
+        self._pair_clear = radius[self._pair_i] + radius[self._pair_j] + margin
+        # 점마다 바닥에서 떨어져야 하는 거리: 그 점을 끝점으로 갖는 링크 중 가장 굵은 반지름
+        point_r = np.zeros(8)
+        for a, b, r in LINKS:
+            point_r[a] = max(point_r[a], r)
+            point_r[b] = max(point_r[b], r)
+        self._floor = table_z + point_r + margin
+        self._floor[:2] = -math.inf   # 베이스/어깨는 고정
+        self.checked = 0
+        self.trimmed = 0
+        self.rejected = 0
+
+    # ---------------- 공개 API ----------------
+
+    def check(self, cmds, state):
+        """cmds: 최적화된 명령 목록, state: 실행 전 관절 각도 (None 은 모름)
+        (안전한 명령 목록, 실행 후 관절 상태, 문제 목록 [{index, reason, action, progress}])"""
+        cmds = list(cmds)
+        issues = []
+        first = 0
+        while True:
+            moves, starts, ends, blocked = self._moves(cmds, state, first)
+            bad, frac, reason = self._first_unsafe(starts, ends) if moves else (None, 1.0, None)
+            if bad is not None:
+                k = moves[bad]
+            elif blocked is not None:
+                k, frac, reason = blocked, 0.0, "unknown_start"
+            else:
+                break
+            move = self._move_of(cmds[k])
+            if bad is not None and frac >= self.min_progress:
+                q = self._sample(starts[bad:bad + 1], ends[bad:bad + 1], np.array([frac]))[0, 0]
+                cmds[k] = self._replace_move(cmds[k], move._replace(
+                    joints=tuple(range(len(q))), angles=type(move.angles)("d", q.tolist())))
+                action = "trimmed"
+                self.trimmed += 1
+                first = k + 1
+            else:
+                rest = self._replace_move(cmds[k], None)
+                if rest is None:
+                    del cmds[k]
+                    first = k
+                else:
+                    cmds[k] = rest
+                    first = k + 1
+                action = "rejected"
+                self.rejected += 1
+            issues.append({"index": k, "reason": reason, "action": action, "progress": round(float(frac), 3)})
+        self.checked += 1
+        return cmds, self._end_state(cmds, state), issues
+
+    def stats(self):
+        return {"checked": self.checked, "trimmed": self.trimmed, "rejected": self.rejected}
+
+    # ---------------- 내부 ----------------
+
+    @staticmethod
+    def _move_of(cmd):
+        """명령(또는 parallel 그룹) 안의 이동 명령. 없으면 None"""
+        for c in getattr(cmd, "cmds", (cmd,)):
+            if hasattr(c, "joints") and hasattr(c, "angles"):
+                return c
+        return None
+
+    def _replace_move(self, cmd, new):
+        """이동 명령을 new 로 바꾼 명령 (new 가 None 이면 이동을 뺀다. 남는 게 없으면 None)"""
+        if not hasattr(cmd, "cmds"):
+            return new
+        move = self._move_of(cmd)
+        subs = tuple(c for c in (new if c is move else c for c in cmd.cmds) if c is not None)
+        if len(subs) > 1:
+            return cmd._replace(cmds=subs)
+        return subs[0] if subs else None
+
+    def _moves(self, cmds, state, first):
+        """first 번째 명령부터의 이동: (명령 index 목록, 시작 (K, 6), 목표 (K, 6), 시작 상태를 모르는 첫 이동).
+        시작 상태를 모르는 이동을 만나면 거기서 멈춘다 (그 뒤 경로도 알 수 없다)"""
+        cur = list(state)
+        for cmd in cmds[:first]:
+            move = self._move_of(cmd)
+            if move is not None:
+                for j, a in zip(move.joints, move.angles):
+                    cur[j] = a
+        moves, starts, ends, blocked = [], [], [], None
+        for k in range(first, len(cmds)):
+            move = self._move_of(cmds[k])
+            if move is None:
+                continue
+            if None in cur:
+                blocked = k
+                break
+            nxt = list(cur)
+            for j, a in zip(move.joints, move.angles):
+                nxt[j] = a
+            moves.append(k)
+            starts.append(cur)
+            ends.append(nxt)
+            cur = nxt
+        if not moves:
+            return [], None, None, blocked
+        return moves, np.asarray(starts, dtype=float), np.asarray(ends, dtype=float), blocked
+
+    def _end_state(self, cmds, state):
+        cur = list(state)
+        for cmd in cmds:
+            move = self._move_of(cmd)
+            if move is not None:
+                for j, a in zip(move.joints, move.angles):
+                    cur[j] = a
+        return cur
+
+    def _sample(self, starts, ends, s):
+        """경로 위 진행률 s (S,) 의 관절 각도 (K, S, 6)"""
+        d = (ends - starts)[:, None, :]
+        if self.profile == "linear":
+            return starts[:, None, :] + d * s[None, :, None]
+        # 모든 관절이 같은 속도: 진행률 s 에서 각 관절은 최대 s * (가장 큰 변위) 만큼 이동
+        span = np.abs(d).max(axis=-1, keepdims=True) * s[None, :, None]
+        return starts[:, None, :] + np.clip(d, -span, span)
+
+    def _first_unsafe(self, starts, ends):
+        """(처음 위험한 이동 번호, 그 이동에서 안전한 마지막 진행률, 이유). 모두 안전하면 (None, 1.0, None)"""
+        longest = float(np.abs(ends - starts).max())
+        n = int(min(self.max_samples, max(2, math.ceil(longest / self.resolution) + 1)))
+        s = np.linspace(0.0, 1.0, n)
+        q = self._sample(starts, ends, s)                       # (K, S, 6)
+        lo, hi = self.kin.lo, self.kin.hi
+        limit_bad = ((q < lo - 1e-9) | (q > hi + 1e-9)).any(axis=-1)
+        p = self.kin.joint_positions(q)                         # (K, S, 8, 3)
+        floor_bad = (p[..., 2] < self._floor).any(axis=-1)
+        a, b = p[..., self._link_a, :], p[..., self._link_b, :]  # (K, S, L, 3)
+        dist = segment_distance(a[..., self._pair_i, :], b[..., self._pair_i, :],
+                                a[..., self._pair_j, :], b[..., self._pair_j, :])
+        self_bad = (dist < self._pair_clear).any(axis=-1)
+        # 시작 자세가 이미 위험한 이동(센서 오차, 수동 조작 등)은 빠져나갈 수 있도록 막지 않는다
+        start_bad = limit_bad[:, :1] | floor_bad[:, :1] | self_bad[:, :1]
+        unsafe = (limit_bad | floor_bad | self_bad) & ~start_bad
+        hit = unsafe.any(axis=-1)
+        if not hit.any():
+            return None, 1.0, None
+        k = int(np.argmax(hit))
+        i = int(np.argmax(unsafe[k]))
+        reason = "joint_limit" if limit_bad[k, i] else "table" if floor_bad[k, i] else "self_collision"
+        return k, float(s[i - 1]), reason
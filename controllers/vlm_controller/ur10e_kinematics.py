@@ -0,0 +1,258 @@
+"""UR10e 정/역기구학 (NumPy, 배치).
+
+표준 DH 파라미터(Universal Robots 공개값)를 쓰며, 모든 함수는 앞쪽 차원을
+배치로 받는다 (q: (..., 6), T: (..., 4, 4)).
+  - fk(q)              베이스 → 플랜지(+tool) 변환
+  - joint_positions(q) 베이스/각 관절/플랜지/tool 원점 좌표 (..., 8, 3) — 충돌 검사용
+  - ik_all(T)          해석적 IK: 목표마다 8개 해 (N, 8, 6) 와 유효 mask (N, 8)
+  - select(sols, ok, seed)  관절 한계 안에서 seed 에 가장 가까운 해 (2π 등가각 포함)
+  - ik(T, seed)        위 둘을 합친 것. 목표 자세별 8개 해를 LRU 캐시에 보관한다
+
+Webots UR10e 의 관절 0 위치가 DH 영점과 같다고 가정한다 (home = [0, -π/2, π/2, -π/2, 0, 0]).
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 표준 DH (a, d, alpha) — UR10e
+DH_A = np.array([0.0, -0.6127, -0.57155, 0.0, 0.0, 0.0])
+DH_D = np.array([0.1807, 0.0, 0.0, 0.17415, 0.11985, 0.11655])
+DH_ALPHA = np.array([math.pi / 2, 0.0, 0.0, math.pi / 2, -math.pi / 2, 0.0])
+
+
+def dh(theta, i):
+    """관절 i 의 DH 변환 (배치). theta: (...,) → (..., 4, 4)"""
+    theta = np.asarray(theta, dtype=float)
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = math.cos(DH_ALPHA[i]), math.sin(DH_ALPHA[i])
+    T = np.zeros(theta.shape + (4, 4))
+    T[..., 0, 0] = ct
+    T[..., 0, 1] = -st * ca
+    T[..., 0, 2] = st * sa
+    T[..., 0, 3] = DH_A[i] * ct
+    T[..., 1, 0] = st
+    T[..., 1, 1] = ct * ca
+    T[..., 1, 2] = -ct * sa
+    T[..., 1, 3] = DH_A[i] * st
+    T[..., 2, 1] = sa
+    T[..., 2, 2] = ca
+    T[..., 2, 3] = DH_D[i]
+    T[..., 3, 3] = 1.0
+    return T
+
+
+def inv_transform(T):
+    """강체 변환의 역행렬 (배치)"""
+    R = T[..., :3, :3]
+    Rt = np.swapaxes(R, -1, -2)
+    out = np.zeros_like(T)
+    out[..., :3, :3] = Rt
+    out[..., :3, 3] = -np.einsum("...ij,...j->...i", Rt, T[..., :3, 3])
+    out[..., 3, 3] = 1.0
+    return out
+
+
+def rpy_matrix(rpy):
+    """roll-pitch-yaw (x→y→z 고정축) → 회전 행렬 (배치). rpy: (..., 3)"""
+    r, p, y = np.moveaxis(np.asarray(rpy, dtype=float), -1, 0)
+    cr, sr, cp, sp, cy, sy = np.cos(r), np.sin(r), np.cos(p), np.sin(p), np.cos(y), np.sin(y)
+    R = np.empty(np.shape(r) + (3, 3))
+    R[..., 0, 0] = cy * cp
+    R[..., 0, 1] = cy * sp * sr - sy * cr
+    R[..., 0, 2] = cy * sp * cr + sy * sr
+    R[..., 1, 0] = sy * cp
+    R[..., 1, 1] = sy * sp * sr + cy * cr
+    R[..., 1, 2] = sy * sp * cr - cy * sr
+    R[..., 2, 0] = -sp
+    R[..., 2, 1] = cp * sr
+    R[..., 2, 2] = cp * cr
+    return R
+
+
+# 기본 자세: tool z 축이 아래(-Z)를 향함
+DOWN_RPY = (math.pi, 0.0, 0.0)
+
+
+def pose_matrix(position, rpy=None):
+    """위치(m) + rpy(rad) → 4x4 (배치). rpy 가 None 이면 아래를 향하는 자세"""
+    position = np.asarray(position, dtype=float)
+    if rpy is None:
+        rpy = np.broadcast_to(DOWN_RPY, position.shape)
+    T = np.zeros(position.shape[:-1] + (4, 4))
+    T[..., :3, :3] = rpy_matrix(rpy)
+    T[..., :3, 3] = position
+    T[..., 3, 3] = 1.0
+    return T
+
+
+class UR10eKinematics:
+    def __init__(self, limits=None, tool_length=0.0, cache_size=1024, quantum=1e-4):
+        """limits: [(lo, hi)] * 6 (rad). tool_length: 플랜지 z 축 방향 tool 길이 (m)
+        quantum: IK 캐시 키를 만들 때 자세 값을 반올림하는 단위"""
+        lim = np.asarray(limits if limits is not None else [(-2 * math.pi, 2 * math.pi)] * 6, dtype=float)
+        self.lo, self.hi = lim[:, 0], lim[:, 1]
+        self.tool = np.eye(4)
+        self.tool[2, 3] = tool_length
+        self.tool_inv = inv_transform(self.tool)
+        self.cache_size = cache_size
+        self.quantum = quantum
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---------------- FK ----------------
+
+    def frames(self, q):
+        """각 관절 프레임 (..., 7, 4, 4): 베이스(단위행렬), 관절 1~6 끝 프레임"""
+        q = np.asarray(q, dtype=float)
+        out = np.empty(q.shape[:-1] + (7, 4, 4))
+        T = np.broadcast_to(np.eye(4), q.shape[:-1] + (4, 4))
+        out[..., 0, :, :] = T
+        for i in range(6):
+            T = T @ dh(q[..., i], i)
+            out[..., i + 1, :, :] = T
+        return out
+
+    def fk(self, q):
+        """베이스 → tool 변환 (..., 4, 4)"""
+        return self.frames(q)[..., 6, :, :] @ self.tool
+
+    def joint_positions(self, q):
+        """베이스, 관절 1~6 프레임 원점, tool 끝 좌표 (..., 8, 3)"""
+        F = self.frames(q)
+        tip = (F[..., 6, :, :] @ self.tool)[..., :3, 3]
+        return np.concatenate([F[..., :3, 3], tip[..., None, :]], axis=-2)
+
+    # ---------------- IK ----------------
+
+    def ik_all(self, T):
+        """해석적 IK. T: (N, 4, 4) tool 자세 → (sols (N, 8, 6), ok (N, 8))"""
+        T = np.asarray(T, dtype=float).reshape(-1, 4, 4) @ self.tool_inv  # 플랜지 자세
+        n = T.shape[0]
+        a2, a3, d4, d6 = DH_A[1], DH_A[2], DH_D[3], DH_D[5]
+        sols = np.zeros((n, 8, 6))
+        ok = np.ones((n, 8), dtype=bool)
+
+        # θ1 (2개): 손목 중심 p05
+        p05 = T[:, :3, 3] - d6 * T[:, :3, 2]
+        r = np.hypot(p05[:, 0], p05[:, 1])
+        c = np.divide(d4, r, out=np.full_like(r, np.inf), where=r > 1e-9)
+        ok &= (np.abs(c) <= 1.0)[:, None]
+        phi = np.arccos(np.clip(c, -1.0, 1.0))
+        psi = np.arctan2(p05[:, 1], p05[:, 0])
+        t1 = np.stack([psi + phi, psi - phi], axis=1) + math.pi / 2          # (N, 2)
+        t1 = np.repeat(t1, 4, axis=1)                                         # (N, 8)
+
+        # θ5 (θ1 마다 ±)
+        s1, c1 = np.sin(t1), np.cos(t1)
+        px, py = T[:, None, 0, 3], T[:, None, 1, 3]
+        c5 = (px * s1 - py * c1 - d4) / d6
+        ok &= np.abs(c5) <= 1.0 + 1e-9
+        t5 = np.arccos(np.clip(c5, -1.0, 1.0)) * np.tile([1, 1, -1, -1], 2)
+
+        # θ6: 손목이 특이점(sin θ5 ≈ 0)이면 0 으로 둔다
+        Ti = inv_transform(T)
+        s5 = np.sin(t5)
+        num = -Ti[:, None, 1, 0] * s1 + Ti[:, None, 1, 1] * c1
+        den = Ti[:, None, 0, 0] * s1 - Ti[:, None, 0, 1] * c1
+        safe = np.abs(s5) > 1e-9
+        s5s = np.where(safe, s5, 1.0)
+        t6 = np.where(safe, np.arctan2(num / s5s, den / s5s), 0.0)
+
+        # θ3 (±), θ2, θ4: 평면 3R
+        T14 = inv_transform(dh(t1, 0)) @ T[:, None] @ inv_transform(dh(t5, 4) @ dh(t6, 5))
+        p13 = T14[..., :3, 3] - d4 * T14[..., :3, 1]
+        L2 = np.einsum("...i,...i->...", p13, p13)
+        c3 = (L2 - a2 * a2 - a3 * a3) / (2 * a2 * a3)
+        ok &= np.abs(c3) <= 1.0 + 1e-9
+        t3 = np.arccos(np.clip(c3, -1.0, 1.0)) * np.tile([1, -1], 4)
+        L = np.sqrt(L2)
+        t2 = -np.arctan2(p13[..., 1], -p13[..., 0]) + np.arcsin(
+            np.clip(a3 * np.sin(t3) / np.where(L > 1e-9, L, 1.0), -1.0, 1.0))
+        T34 = inv_transform(dh(t2, 1) @ dh(t3, 2)) @ T14
+        t4 = np.arctan2(T34[..., 1, 0], T34[..., 0, 0])
+
+        sols[..., 0], sols[..., 1], sols[..., 2] = t1, t2, t3
+        sols[..., 3], sols[..., 4], sols[..., 5] = t4, t5, t6
+        sols = (sols + math.pi) % (2 * math.pi) - math.pi
+        ok &= np.isfinite(sols).all(axis=-1)
+        return sols, ok
+
+    def select(self, sols, ok, seed, weights=None):
+        """각 목표의 유효한 해 중 관절 한계 안에서 seed 와 가장 가까운 것.
+        (q (N, 6), found (N,)). 각 관절은 seed 에 가장 가까운 2π 등가각으로 옮긴다"""
+        seed = np.broadcast_to(np.asarray(seed, dtype=float), sols.shape[:1] + (6,))[:, None, :]
+        q = seed + (sols - seed + math.pi) % (2 * math.pi) - math.pi
+        # 한계 밖이면 반대 방향 등가각 시도
+        q = np.where(q > self.hi, q - 2 * math.pi, q)
+        q = np.where(q < self.lo, q + 2 * math.pi, q)
+        within = ((q >= self.lo) & (q <= self.hi)).all(axis=-1) & ok
+        w = np.ones(6) if weights is None else np.asarray(weights, dtype=float)
+        cost = np.where(within, (np.abs(q - seed) * w).sum(axis=-1), np.inf)
+        best = cost.argmin(axis=1)
+        idx = np.arange(sols.shape[0])
+        return q[idx, best], np.isfinite(cost[idx, best])
+
+    def branches(self, T):
+        """ik_all 과 같지만 같은 자세의 8개 해는 캐시에서 재사용한다 (못 찾은 것만 한 번에 푼다)"""
+        T = np.asarray(T, dtype=float).reshape(-1, 4, 4)
+        keys = [tuple(np.round(t[:3, :].ravel() / self.quantum).astype(np.int64).tolist()) for t in T]
+        sols = np.empty((len(keys), 8, 6))
+        ok = np.empty((len(keys), 8), dtype=bool)
+        miss = []
+        with self._lock:
+            for i, k in enumerate(keys):
+                hit = self._cache.get(k)
+                if hit is None:
+                    miss.append(i)
+                else:
+                    self._cache.move_to_end(k)
+                    sols[i], ok[i] = hit
+            self.hits += len(keys) - len(miss)
+            self.misses += len(miss)
+        if miss:
+            s, o = self.ik_all(T[miss])
+            sols[miss], ok[miss] = s, o
+            with self._lock:
+                for j, i in enumerate(miss):
+                    self._cache[keys[i]] = (s[j], o[j])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return sols, ok
+
+    def ik(self, T, seed, weights=None):
+        """(q (N, 6), found (N,)). 모든 목표에 같은 seed 를 쓴다"""
+        return self.select(*self.branches(T), seed, weights)
+
+    def prepare(self, poses):
+        """[(position, rpy 또는 None)] → pick(i, seed). IK 는 여기서 모든 목표를 한 번에 풀고,
+        pick 은 i 번째 목표의 8개 해 중 seed 에 가장 가까운 관절 각도 목록 (못 풀면 None) 을 고른다"""
+        positions = np.asarray([p for p, _ in poses], dtype=float).reshape(-1, 3)
+        rpy = np.asarray([DOWN_RPY if o is None else o for _, o in poses], dtype=float).reshape(-1, 3)
+        sols, ok = self.branches(pose_matrix(positions, rpy))
+
+        def pick(i, seed):
+            q, found = self.select(sols[i:i + 1], ok[i:i + 1], seed)
+            return q[0].tolist() if found[0] else None
+        return pick
+
+    def solve_poses(self, positions, orientations, seed):
+        """목표 목록을 순서대로 푼다. 각 목표의 seed 는 바로 앞 목표의 해 (첫 목표는 주어진 seed)"""
+        pick = self.prepare(list(zip(positions, orientations)))
+        out, prev = [], seed
+        for i in range(len(positions)):
+            q = pick(i, prev)
+            out.append(q)
+            if q is not None:
+                prev = q
+        return out
+
+    def reachable(self, position, rpy=None):
+        """관절 한계 안의 해가 하나라도 있는지"""
+        return self.prepare([(position, rpy)])(0, np.zeros(6)) is not None
+
+    def stats(self):
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
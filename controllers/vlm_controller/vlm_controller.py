@@ -1,22 +1,65 @@
 # controllers/ur10e_planner_controller/ur10e_planner_controller.py
 from controller import Robot
-from openai import OpenAI
-import os, dotenv, json, threading, time
-from queue import Queue, Empty
-from datetime import datetime, timezone
+import os, sys, dotenv, json, threading, time
+from queue import Queue
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "libraries", "python"))
+from planner_worker import PlannerWorker
+from llm_backend import create_backend, freeze_tools, ResilientBackend
+from plan_cache import PlanCache, normalize_utterance
+from plan_stream import StepBatcher, StepStreamParser
+from step_scheduler import StepScheduler
+from action_executor import ActionExecutor, StepAction, ParallelAction
+from arm_motion import JointMoveAction, GripperAction
+from motion_profile import joint_limits_from_motors
+from plan_optimizer import PlanCompiler, MoveCmd, GripperCmd, WaitCmd, ParallelCmd
+from plan_validator import PlanValidator, StepGate, joint_limits
+from run_logger import RunLogger
+from stage_metrics import create_metrics, format_summary
+try:
+    from ur10e_kinematics import UR10eKinematics   # numpy 필요
+    from trajectory_check import TrajectoryChecker
+except ImportError:
+    UR10eKinematics = TrajectoryChecker = None
 
 # ============================================
 # 설정
 # ============================================
 dotenv.load_dotenv()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-LOG_PATH = os.getenv("PLAN_LOG_PATH", "ur10e_run_logs.jsonl")
+LOG_DIR = os.getenv("PLAN_LOG_DIR", "logs")                   # logs/rollout_YYYYMMDD.jsonl
+LOG_MAX_BYTES = int(os.getenv("PLAN_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BINARY = os.getenv("PLAN_LOG_BINARY", "0") == "1"          # msgpack 설치 시 .msgpack
+PLAN_STREAM = os.getenv("PLAN_STREAM", "1") == "1"  # tool call 스트리밍 파싱
+PLAN_REPAIR = os.getenv("PLAN_REPAIR", "1") == "1"  # 검증 실패 단계만 모델에 다시 질의
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", "ur10e_plan_cache.json")
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "256"))
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "86400"))
+PLAN_CACHE_SIMILARITY = float(os.getenv("PLAN_CACHE_SIMILARITY", "0"))  # 0이면 정확 일치만 (기본)
+# 시작 시 미리 계획해 캐시에 넣어 둘 발화 (쉼표 구분)
+WARMUP_UTTERANCES = [u.strip() for u in os.getenv("WARMUP_UTTERANCES", "").split(",") if u.strip()]
 
 # 초고속 설정
-MOVE_DURATION = 0.3
+MOVE_DURATION = 0.3       # PositionSensor 가 없을 때의 고정 이동 시간
 GRIPPER_DURATION = 0.25
-QUEUE_TIMEOUT = 0.001
 MIN_STEPS = 3
+# 완료 판정 (PositionSensor 피드백)
+MOVE_TOLERANCE = 0.01     # rad
+MOVE_TIMEOUT = 5.0        # s
+GRIPPER_TIMEOUT = 2.0     # s
+STALL_TIME = 0.2          # s 동안 진전이 없으면 stall 로 종료
+# 관절별 속도 한계로 모든 관절이 동시에 도착하도록 (0 이면 모든 관절에 같은 속도)
+MOTION_PROFILE = os.getenv("MOTION_PROFILE", "1") == "1"
+JOINT_ACCEL = float(os.getenv("JOINT_ACCEL", "inf"))   # rad/s², 모터 가속도 한계가 더 작으면 그 값
+MOVE_BLEND = float(os.getenv("MOVE_BLEND", "0"))       # rad, 다음 명령도 이동이면 이 오차 안에서 이어서 출발
+FAST_FORWARD = os.getenv("FAST_FORWARD", "0") == "1"  # 헤드리스 배치 실행
+TOOL_LENGTH = float(os.getenv("TOOL_LENGTH", "0.2"))   # 플랜지 → 그리퍼 끝 (m), move_to_pose 기준점
+TRAJECTORY_CHECK = os.getenv("TRAJECTORY_CHECK", "1") == "1"  # 큐에 넣기 전 궤적 안전 검사
+TABLE_Z = float(os.getenv("TABLE_Z", "-0.61"))         # 베이스 기준 바닥 높이 (m, midterm-project.wbt)
+# LLM 호출 마감 시간 = 제어 루프가 계획 하나를 기다려 줄 스텝 수 × timestep. p95 뒤 헤징, 연속 실패 시 회로 차단
+LLM_DEADLINE_STEPS = int(os.getenv("LLM_DEADLINE_STEPS", "250"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "20"))
 
 # ============================================
 # 공통 유틸
@@ -31,28 +74,22 @@ def strip_code_fences(s: str):
             return s[1].split("\n", 1)[-1] if s[1].startswith(("json", "JSON")) else s[1]
     return s
 
-def step_for(robot: Robot, timestep: int, duration: float, min_steps: int = MIN_STEPS):
-    """최소한의 step만 돌고 빠르게 다음 단계로 넘어감"""
-    end = time.time() + max(0.0, duration)
-    steps = 0
-    while time.time() < end or steps < min_steps:
-        if robot.step(timestep) == -1:
-            break
-        steps += 1
+# 버퍼에 넣기만 하고 파일 쓰기는 백그라운드 스레드가 모아서 처리
+run_logger = RunLogger(LOG_DIR, max_bytes=LOG_MAX_BYTES, binary=LOG_BINARY)
 
 def log_event(kind: str, data: dict):
-    try:
-        entry = {"t": datetime.now(timezone.utc).isoformat(), "kind": kind, **(data or {})}
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
+    run_logger.log(kind, data)
+
+# 단계별 지연 계측 (STAGE_METRICS=1 일 때만; 아니면 모든 호출이 no-op)
+metrics = create_metrics("vlm_controller")
 
 # ============================================
 # 로봇 초기화
 # ============================================
 robot = Robot()
 timestep = int(robot.getBasicTimeStep())
+# 동작 시간은 벽시계가 아니라 시뮬레이션 스텝 수로 계산 (호스트 속도와 무관, 결정적)
+scheduler = StepScheduler(robot, timestep, min_steps=MIN_STEPS, fast_forward=FAST_FORWARD)
 
 JOINT_NAMES = [
     "shoulder_pan_joint", "shoulder_lift_joint", "elbow_joint",
@@ -63,6 +100,7 @@ GRIPPER_NAMES = [
 ]
 
 motors = {}
+sensors = {}
 for n in JOINT_NAMES + GRIPPER_NAMES:
     try:
         m = robot.getDevice(n)
@@ -74,8 +112,18 @@ for n in JOINT_NAMES + GRIPPER_NAMES:
         motors[n] = m
     except Exception as e:
         print(f"[WARN] Device init failed: {n} ({e})")
+        continue
+    try:
+        ps = m.getPositionSensor()
+        if ps:
+            ps.enable(timestep)
+            sensors[n] = ps
+    except Exception as e:
+        print(f"[WARN] PositionSensor init failed: {n} ({e})")
 
 print("✅ Motors:", list(motors.keys()))
+print("✅ Position sensors:", list(sensors.keys()))
+JOINT_VMAX, JOINT_AMAX = joint_limits_from_motors(motors, JOINT_NAMES, JOINT_ACCEL) if MOTION_PROFILE else (None, None)
 
 # ============================================
 # 이름 매핑 (LLM → 실제 UR10e)
@@ -100,83 +148,105 @@ def normalize_joint_name(name: str) -> str:
 # ============================================
 # 제어 함수
 # ============================================
-def move_joints(targets, speed=2.0, duration=MOVE_DURATION):
+# 각 함수는 바로 실행하지 않고 Action 을 돌려준다. 메인 루프의 executor 가
+# 매 스텝 tick 하며 진행하므로 robot.step 은 메인 루프에서만 호출된다.
+# 이동은 고정 시간 대신 PositionSensor 로 목표 도달을 확인하면 끝난다.
+def move_joints(targets, speed=2.0, duration=MOVE_DURATION, blend=0.0):
     if isinstance(targets, list):
         targets = {
             normalize_joint_name(i["joint"]): i["angle"]
             for i in targets if "joint" in i and "angle" in i
         }
 
+    resolved = {}
     for n, a in targets.items():
         real_name = normalize_joint_name(n)
-        m = motors.get(real_name)
-        if not m:
+        if real_name not in motors:
             print(f"⚠️ Unknown joint: {n} (→ {real_name})")
             continue
         try:
-            m.setVelocity(abs(speed))
-            m.setPosition(float(a))
-        except Exception as e:
+            resolved[real_name] = float(a)
+        except (TypeError, ValueError) as e:
             print(f"⚠️ setPosition fail: {n} ({e})")
 
-    step_for(robot, timestep, duration)
-    log_event("exec_move", {"targets": targets})
+    def done(result):
+        log_event("exec_move", {"targets": resolved, **result})
+
+    return JointMoveAction(
+        motors, sensors, resolved, speed, timestep,
+        tolerance=MOVE_TOLERANCE,
+        timeout_steps=scheduler.steps_for(MOVE_TIMEOUT),
+        stall_steps=scheduler.steps_for(STALL_TIME),
+        fallback_steps=scheduler.steps_for(duration),
+        on_done=done,
+        vmax=JOINT_VMAX, amax=JOINT_AMAX, blend=blend,
+    )
+
+def _gripper_action(action, speed, duration):
+    def done(result):
+        log_event("exec_gripper", {"action": action, **result})
+
+    return GripperAction(
+        [motors[n] for n in GRIPPER_NAMES if n in motors],
+        [sensors.get(n) for n in GRIPPER_NAMES if n in motors],
+        action, speed, timestep,
+        timeout_steps=scheduler.steps_for(GRIPPER_TIMEOUT),
+        stall_steps=scheduler.steps_for(STALL_TIME),
+        fallback_steps=scheduler.steps_for(duration),
+        on_done=done,
+    )
 
 def open_gripper(speed=1.0, duration=GRIPPER_DURATION):
-    for n in GRIPPER_NAMES:
-        m = motors.get(n)
-        if m: m.setVelocity(-abs(speed))
-    step_for(robot, timestep, duration)
-    for n in GRIPPER_NAMES:
-        m = motors.get(n)
-        if m: m.setVelocity(0.0)
-    log_event("exec_gripper", {"action": "open"})
+    return _gripper_action("open", speed, duration)
 
 def close_gripper(speed=1.0, duration=GRIPPER_DURATION):
-    for n in GRIPPER_NAMES:
-        m = motors.get(n)
-        if m: m.setVelocity(abs(speed))
-    step_for(robot, timestep, duration)
-    for n in GRIPPER_NAMES:
-        m = motors.get(n)
-        if m: m.setVelocity(0.0)
-    log_event("exec_gripper", {"action": "close"})
+    return _gripper_action("close", speed, duration)
 
 # ============================================
 # 명령 큐
 # ============================================
+# 플래너 스레드 → 메인 루프 전달용. executor 가 매 스텝 get_nowait 로 꺼낸다.
 command_queue = Queue()
 
-def exec_queue_loop():
-    while True:
-        try:
-            cmd = command_queue.get(timeout=QUEUE_TIMEOUT)
-        except Empty:
-            continue
-        t = cmd.get("type")
-        try:
-            if t == "move_joints":
-                move_joints(cmd["targets"], cmd.get("speed", 2.0), cmd.get("duration", MOVE_DURATION))
-            elif t == "open_gripper": open_gripper()
-            elif t == "close_gripper": close_gripper()
-            elif t == "wait": step_for(robot, timestep, cmd.get("seconds", 0.1))
-        except Exception as e:
-            print("❌ Exec error:", e)
-        finally:
-            command_queue.task_done()
-
-threading.Thread(target=exec_queue_loop, daemon=True).start()
-print("🚀 Queue runner (ultra-fast mode) started")
+def _peek_command():
+    with command_queue.mutex:
+        return command_queue.queue[0] if command_queue.queue else None
+
+def build_action(cmd):
+    """압축 명령(plan_optimizer) → Action"""
+    if isinstance(cmd, MoveCmd):
+        blend = MOVE_BLEND if MOVE_BLEND > 0 and isinstance(_peek_command(), MoveCmd) else 0.0
+        return move_joints({JOINT_NAMES[j]: a for j, a in zip(cmd.joints, cmd.angles)}, cmd.speed, blend=blend)
+    if isinstance(cmd, GripperCmd):
+        return open_gripper() if cmd.action == "open" else close_gripper()
+    if isinstance(cmd, WaitCmd):
+        return StepAction(scheduler.steps_for(cmd.seconds), name="wait")
+    if isinstance(cmd, ParallelCmd):
+        return ParallelAction([build_action(c) for c in cmd.cmds])
+    print(f"⚠️ Unknown command: {cmd}")
+    return None
+
+def read_joint_positions():
+    return [sensors[n].getValue() if n in sensors else None for n in JOINT_NAMES]
+
+executor = ActionExecutor(
+    command_queue, build_action,
+    on_start=metrics.command_started if metrics else None,
+    on_finish=metrics.command_finished if metrics else None,
+)
 
 # ============================================
-# OpenAI 초기화
+# LLM 백엔드 초기화 (LLM_BACKEND=auto: 로컬 Ollama → OpenAI 폴백)
 # ============================================
 try:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    print(f"✅ OpenAI ready ({OPENAI_MODEL})")
+    backend = create_backend(openai_model=OPENAI_MODEL, client_id=robot.getName())
+    if backend:
+        backend = ResilientBackend(backend, deadline=LLM_DEADLINE_STEPS * timestep / 1000.0,
+                                   failure_threshold=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN)
+    print(f"✅ LLM backend ready ({backend})" if backend else "❌ No LLM backend available")
 except Exception as e:
-    client = None
-    print("❌ OpenAI init failed:", e)
+    backend = None
+    print("❌ LLM backend init failed:", e)
 
 # ============================================
 # 포즈 프리셋
@@ -198,16 +268,39 @@ def preset_from_utterance(t: str):
     if "내려" in t or "down" in t: return POSE_PRESETS["down"]
     return None
 
+# ============================================
+# 플랜 캐시
+# ============================================
+plan_cache = PlanCache(PLAN_CACHE_PATH, PLAN_CACHE_SIZE, PLAN_CACHE_TTL, PLAN_CACHE_SIMILARITY)
+print(f"🗂️ Plan cache: {plan_cache.stats()['size']} entries ({PLAN_CACHE_PATH})")
+
 # ============================================
 # LLM 플랜 생성
 # ============================================
+# 역기구학 (numpy 가 없으면 move_to_pose 를 스키마에서 뺀다)
+kinematics = None
+if UR10eKinematics is not None:
+    _limits = joint_limits(motors, JOINT_NAMES)
+    kinematics = UR10eKinematics(limits=[_limits[n] for n in JOINT_NAMES], tool_length=TOOL_LENGTH)
+    print("✅ UR10e IK ready (move_to_pose enabled)")
+trajectory_checker = TrajectoryChecker(
+    kinematics, table_z=TABLE_Z, profile="linear" if MOTION_PROFILE else "uniform",
+) if kinematics and TRAJECTORY_CHECK else None
+PLAN_ACTIONS = ["move_arm", "control_gripper", "wait", "parallel"] + (["move_to_pose"] if kinematics else [])
+
 PLAN_SYSTEM = (
     "너는 UR10e 로봇팔 계획자다. 반드시 아래 조인트 이름만 사용해야 한다:\n"
     "['shoulder_pan_joint','shoulder_lift_joint','elbow_joint','wrist_1_joint','wrist_2_joint','wrist_3_joint'].\n"
     "불필요한 wait 단계는 포함하지 말고 가능한 한 빠르게 수행하라.\n"
+    "팔 이동과 그리퍼 동작처럼 서로 다른 부분을 동시에 해도 되면 parallel 로 묶어라: "
+    "{action: parallel, params: {steps: [팔 단계, 그리퍼 단계]}} (그룹 안에 팔 단계는 하나만).\n"
+) + (
+    "그리퍼 끝을 특정 위치로 옮길 때는 move_to_pose 를 써라: position=[x,y,z] (m, 로봇 베이스 기준), "
+    "orientation=[roll,pitch,yaw] (rad, 생략하면 그리퍼가 아래를 향함).\n" if kinematics else ""
 )
 
-TOOLS = [{
+# 스키마는 한 번만 직렬화해 두고 요청마다 재사용
+TOOLS = freeze_tools([{
     "type": "function",
     "function": {
         "name": "produce_plan",
@@ -220,7 +313,7 @@ TOOLS = [{
                     "items": {
                         "type": "object",
                         "properties": {
-                            "action": {"type": "string", "enum": ["move_arm","control_gripper","wait"]},
+                            "action": {"type": "string", "enum": PLAN_ACTIONS},
                             "params": {
                                 "type": "object",
                                 "properties": {
@@ -238,7 +331,10 @@ TOOLS = [{
                                         ]
                                     },
                                     "action": {"type": "string", "enum": ["open","close"]},
-                                    "seconds": {"type": "number"}
+                                    "seconds": {"type": "number"},
+                                    "position": {"type": "array", "items": {"type": "number"}},
+                                    "orientation": {"type": "array", "items": {"type": "number"}},
+                                    "steps": {"type": "array", "items": {"type": "object"}}
                                 }
                             }
                         },
@@ -249,59 +345,260 @@ TOOLS = [{
             "required": ["steps"]
         }
     }
-}]
+}])
+
+# 스키마 + 관절 한계로 검사기를 한 번만 만들어 두고 모든 계획에 재사용
+validator = PlanValidator(TOOLS, JOINT_NAMES, normalize_joint_name,
+                          joint_limits(motors, JOINT_NAMES), default_targets=POSE_PRESETS["lift"],
+                          pose_check=kinematics.reachable if kinematics else None)
+
+def _deliver(plan, on_step):
+    if on_step:
+        for step in plan:
+            on_step(step)
+    return plan
+
+def _print_plan(plan):
+    # ✅ 계획 시각화 출력
+    print("🧠 LLM Generated Plan:")
+    for i, step in enumerate(plan, start=1):
+        print(f"  {i}. action={step.get('action')} | params={step.get('params')}")
+
+def _plan_messages(msg: str):
+    return [{"role": "system", "content": PLAN_SYSTEM}, {"role": "user", "content": msg}]
+
+def _stream_plan(msg: str, is_stale, on_step, parser):
+    """tool call 인자를 스트림으로 받아 steps 원소가 닫힐 때마다 on_step 호출"""
+    metrics.mark(msg, "plan_request")
+    for piece in backend.stream_tool_args(
+        _plan_messages(msg), TOOLS, tool_choice="required", temperature=0.1, max_tokens=400,
+        is_stale=is_stale,
+    ):
+        metrics.mark(msg, "first_token")
+        for step in parser.feed(piece):
+            if on_step:
+                on_step(step)
+    return parser.steps
 
-def plan_from_text(msg: str):
+def _repair_steps(msg: str, failures, is_stale=None):
+    """검증에 실패한 단계만 모델에 다시 물어 같은 개수의 교체 단계를 받는다"""
+    if not PLAN_REPAIR or (is_stale and is_stale()):
+        return []
+    bad = "\n".join(f"- step {i + 1}: {json.dumps(step, ensure_ascii=False)} → {'; '.join(errs)}"
+                    for i, step, errs in failures)
+    messages = _plan_messages(msg) + [{"role": "user", "content": (
+        f"다음 단계가 유효하지 않다:\n{bad}\n"
+        f"이 {len(failures)}개 단계만 고쳐서 같은 순서로 produce_plan 의 steps 로 돌려줘. 다른 단계는 넣지 마."
+    )}]
+    resp = backend.chat(messages, TOOLS, tool_choice="required", temperature=0.0, max_tokens=200)
+    if not resp.tool_calls:
+        return []
+    return json.loads(strip_code_fences(resp.tool_calls[0].arguments)).get("steps", [])
+
+def plan_from_text(msg: str, is_stale=None, on_step=None):
+    """발화 → 계획. on_step 이 주어지면 최종 계획의 각 단계를 정확히 한 번씩 전달한다.
+
+    스트리밍 모드에서는 단계가 완성되는 즉시 전달되고, 그 외 경로(오프라인/폴백)는
+    계획이 정해진 뒤 한꺼번에 전달된다. 모델이 만든 단계는 validator 로 검사/수정하며
+    고칠 수 없는 단계가 나오면 그 뒤 단계는 붙잡아 두고 실패 단계만 다시 질의한다.
+    """
     preset = preset_from_utterance(msg)
-    if client is None:
+    if backend is None or not backend.available():
+        # 백엔드가 없거나 회로가 열려 있으면 마감 시간까지 기다리지 않고 바로 오프라인 계획
         plan = [{"action": "move_arm", "params": {"targets": preset}}] if preset else []
         print(f"🧩 Generated offline plan: {json.dumps(plan, ensure_ascii=False, indent=2)}")
-        return plan
+        if backend is not None:
+            log_event("llm_short_circuit", {"input": msg, "llm": backend.stats()})
+        return _deliver(plan, on_step)
+    parser = StepStreamParser()
+    gate = StepGate(validator, on_step)
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": PLAN_SYSTEM}, {"role": "user", "content": msg}],
-            tools=TOOLS, tool_choice="required", temperature=0.1, max_completion_tokens=400,
-        )
-        tc = resp.choices[0].message.tool_calls
-        if tc:
-            args = json.loads(strip_code_fences(tc[0].function.arguments))
-            plan = args.get("steps", [])
-            # ✅ 계획 시각화 출력
-            print("🧠 LLM Generated Plan:")
-            for i, step in enumerate(plan, start=1):
-                print(f"  {i}. action={step.get('action')} | params={step.get('params')}")
-            log_event("plan_generated", {"input": msg, "plan": plan})
+        if PLAN_STREAM:
+            _stream_plan(msg, is_stale, gate.feed, parser)
+        else:
+            metrics.mark(msg, "plan_request")
+            resp = backend.chat(_plan_messages(msg), TOOLS, tool_choice="required",
+                                temperature=0.1, max_tokens=400)
+            metrics.mark(msg, "first_token")
+            if is_stale and is_stale():
+                return []
+            if resp.tool_calls:
+                args = json.loads(strip_code_fences(resp.tool_calls[0].arguments))
+                for step in args.get("steps", []):
+                    gate.feed(step)
+        if is_stale and is_stale():
+            return gate.steps
+        failures = gate.failures
+        dropped = gate.finish(lambda f: _repair_steps(msg, f, is_stale))
+        if gate.repairs or failures:
+            print(f"🩹 Plan repaired: {len(gate.repairs)} fixes, {len(failures)} re-queried, {len(dropped)} dropped")
+            log_event("plan_repaired", {"input": msg, "repairs": gate.repairs,
+                                        "requeried": len(failures), "dropped": [d[2] for d in dropped]})
+        plan = gate.steps
+        if plan:
+            _print_plan(plan)
+            log_event("plan_generated", {"input": msg, "plan": plan, "streamed": PLAN_STREAM})
+            plan_cache.put(msg, plan)
             return plan
     except Exception as e:
         print("⚠️ plan_from_text:", e)
+        if gate.steps:
+            # 이미 일부 단계가 실행 큐에 들어갔으면 폴백으로 덮어쓰지 않는다
+            return gate.steps
     plan = [{"action": "move_arm", "params": {"targets": preset}}] if preset else []
     print(f"🧩 Fallback plan: {json.dumps(plan, ensure_ascii=False, indent=2)}")
-    return plan
+    return _deliver(plan, on_step)
 
 # ============================================
 # 큐 등록
 # ============================================
-def enqueue_plan(plan):
-    for s in plan:
-        a, p = s.get("action"), s.get("params",{})
-        if a=="move_arm":
-            command_queue.put({"type":"move_joints","targets":p.get("targets",POSE_PRESETS["lift"]),
-                               "speed":2.0,"duration":MOVE_DURATION})
-        elif a=="control_gripper":
-            act=p.get("action","").lower()
-            command_queue.put({"type":"open_gripper" if act=="open" else "close_gripper"})
-        elif a=="wait":
-            command_queue.put({"type":"wait","seconds":min(0.1,p.get("seconds",0.1))})
+# 계획을 그대로 넣지 않고 병합/중복 제거 후 압축 명령으로 컴파일해서 넣는다.
+compiler = PlanCompiler(
+    JOINT_NAMES, normalize_joint_name, default_targets=POSE_PRESETS["lift"],
+    speed=2.0, max_wait=0.1, gripper_time=GRIPPER_DURATION,
+    cmd_overhead=MIN_STEPS * timestep / 1000.0, ik=kinematics, guard=trajectory_checker,
+    joint_speeds=[JOINT_VMAX.get(n, 2.0) for n in JOINT_NAMES] if JOINT_VMAX else None,
+)
+
+_enqueue_lock = threading.Lock()
+
+def enqueue_plan(plan, key=None):
+    return enqueue_compiled(compiler.compile(plan), len(plan), key)
+
+def enqueue_compiled(raw, steps_before=None, key=None):
+    """key: 계측용 요청 키 (발화). 최적화 기준 상태와 큐 순서가 어긋나지 않도록 한 번에 넣는다"""
+    with _enqueue_lock:
+        cmds, report = compiler.optimize_compiled(raw, steps_before)
+        metrics.enqueued(key, len(cmds))
+        for c in cmds:
+            command_queue.put(c)
+    if report["steps_before"] != report["steps_after"]:
+        print(f"🪄 Plan optimized: {report['steps_before']} → {report['steps_after']} steps, "
+              f"~{report['est_before_s']:.2f}s → ~{report['est_after_s']:.2f}s")
+    for u in report.get("unsafe", ()):
+        print(f"🛑 Unsafe move {u['action']} at {u['progress'] * 100:.0f}% ({u['reason']})")
+    log_event("plan_optimized", report)
+    return cmds
+
+# ============================================
+# 워밍업 / 프리셋 명령 버퍼
+# ============================================
+# 프리셋은 미리 압축 명령으로 컴파일해 두고, 발화가 프리셋 이름과 정확히 같으면
+# LLM/캐시를 거치지 않고 바로 큐에 넣는다.
+PRESET_WORDS = {
+    "home": "home", "홈": "home",
+    "lift": "lift", "up": "lift", "들어올려": "lift", "올려": "lift",
+    "down": "down", "내려": "down",
+}
+PRESET_COMMANDS = {
+    name: compiler.compile([{"action": "move_arm", "params": {"targets": targets}}])
+    for name, targets in POSE_PRESETS.items()
+}
+
+def preset_commands_for(msg: str):
+    name = PRESET_WORDS.get(normalize_utterance(msg))
+    return name, (PRESET_COMMANDS.get(name) if name else None)
+
+def warm_up():
+    """백엔드 연결을 미리 맺고, 자주 쓰는 발화를 미리 계획해 캐시에 넣는다"""
+    t0 = time.perf_counter()
+    connected = backend.warmup() if backend else False
+    planned = 0
+    for u in WARMUP_UTTERANCES:
+        if not plan_cache.peek(u) and plan_from_text(u):
+            planned += 1
+    dt = time.perf_counter() - t0
+    print(f"🔥 Warm-up done in {dt:.2f}s (backend={'ok' if connected else 'cold'}, preplanned={planned})")
+    log_event("warmup", {"backend": connected, "preplanned": planned, "seconds": dt})
+
+threading.Thread(target=warm_up, name="warmup", daemon=True).start()
 
 # ============================================
 # 메인 루프 (WWI)
 # ============================================
+# LLM 호출은 워커 스레드에서 돌고, 완성된 단계는 워커가 바로 command_queue 에 넣는다.
+# 메인 루프는 매 스텝 끝난 요청의 결과만 확인해 응답한다.
+# 스트리밍 단계는 로봇이 바쁜 동안 연속 move_arm 을 모아 한 번에 컴파일한다 (병합 적용).
+# 로봇이 놀게 되면 메인 루프가 붙잡힌 단계를 바로 넘긴다.
+_stream_batches = set()
+
+def plan_and_enqueue(msg: str, is_stale):
+    batch = StepBatcher(lambda steps: is_stale() or enqueue_plan(steps, msg), hold=lambda: executor.busy)
+    _stream_batches.add(batch)
+    try:
+        plan = plan_from_text(msg, is_stale, batch.feed)
+    finally:
+        _stream_batches.discard(batch)
+        batch.flush()
+    if not is_stale():
+        metrics.planned(msg)
+    return plan
+
+def sync_compiler():
+    """실행이 모두 끝났을 때만 실제 관절 각도로 최적화 기준 상태를 맞춘다.
+    플래너 스레드의 큐 등록과 겹치지 않도록 같은 잠금 안에서 다시 확인한다."""
+    with _enqueue_lock:
+        if executor.busy:
+            return False
+        compiler.sync(read_joint_positions())
+        return True
+
+planner = PlannerWorker(plan_and_enqueue)
+
 print("🧠 Ultra-fast planner running")
-while robot.step(timestep) != -1:
+was_busy = False
+seeded = False
+while scheduler.step():
+    if not seeded:
+        # 센서 값은 첫 스텝 뒤에야 읽힌다 → 첫 계획 전에 실제 관절 각도로 기준 상태를 채운다
+        seeded = sync_compiler()
+    executor.tick()
+    busy = executor.busy
+    if was_busy and not busy:
+        # 큐가 비면 실제 관절 각도로 최적화 기준 상태를 맞춘다 (timeout/stall 보정)
+        sync_compiler()
+    if not busy:
+        for batch in list(_stream_batches):
+            batch.flush()
+    was_busy = busy
+
+    for msg, plan, latency in planner.poll():
+        robot.wwiSendText(f"✅ {len(plan)}단계 초고속 수행 중 (계획 {latency * 1000:.0f}ms)")
+
+    if metrics:
+        summary = metrics.due_summary()
+        if summary:
+            robot.wwiSendText(format_summary(summary))
+
     msg = robot.wwiReceiveText()
-    if not msg: continue
-    print(f"📩 USER: {msg}")
-    plan = plan_from_text(msg)
-    enqueue_plan(plan)
-    robot.wwiSendText(f"✅ {len(plan)}단계 초고속 수행 중")
+    while msg:
+        print(f"📩 USER: {msg}")
+        metrics.begin(msg)
+        preset, raw = preset_commands_for(msg)
+        plan = plan_cache.get(msg) if raw is None else None
+        if raw is not None:
+            planner.supersede()
+            enqueue_compiled(raw, 1, msg)
+            metrics.planned(msg)
+            log_event("preset_hit", {"input": msg, "preset": preset})
+            robot.wwiSendText(f"⚡ 프리셋 '{preset}' 수행 중")
+        elif plan is not None:
+            # 캐시 적중: LLM 없이 바로 큐에 넣고, 진행 중이던 이전 요청은 무효화
+            planner.supersede()
+            enqueue_plan(plan, msg)
+            metrics.planned(msg)
+            log_event("plan_cache_hit", {"input": msg, "stats": plan_cache.stats()})
+            robot.wwiSendText(f"⚡ {len(plan)}단계 (캐시) 수행 중")
+        else:
+            planner.submit(msg)
+            robot.wwiSendText(f"🧠 계획 중: {msg}")
+        msg = robot.wwiReceiveText()
+
+planner.shutdown()
+if backend:
+    print(f"📶 LLM calls: {backend.stats()}")
+    backend.close()
+log_event("run_summary", {**scheduler.report(), "executor": executor.stats(),
+                          "llm": backend.stats() if backend else None})
+metrics.close()
+run_logger.close()
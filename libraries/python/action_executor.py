@@ -0,0 +1,226 @@
+"""메인 루프가 소유하는 협력형 동작 실행기.
+
+robot.step 은 메인 루프만 호출한다. 큐에 들어온 명령은 Action(재개 가능한
+상태 머신)으로 바뀌어 매 스텝 tick() 이 한 번씩 호출되고, tick() 이 True 를
+돌려주면 다음 명령으로 넘어간다. 백그라운드 실행 스레드나 busy-poll 이 없다.
+
+플래너 스레드 → 메인 루프 전달은 thread-safe Queue(command_queue) 하나로 하고,
+실행기는 매 스텝 get_nowait() 로 꺼내기만 한다.
+
+서로 다른 액추에이터(팔/그리퍼/바퀴/LED)를 쓰는 동작은 ParallelAction 으로 묶어
+같은 스텝에 함께 진행시키고, 모두 끝나면 그룹이 끝난다.
+
+stop/비상 정지 같은 우선 명령은 preempt() 로 넣는다: 현재 동작을 취소하고 큐를 비운 뒤
+그 자리에서 바로 시작하므로 다음 robot.step 한 번 안에 액추에이터에 반영된다.
+"""
+import time
+from queue import Empty
+
+
+class Action:
+    """한 스텝씩 진행되는 동작. start() 후 매 스텝 tick() 이 True 면 끝"""
+    name = "action"
+
+    def start(self):
+        pass
+
+    def tick(self) -> bool:
+        return True
+
+    def cancel(self):
+        pass
+
+
+class StepAction(Action):
+    """시작 시 on_start, 정해진 스텝 수만큼 유지한 뒤 on_end 를 호출하는 동작.
+    on_tick 이 있으면 유지하는 동안 매 스텝 호출한다 (예: 센서 기반 조향)"""
+
+    def __init__(self, steps: int, on_start=None, on_end=None, name="step", on_tick=None):
+        self.steps = steps
+        self.on_start = on_start
+        self.on_end = on_end
+        self.on_tick = on_tick
+        self.name = name
+        self.remaining = steps
+
+    def start(self):
+        self.remaining = self.steps
+        if self.on_start:
+            self.on_start()
+
+    def tick(self) -> bool:
+        self.remaining -= 1
+        if self.remaining > 0:
+            if self.on_tick:
+                self.on_tick()
+            return False
+        if self.on_end:
+            self.on_end()
+        return True
+
+    def cancel(self):
+        if self.on_end:
+            self.on_end()
+
+
+class ParallelAction(Action):
+    """여러 동작을 같은 스텝에 함께 진행. 모든 동작이 끝나면 완료"""
+
+    def __init__(self, actions, name=None):
+        self.actions = [a for a in actions if a is not None]
+        self.name = name or "+".join(a.name for a in self.actions)
+        self._running = []
+
+    def start(self):
+        for a in self.actions:
+            a.start()
+        self._running = list(self.actions)
+
+    def tick(self) -> bool:
+        self._running = [a for a in self._running if not a.tick()]
+        return not self._running
+
+    def cancel(self):
+        running, self._running = self._running, []
+        for a in running:
+            a.cancel()
+
+
+class ActionExecutor:
+    def __init__(self, source, build_action, on_error=None, on_start=None, on_finish=None):
+        """source: 명령 dict 가 들어오는 Queue, build_action(cmd) -> Action
+
+        on_start(cmd) / on_finish(cmd): 명령을 꺼낸 직후 / 명령이 끝나거나 실패한 뒤 호출 (계측용)
+        """
+        self.source = source
+        self.build_action = build_action
+        self.on_error = on_error
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.current = None
+        self.current_cmd = None
+        self._queued = False       # current_cmd 를 큐에서 꺼냈는지 (task_done 짝 맞춤)
+        self.completed = 0
+        self.preempted = 0
+        self.flushed = 0
+        self.ticks = 0
+        self.tick_time = 0.0
+        self.tick_max = 0.0
+
+    @property
+    def busy(self):
+        return self.current is not None or not self.source.empty()
+
+    @property
+    def depth(self):
+        """아직 시작하지 않은 명령 수"""
+        return self.source.qsize()
+
+    def status(self) -> dict:
+        return {"current": self.current.name if self.current is not None else None,
+                "depth": self.depth}
+
+    def preempt(self, cmd=None):
+        """현재 동작을 취소하고 큐를 비운 뒤 cmd(있으면)를 바로 시작. 버린 명령 수를 돌려준다.
+        메인 루프(robot.step 사이)에서만 호출한다."""
+        if self.current is not None:
+            action, self.current = self.current, None
+            try:
+                action.cancel()
+            except Exception as e:
+                print("❌ Cancel error:", e)
+            self._done()
+        flushed = 0
+        while True:
+            try:
+                dropped = self.source.get_nowait()
+            except Empty:
+                break
+            self.source.task_done()
+            if self.on_finish:
+                self.on_finish(dropped)
+            flushed += 1
+        self.preempted += 1
+        self.flushed += flushed
+        if cmd is not None:
+            # 큐를 거치지 않고 바로 시작: 비운 뒤 다른 스레드가 넣은 명령이 cmd 를 앞지르지 않는다
+            self._guard(lambda: self._start(cmd, queued=False))
+        return flushed
+
+    def tick(self):
+        """robot.step 직후 한 번 호출. 현재 동작을 진행시키고 끝나면 다음 명령을 시작"""
+        t0 = time.perf_counter()
+        if self.current is not None:
+            self._guard(self._advance)
+        if self.current is None:
+            self._guard(self._start_next)
+        dt = time.perf_counter() - t0
+        self.ticks += 1
+        self.tick_time += dt
+        if dt > self.tick_max:
+            self.tick_max = dt
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "preempted": self.preempted,
+            "flushed": self.flushed,
+            "ticks": self.ticks,
+            "tick_mean_us": (self.tick_time / self.ticks * 1e6) if self.ticks else 0.0,
+            "tick_max_us": self.tick_max * 1e6,
+        }
+
+    # ---------------- 내부 ----------------
+
+    def _advance(self):
+        if self.current.tick():
+            self._finish()
+
+    def _start_next(self):
+        try:
+            cmd = self.source.get_nowait()
+        except Empty:
+            return
+        self._start(cmd)
+
+    def _start(self, cmd, queued=True):
+        self.current_cmd = cmd
+        self._queued = queued
+        if self.on_start:
+            self.on_start(cmd)
+        try:
+            self.current = self.build_action(cmd)
+        except Exception:
+            self._done()
+            raise
+        if self.current is None:
+            self._done()
+            return
+        self.current.start()
+
+    def _finish(self):
+        self.current = None
+        self.completed += 1
+        self._done()
+
+    def _done(self):
+        cmd, self.current_cmd = self.current_cmd, None
+        if self._queued:
+            self.source.task_done()
+        if self.on_finish:
+            self.on_finish(cmd)
+
+    def _guard(self, fn):
+        try:
+            fn()
+        except Exception as e:
+            print("❌ Exec error:", e)
+            if self.current is not None:
+                action, self.current = self.current, None
+                try:
+                    action.cancel()
+                except Exception:
+                    pass
+                self._done()
+            if self.on_error:
+                self.on_error(e)
@@ -0,0 +1,123 @@
+"""스텝 동기 장애물 회피 상태 기계.
+
+robot.step(timestep * 100) 으로 후진/회전하는 동안 센서를 보지 못하던 방식 대신,
+매 스텝 거리 값을 한 번씩 넣어 상태를 진행한다. 상태가 바뀐 스텝에만 새 상태를
+돌려주므로 호출 측은 그때만 바퀴/LED 를 설정하면 된다.
+
+    cruise ──(가까움 confirm 스텝 연속)──▶ backup ──(멀어짐 또는 max_backup)──▶ turn
+       ▲                                                                    │
+       └──────────(clear_steps 스텝 연속 멀어짐, 또는 max_turn 에서 포기)──────┘
+    turn 중 critical 보다 가까워지면 다시 backup (최대 max_retries 번)
+
+  - 필터: 가까워지는 값은 바로 따르고(빠른 반응) 멀어지는 값은 alpha 로 천천히 따른다
+    (한두 스텝 튀는 먼 값에 회피를 일찍 끝내지 않도록)
+  - 히스테리시스: near 보다 가까우면 회피 시작, clear 보다 멀어야 끝난 것으로 본다
+  - 중단/연장: 일찍 멀어지면 min_* 스텝 뒤 바로 끝내고(abort), 아직 막혀 있으면
+    turn_steps 를 넘겨 max_turn 까지 계속 돈다(extend)
+거리 단위는 센서 값 그대로 (작을수록 가깝다). 시간은 모두 스텝 단위.
+"""
+
+CRUISE = "cruise"
+BACKUP = "backup"
+TURN = "turn"
+
+
+class AvoidanceFSM:
+    def __init__(self, near=350.0, clear=450.0, critical=None, alpha=0.3, confirm=1,
+                 min_backup=10, max_backup=100, min_turn=30, turn_steps=100, max_turn=250,
+                 clear_steps=5, max_retries=3):
+        self.near = near
+        self.clear = clear
+        self.critical = near * 0.6 if critical is None else critical
+        self.alpha = alpha
+        self.confirm = confirm
+        self.min_backup = min_backup
+        self.max_backup = max_backup
+        self.min_turn = min_turn
+        self.turn_steps = turn_steps
+        self.max_turn = max_turn
+        self.clear_steps = clear_steps
+        self.max_retries = max_retries
+        self.state = CRUISE
+        self.filtered = None
+        self.in_state = 0          # 현재 상태에서 보낸 스텝 수
+        self._near_count = 0
+        self._clear_count = 0
+        self._retries = 0
+        self.maneuvers = 0
+        self.aborted = 0           # 예정보다 일찍 끝난 회피
+        self.extended = 0          # turn_steps 를 넘겨 계속 돈 회피
+        self.retried = 0           # 회전 중 다시 후진
+        self.gave_up = 0           # max_turn 까지 돌고도 막혀 있음
+        self.transitions = 0
+
+    @property
+    def active(self):
+        return self.state != CRUISE
+
+    def _filter(self, raw):
+        if self.filtered is None or raw < self.filtered:
+            self.filtered = raw
+        else:
+            self.filtered += self.alpha * (raw - self.filtered)
+        return self.filtered
+
+    def _go(self, state):
+        self.state = state
+        self.in_state = 0
+        self._clear_count = 0
+        self.transitions += 1
+        return state
+
+    def update(self, raw):
+        """이번 스텝 센서 값 → 바뀐 상태 (바뀌지 않았으면 None)"""
+        d = self._filter(raw)
+        self.in_state += 1
+        if self.state == CRUISE:
+            self._near_count = self._near_count + 1 if d < self.near else 0
+            if self._near_count >= self.confirm:
+                self._near_count = 0
+                self._retries = 0
+                self.maneuvers += 1
+                return self._go(BACKUP)
+            return None
+
+        self._clear_count = self._clear_count + 1 if d > self.clear else 0
+        if self.state == BACKUP:
+            if self._clear_count >= self.clear_steps and self.in_state >= self.min_backup:
+                return self._go(TURN)
+            if self.in_state >= self.max_backup:
+                return self._go(TURN)
+            return None
+
+        # TURN
+        if d < self.critical and self._retries < self.max_retries:
+            self._retries += 1
+            self.retried += 1
+            return self._go(BACKUP)
+        if self._clear_count >= self.clear_steps and self.in_state >= self.min_turn:
+            if self.in_state < self.turn_steps:
+                self.aborted += 1
+            return self._go(CRUISE)
+        if self.in_state == self.turn_steps + 1:
+            self.extended += 1
+        if self.in_state >= self.max_turn:
+            self.gave_up += 1
+            return self._go(CRUISE)
+        return None
+
+    def reset(self):
+        """진행 중인 회피를 취소 (예: 사용자 정지 명령). 회피 중이었으면 True"""
+        was = self.active
+        self.state = CRUISE
+        self.in_state = 0
+        self._near_count = 0
+        self._clear_count = 0
+        return was
+
+    def stats(self):
+        return {
+            "state": self.state, "maneuvers": self.maneuvers, "aborted": self.aborted,
+            "extended": self.extended, "retried": self.retried, "gave_up": self.gave_up,
+            "transitions": self.transitions,
+        }
@@ -0,0 +1,146 @@
+"""LLM 대화 컨텍스트: 고정 프리픽스 + 토큰 예산 안의 rolling history.
+
+요청 메시지는 항상
+    [system 프롬프트] [이전 대화 요약] [최근 턴 …] [이번 사용자 발화]
+순서로 만든다. system 프롬프트 메시지는 한 번만 만들어 두고 매 요청에 같은 객체를
+넣으므로 (tools 도 FrozenTools 로 한 번만 직렬화) 요청 앞부분이 바이트 단위로 같아
+제공자/로컬 서버의 프롬프트 캐시(prefix cache)가 그대로 재사용된다.
+
+최근 턴은 budget(추정 토큰) 안에서만 유지하고, 넘치면 가장 오래된 턴부터 한 줄씩
+요약해 요약 메시지로 접는다. 요약은 기본적으로 로컬에서 만들며 (추가 LLM 호출 없음)
+summarize(이전 요약, 접을 턴 목록) 함수를 넘기면 그것을 쓴다.
+
+함수 호출 턴은 텍스트로 풀어 쓰지 않고 OpenAI 형식 그대로 남긴다:
+    {"role": "assistant", "tool_calls": [{"id", "type": "function", "function": {"name", "arguments"}}]}
+    {"role": "tool", "tool_call_id": id, "content": 실행 결과}
+실행 결과를 기록 시점에 모르면 (큐 반영이 다른 스레드에서 일어나는 경우) 자리만 만들어 두고
+tool_result() 로 나중에 채운다.
+"""
+import itertools
+import threading
+from collections import deque
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수: ASCII 4글자 ≈ 1 토큰, 한글 등은 1글자 ≈ 1 토큰, 메시지마다 +4"""
+    text = text or ""
+    ascii_n = sum(1 for c in text if ord(c) < 128)
+    return ascii_n // 4 + (len(text) - ascii_n) + 4
+
+
+def summarize_turns(summary, turns, max_chars=400):
+    """기본 요약: 턴마다 "'발화' → 응답 앞부분" 한 줄. 오래된 내용부터 잘라 max_chars 안에 맞춘다"""
+    lines = [summary] if summary else []
+    for user, reply in turns:
+        reply = " ".join((reply or "").split())
+        lines.append(f"'{user}' → {reply[:80]}{'…' if len(reply) > 80 else ''}")
+    text = "\n".join(lines)
+    return text if len(text) <= max_chars else "…" + text[-max_chars:]
+
+
+class Conversation:
+    def __init__(self, system_prompt, budget=600, keep_last=1, summarize=None, summary_chars=400):
+        """budget: 요약 + 최근 턴에 쓸 추정 토큰 수 (0 이면 기록하지 않음)
+        keep_last: 예산을 넘어도 요약하지 않고 남길 최근 턴 수
+        summary_chars: 기본 요약의 최대 글자 수 (오래된 내용부터 잘린다)"""
+        self.system = {"role": "system", "content": system_prompt}
+        self.prefix_tokens = estimate_tokens(system_prompt)
+        self.budget = budget
+        self.keep_last = keep_last
+        self.summarize = summarize or (lambda summary, turns: summarize_turns(summary, turns, summary_chars))
+        self.summary = ""
+        self.turns = deque()       # [사용자 메시지, 응답 메시지 목록, 추정 토큰]
+        self.folded = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def messages(self, user_text):
+        """이번 요청에 보낼 메시지 목록"""
+        msgs = [self.system]
+        with self._lock:
+            if self.summary:
+                msgs.append({"role": "system", "content": "이전 대화 요약:\n" + self.summary})
+            for user, replies, _ in self.turns:
+                msgs.append(user)
+                msgs.extend(replies)
+        msgs.append({"role": "user", "content": user_text})
+        return msgs
+
+    def record(self, user_text, reply_text=None, tool_calls=(), tool_results=None):
+        """완료된 턴 기록. tool call id 목록을 돌려준다.
+        reply_text: 모델 답변 텍스트, tool_calls: [(이름, 인자 JSON 문자열)] (ToolCall 도 된다)
+        tool_results: 호출마다 실행 결과 문자열 (None 이면 나중에 tool_result() 로 채운다)"""
+        if self.budget <= 0:
+            return []
+        user = {"role": "user", "content": user_text}
+        reply = {"role": "assistant", "content": reply_text or ""}
+        replies = [reply]
+        ids = []
+        with self._lock:
+            if tool_calls:
+                results = list(tool_results) if tool_results is not None else [""] * len(tool_calls)
+                reply["tool_calls"] = []
+                for (name, arguments), result in zip(tool_calls, results):
+                    call_id = f"call_{next(self._ids)}"
+                    ids.append(call_id)
+                    reply["tool_calls"].append({"id": call_id, "type": "function",
+                                                "function": {"name": name, "arguments": arguments}})
+                    replies.append({"role": "tool", "tool_call_id": call_id, "content": result or ""})
+            self.turns.append([user, replies, estimate_tokens(user_text) + self._tokens(replies)])
+            self._compact_locked()
+        return ids
+
+    def tool_result(self, call_id, content):
+        """record() 때 비워 둔 tool 실행 결과를 채운다. 이미 요약으로 접힌 턴이면 False"""
+        with self._lock:
+            for turn in reversed(self.turns):
+                for msg in turn[1]:
+                    if msg.get("tool_call_id") == call_id:
+                        msg["content"] = content or ""
+                        turn[2] = estimate_tokens(turn[0]["content"]) + self._tokens(turn[1])
+                        self._compact_locked()
+                        return True
+        return False
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+            self.summary = ""
+
+    def tokens(self):
+        """프리픽스를 뺀 history 추정 토큰 수"""
+        with self._lock:
+            return self._history_tokens_locked()
+
+    def stats(self):
+        with self._lock:
+            return {"turns": len(self.turns), "folded": self.folded, "prefix_tokens": self.prefix_tokens,
+                    "history_tokens": self._history_tokens_locked()}
+
+    # ---------------- 내부 ----------------
+
+    @staticmethod
+    def _tokens(replies):
+        return sum(estimate_tokens(m.get("content")) + sum(
+            estimate_tokens(tc["function"]["name"] + tc["function"]["arguments"]) for tc in m.get("tool_calls", ()))
+            for m in replies)
+
+    @staticmethod
+    def _reply_text(replies):
+        """요약용 한 줄: 답변 텍스트, 없으면 '이름 {인자}'"""
+        reply = replies[0]
+        if reply["content"] or not reply.get("tool_calls"):
+            return reply["content"]
+        return "; ".join(f"{tc['function']['name']} {tc['function']['arguments']}" for tc in reply["tool_calls"])
+
+    def _history_tokens_locked(self):
+        return (estimate_tokens(self.summary) if self.summary else 0) + sum(t for _, _, t in self.turns)
+
+    def _compact_locked(self):
+        old = []
+        while len(self.turns) > self.keep_last and self._history_tokens_locked() > self.budget:
+            user, replies, _ = self.turns.popleft()
+            old.append((user["content"], self._reply_text(replies)))
+        if old:
+            self.summary = self.summarize(self.summary, old)
+            self.folded += len(old)
@@ -0,0 +1,251 @@
+"""바퀴 로봇용 결정적 빠른 경로 명령 파서 (LLM 우회).
+
+"forward 1.0 2", "stop", "좌회전", "앞으로 2초 가다가 왼쪽", "뒤로 천천히" 같은 흔한
+명령을 정규식 하나로 토큰화해 move_robot 과 같은 actions 목록으로 바꾼다.
+어휘는 모듈 로드 시 한 번만 컴파일하고, 발화의 모든 글자가 어휘(방향/숫자/단위/
+속도 부사/연결어/군말)로 소비될 때만 성공한다. 하나라도 모르는 말이 남으면 None 을
+돌려주므로 호출 측은 그때만 LLM 에 넘기면 된다.
+
+  - 방향 토큰이 나올 때마다 새 동작을 시작한다 ("앞으로 가다가 왼쪽" → forward, left)
+  - 숫자+초/sec → duration, "속도/speed" 뒤 숫자 → speed,
+    단위 없는 숫자는 text_input 과 같이 순서대로 speed, duration
+  - 천천히/slowly → speed 0.5, 빨리/fast → speed 2.0
+  - 미터/도 단위는 unit_speed(속도 1 일 때 m/s) / turn_rate(속도 1 일 때 °/s) 를 알 때만 시간으로 바꾼다
+  - 속도/시간이 스키마 범위를 벗어나면 잘라 쓰지 않고 None ("turn right 90" 은 LLM 이 판단)
+  - "불 켜고 앞으로" 처럼 고/and 로 이어진 LED 와 바퀴 동작은 LLM 과 같이 with_previous 로 묶는다
+hits/misses 와 최근 실패 발화를 모아 stats() 로 돌려준다 (문법을 늘릴 때 참고).
+"""
+import re
+import time
+from collections import deque
+
+DIRECTIONS = {
+    "forward": (r"forward", r"ahead", r"straight", r"앞쪽으로", r"앞으로", r"앞", r"전진", r"직진"),
+    "backward": (r"backward", r"backwards", r"back", r"reverse", r"뒤쪽으로", r"뒤로", r"후진"),
+    "left": (r"left", r"왼쪽으로", r"왼쪽", r"왼편으로", r"좌회전", r"좌측으로", r"좌측", r"좌로"),
+    "right": (r"right(?!\s+(?:now|away))", r"오른쪽으로", r"오른쪽", r"오른편으로", r"우회전", r"우측으로", r"우측", r"우로"),
+    "stop": (r"stop", r"halt", r"정지", r"멈춰", r"멈춤", r"멈추"),
+    "led_on": (r"led\s+on", r"lights?\s+on", r"불\s*켜", r"라이트\s*켜"),
+    "led_off": (r"led\s+off", r"lights?\s+off", r"불\s*꺼", r"라이트\s*꺼"),
+}
+SLOW = (r"slowly", r"slow", r"천천히", r"느리게", r"살살")
+FAST = (r"quickly", r"fast", r"빨리", r"빠르게", r"얼른")
+SPEED_WORDS = (r"speed", r"속도", r"속력")
+# 동작을 나누는 연결어 (방향 토큰이 새 동작을 시작하므로 여기서는 소비만 한다)
+CONNECTORS = (r"and\s+then", r"then", r"after\s+that", r"그리고", r"그\s*다음에?", r"다음에?",
+              r"다가", r"고\s*나서", r"후에", r"[,;.]")
+# 동시에 하라는 연결어: LED 와 바퀴 동작이 이것으로 이어지면 LLM 과 같이 with_previous 로 묶는다
+TOGETHER = (r"and", r"with", r"while", r"하면서", r"면서", r"하고", r"고")
+# 의미 없는 말 (동사 어미, 조사, 호칭 등)
+FILLERS = (r"please", r"go", r"move", r"turn", r"drive", r"the", r"robot", r"right\s+now", r"right\s+away",
+           r"now", r"for", r"at", r"to",
+           r"로봇아?", r"좀", r"으로", r"로", r"쪽", r"회전", r"이동", r"움직여", r"돌아", r"가세요", r"가요",
+           r"가라", r"가자", r"가", r"해주세요", r"해줘", r"해요", r"해라", r"해", r"하", r"줘",
+           r"주세요", r"요", r"서", r"!", r"\?")
+SECONDS = r"초|seconds?|secs?|s\b"
+METERS = r"미터|meters?|m\b"
+DEGREES = r"도|degrees?|deg\b"
+KOREAN_NUMBERS = {"한": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+
+SPEED_LIMITS = (0.1, 2.5)       # move_robot 스키마와 같은 범위. 벗어나면 잘라 쓰지 않고 LLM 으로
+DURATION_LIMITS = (0.1, 10.0)
+LED_DIRECTIONS = ("led_on", "led_off")
+
+
+def _words(patterns):
+    """영문 단어는 단어 경계를 붙이고, 긴 패턴부터 시도하도록 정렬해 하나의 alternation 으로"""
+    out = []
+    for p in sorted(patterns, key=len, reverse=True):
+        out.append(rf"\b{p}\b" if p[:1].isascii() and p[:1].isalpha() else p)
+    return "|".join(out)
+
+
+def _build_grammar():
+    parts = [rf"(?P<{name}>{_words(words)})" for name, words in DIRECTIONS.items()]
+    korean_num = "|".join(sorted(KOREAN_NUMBERS, key=len, reverse=True))
+    parts += [
+        rf"(?P<speedkw>{_words(SPEED_WORDS)})",
+        rf"(?P<num>\d+(?:\.\d+)?|{korean_num}(?=\s*(?:{SECONDS})))\s*(?:(?P<sec>{SECONDS})|(?P<meter>{METERS})|(?P<deg>{DEGREES}))?",
+        rf"(?P<slow>{_words(SLOW)})",
+        rf"(?P<fast>{_words(FAST)})",
+        rf"(?P<conn>{_words(CONNECTORS)})",
+        rf"(?P<together>{_words(TOGETHER)})",
+        rf"(?P<filler>{_words(FILLERS)})",
+        r"(?P<space>\s+)",
+    ]
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+GRAMMAR = _build_grammar()
+
+
+def _within(v, limits):
+    return limits[0] <= v <= limits[1]
+
+
+class IntentParser:
+    def __init__(self, unit_speed=None, turn_rate=None, slow=0.5, fast=2.0, keep_misses=50):
+        """unit_speed: 속도 1.0 일 때 전진 속도 (m/s), turn_rate: 속도 1.0 일 때 회전 속도 (°/s).
+        모르면 None → 미터/도 단위 명령은 LLM 으로 넘긴다"""
+        self.unit_speed = unit_speed
+        self.turn_rate = turn_rate
+        self.slow = slow
+        self.fast = fast
+        self.hits = 0
+        self.misses = 0
+        self.parse_time = 0.0
+        self.recent_misses = deque(maxlen=keep_misses)
+
+    def parse(self, text):
+        """발화 → actions 목록 (move_robot 인자와 같은 형식) 또는 None (LLM 으로)"""
+        t0 = time.perf_counter()
+        actions = self._parse(text or "")
+        self.parse_time += time.perf_counter() - t0
+        if actions:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.recent_misses.append(text)
+        return actions
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "mean_us": round(self.parse_time / total * 1e6, 1) if total else 0.0,
+            "recent_misses": list(self.recent_misses)[-10:],
+        }
+
+    # ---------------- 내부 ----------------
+
+    def _parse(self, text):
+        actions, cur = [], None
+        bare = []              # 현재 동작의 단위 없는 숫자 (speed, duration 순)
+        expect_speed = False
+        together = False       # 직전 연결어가 "고/and" 였는지
+        pos = 0
+        for m in GRAMMAR.finditer(text):
+            if m.start() != pos:
+                return None     # 어휘에 없는 말이 끼어 있음
+            pos = m.end()
+            kind = m.lastgroup if m.lastgroup in DIRECTIONS or m.lastgroup in (
+                "speedkw", "slow", "fast", "conn", "together", "filler", "space") else "num"
+            if kind in DIRECTIONS:
+                if cur is not None and not self._finish(cur, bare):
+                    return None
+                cur, bare, expect_speed = {"direction": kind}, [], False
+                if together and actions:
+                    cur["_together"] = True
+                actions.append(cur)
+                together = False
+            elif kind == "conn":
+                together = False
+            elif kind == "together":
+                together = True
+            elif kind == "speedkw":
+                expect_speed = True
+            elif kind in ("slow", "fast"):
+                if cur is None:
+                    # "천천히 앞으로" 처럼 방향보다 먼저 오면 다음 동작에 적용
+                    cur, bare = {}, []
+                    actions.append(cur)
+                cur["speed"] = self.slow if kind == "slow" else self.fast
+            elif kind == "num":
+                if cur is None:
+                    cur, bare = {}, []
+                    actions.append(cur)
+                raw = m.group("num")
+                value = float(KOREAN_NUMBERS.get(raw, raw)) if raw in KOREAN_NUMBERS else float(raw)
+                if expect_speed:
+                    cur["speed"] = value
+                    expect_speed = False
+                elif m.group("sec"):
+                    cur["duration"] = value
+                elif m.group("meter"):
+                    cur["_meters"] = value
+                elif m.group("deg"):
+                    cur["_degrees"] = value
+                else:
+                    bare.append(value)
+        if pos != len(text) or not actions:
+            return None
+        if cur is not None and not self._finish(cur, bare):
+            return None
+        if any("direction" not in a for a in actions):
+            actions = self._merge_prefix(actions)
+        return self._pair_led(actions) if actions else None
+
+    @staticmethod
+    def _pair_led(actions):
+        """"고/and" 로 이어진 LED 와 바퀴 동작을 LLM 과 같이 바퀴 동작 + with_previous LED 로 묶는다
+
+        "불 켜고 앞으로 가줘" → [forward, led_on(with_previous)]
+        """
+        out = []
+        for a in actions:
+            together = a.pop("_together", False)
+            prev = out[-1] if out else None
+            if together and prev is not None and not prev.get("with_previous"):
+                led, prev_led = a["direction"] in LED_DIRECTIONS, prev["direction"] in LED_DIRECTIONS
+                if led and not prev_led:
+                    a["with_previous"] = True
+                elif prev_led and not led:
+                    out[-1] = a
+                    prev["with_previous"] = True
+                    a = prev
+            out.append(a)
+        return out
+
+    def _merge_prefix(self, actions):
+        """방향보다 먼저 나온 속도/시간("천천히 앞으로")을 바로 뒤 동작에 합친다"""
+        out, carry = [], {}
+        for a in actions:
+            if "direction" not in a:
+                carry.update(a)
+                continue
+            merged = dict(carry)
+            merged.update(a)
+            if not self._finish(merged, []):
+                return None
+            out.append(merged)
+            carry = {}
+        return out if out and not carry else None
+
+    def _finish(self, action, bare):
+        """단위 없는 숫자/거리/각도를 speed, duration 으로 정리. 해석할 수 없으면 False"""
+        if "direction" not in action:
+            if bare:
+                return False
+            return True
+        if bare:
+            if len(bare) > 2:
+                return False
+            if "speed" not in action:
+                action["speed"] = bare.pop(0)
+            if bare:
+                if "duration" in action:
+                    return False
+                action["duration"] = bare.pop(0)
+        speed = action.get("speed", 1.0)
+        meters = action.pop("_meters", None)
+        degrees = action.pop("_degrees", None)
+        if meters is not None:
+            if self.unit_speed is None or action["direction"] not in ("forward", "backward"):
+                return False
+            action["duration"] = meters / (self.unit_speed * speed)
+        if degrees is not None:
+            if self.turn_rate is None or action["direction"] not in ("left", "right"):
+                return False
+            action["duration"] = degrees / (self.turn_rate * speed)
+        if action["direction"] in ("stop",) + LED_DIRECTIONS:
+            # 정지/LED 에 붙은 숫자는 뜻을 알 수 없다
+            return "speed" not in action and "duration" not in action
+        # 범위를 벗어난 값은 잘라 쓰지 않는다 ("turn right 90" 의 90 은 속도가 아니라 각도일 것)
+        if "speed" in action and not _within(action["speed"], SPEED_LIMITS):
+            return False
+        if "duration" in action:
+            if not _within(action["duration"], DURATION_LIMITS):
+                return False
+            action["duration"] = round(action["duration"], 3)
+        return True
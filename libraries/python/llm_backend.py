@@ -0,0 +1,831 @@
+"""교체 가능한 LLM 백엔드 (OpenAI / 로컬 Ollama 호환 HTTP).
+
+두 컨트롤러가 같은 인터페이스로 LLM 을 호출한다.
+  - chat(): 한 번에 응답을 받아 ChatResult(content, tool_calls) 로 돌려준다.
+  - stream_tool_args(): 첫 번째 tool call 의 인자 문자열 조각을 생성한다.
+
+OllamaBackend 는 keep-alive HTTP 연결을 풀에 보관해 재사용하고,
+FallbackBackend 는 로컬 → 원격 순서로 시도해 실패하면 다음 백엔드로 넘어간다.
+ServiceBackend 는 여러 로봇이 공유하는 planning_service.py 프로세스에 요청을 넘긴다.
+ResilientBackend 는 어느 백엔드에든 마감 시간, 헤징, 회로 차단기를 씌운다.
+환경 변수로 구성한다 (create_backend 참고):
+  LLM_BACKEND=auto|ollama|openai, OLLAMA_HOST, OLLAMA_MODEL, OLLAMA_TIMEOUT, OLLAMA_POOL_SIZE,
+  OPENAI_MODEL, OPENAI_BASE_URL, OPENAI_TIMEOUT, PLANNING_SERVICE, PLANNING_TIMEOUT
+"""
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+from queue import LifoQueue, Queue, Empty
+from urllib.parse import urlsplit
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+ToolCall = namedtuple("ToolCall", "name arguments")      # arguments: JSON 문자열
+ChatResult = namedtuple("ChatResult", "content tool_calls backend latency")
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+class RateLimited(BackendError):
+    """공유 계획 서비스가 이 로봇의 요청 한도를 넘었다고 거절함 (폴백하지 않는다)"""
+
+
+def tools_from_functions(functions):
+    """레거시 functions 사양 → tools 사양"""
+    return [{"type": "function", "function": f} for f in functions]
+
+
+# 모델 동작에 영향이 없는 스키마 키 (프롬프트 토큰만 차지한다)
+_SCHEMA_NOISE = {"default", "title", "examples", "$schema"}
+
+
+def minify_tools(tools):
+    """tools 에서 default/title/examples 를 빼고 description 의 공백을 줄인다 (프롬프트 토큰 절약)"""
+    def strip(node):
+        if isinstance(node, dict):
+            return {k: (" ".join(v.split()) if k == "description" and isinstance(v, str) else strip(v))
+                    for k, v in node.items() if k not in _SCHEMA_NOISE}
+        if isinstance(node, list):
+            return [strip(v) for v in node]
+        return node
+    return [strip(t) for t in tools]
+
+
+class FrozenTools(list):
+    """직렬화를 한 번만 해 두는 tools 목록. 요청마다 스키마를 다시 인코딩하지 않는다"""
+
+    def __init__(self, tools):
+        super().__init__(tools)
+        self.json = json.dumps(tools, ensure_ascii=False, separators=(",", ":"))
+
+
+def freeze_tools(tools):
+    return tools if isinstance(tools, FrozenTools) else FrozenTools(tools)
+
+
+class LLMBackend:
+    name = "base"
+
+    def __init__(self, model, timeout):
+        self.model = model
+        self.timeout = timeout
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None) -> ChatResult:
+        raise NotImplementedError
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        """첫 tool call 인자 조각을 yield. 기본 구현은 chat() 결과를 한 번에 돌려준다"""
+        res = self.chat(messages, tools, tool_choice, temperature, max_tokens, timeout)
+        if res.tool_calls:
+            yield res.tool_calls[0].arguments
+
+    def warmup(self):
+        """연결(TLS 포함)을 미리 맺어 둔다. 실패해도 예외를 올리지 않는다"""
+        return False
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"{self.name}({self.model})"
+
+
+# ---------------- OpenAI ----------------
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, model, api_key=None, base_url=None, timeout=15.0, max_retries=0):
+        super().__init__(model, timeout)
+        if OpenAI is None:
+            raise BackendError("openai 패키지가 설치되지 않았습니다")
+        # 클라이언트 하나를 재사용 → 내부 httpx 연결 풀(keep-alive)을 공유
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+
+    def _kwargs(self, messages, tools, tool_choice, temperature, max_tokens, timeout):
+        kw = {"model": self.model, "messages": messages, "timeout": timeout or self.timeout}
+        if tools:
+            kw["tools"] = tools
+            if tool_choice:
+                kw["tool_choice"] = tool_choice
+        if temperature is not None:
+            kw["temperature"] = temperature
+        if max_tokens:
+            kw["max_completion_tokens"] = max_tokens
+        return kw
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        t0 = time.perf_counter()
+        resp = self.client.chat.completions.create(
+            **self._kwargs(messages, tools, tool_choice, temperature, max_tokens, timeout))
+        msg = resp.choices[0].message
+        calls = [ToolCall(tc.function.name, tc.function.arguments) for tc in (msg.tool_calls or [])]
+        return ChatResult(msg.content, calls, self.name, time.perf_counter() - t0)
+
+    def warmup(self):
+        try:
+            self.client.models.list()
+            return True
+        except Exception as e:
+            print(f"⚠️ {self} warm-up failed: {e}")
+            return False
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        stream = self.client.chat.completions.create(
+            stream=True, **self._kwargs(messages, tools, tool_choice, temperature, max_tokens, timeout))
+        try:
+            for chunk in stream:
+                if is_stale and is_stale():
+                    break
+                if not chunk.choices:
+                    continue
+                for tc in chunk.choices[0].delta.tool_calls or []:
+                    if tc.index == 0 and tc.function and tc.function.arguments:
+                        yield tc.function.arguments
+        finally:
+            stream.close()
+
+
+# ---------------- 로컬 Ollama 호환 HTTP ----------------
+
+class ConnectionPool:
+    """호스트 하나에 대한 keep-alive HTTPConnection 풀"""
+
+    def __init__(self, base_url, size=4, timeout=30.0):
+        u = urlsplit(base_url if "://" in base_url else f"http://{base_url}")
+        self.scheme, self.host = u.scheme, u.hostname
+        self.port = u.port or (443 if u.scheme == "https" else 80)
+        self.timeout = timeout
+        self._idle = LifoQueue(maxsize=size)
+        self.created = 0
+
+    def _new(self, timeout):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.created += 1
+        return cls(self.host, self.port, timeout=timeout)
+
+    def acquire(self, timeout=None):
+        try:
+            conn = self._idle.get_nowait()
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            return conn
+        except Empty:
+            return self._new(timeout or self.timeout)
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except Exception:
+            conn.close()
+
+    def request(self, method, path, body=None, timeout=None):
+        """요청을 보내고 (conn, response) 반환. 응답을 다 읽은 뒤 release(conn) 해야 한다.
+
+        재사용한 연결이 서버 쪽에서 닫혀 있으면 새 연결로 한 번 재시도한다.
+        """
+        if body is None or isinstance(body, bytes):
+            data = body
+        else:
+            data = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(2):
+            conn = self.acquire(timeout)
+            reused = conn.sock is not None
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused or attempt:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+class OllamaBackend(LLMBackend):
+    name = "ollama"
+
+    def __init__(self, model, host="http://127.0.0.1:11434", timeout=30.0, pool_size=4, keep_alive="10m"):
+        super().__init__(model, timeout)
+        self.pool = ConnectionPool(host, pool_size, timeout)
+        self.keep_alive = keep_alive
+
+    def _body(self, messages, tools, temperature, max_tokens, stream):
+        body = {"model": self.model, "messages": self._messages(messages), "stream": stream,
+                "keep_alive": self.keep_alive}
+        options = {}
+        if temperature is not None:
+            options["temperature"] = temperature
+        if max_tokens:
+            options["num_predict"] = max_tokens
+        if options:
+            body["options"] = options
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        if tools:
+            # 미리 직렬화된 tools 를 그대로 이어 붙인다
+            data = data[:-1] + b',"tools":' + freeze_tools(tools).json.encode("utf-8") + b"}"
+        return data
+
+    def warmup(self):
+        """모델을 메모리에 올리고 keep-alive 연결을 풀에 남겨 둔다"""
+        try:
+            body = json.dumps({"model": self.model, "keep_alive": self.keep_alive}).encode("utf-8")
+            conn, resp = self.pool.request("POST", "/api/generate", body)
+            resp.read()
+            self.pool.release(conn)
+            return resp.status == 200
+        except Exception as e:
+            print(f"⚠️ {self} warm-up failed: {e}")
+            return False
+
+    @staticmethod
+    def _messages(messages):
+        """OpenAI 형식 tool call 턴 → Ollama 형식 (인자는 JSON 문자열이 아니라 객체, tool 결과에는 함수 이름)"""
+        if not any(m.get("tool_calls") or m.get("role") == "tool" for m in messages):
+            return messages
+        names, out = {}, []
+        for m in messages:
+            if m.get("tool_calls"):
+                calls = []
+                for tc in m["tool_calls"]:
+                    fn = tc["function"]
+                    names[tc.get("id")] = fn["name"]
+                    args = fn.get("arguments")
+                    args = json.loads(args or "{}") if isinstance(args, str) else args
+                    calls.append({"function": {"name": fn["name"], "arguments": args}})
+                m = dict(m, tool_calls=calls)
+            elif m.get("role") == "tool":
+                m = {"role": "tool", "content": m.get("content") or "",
+                     "tool_name": names.get(m.get("tool_call_id"), "")}
+            out.append(m)
+        return out
+
+    @staticmethod
+    def _tool_calls(msg, tools):
+        calls = [ToolCall(tc["function"]["name"], _as_json(tc["function"].get("arguments")))
+                 for tc in msg.get("tool_calls") or []]
+        if not calls and tools:
+            # tool call 을 지원하지 않는 모델: 본문이 JSON 객체면 첫 tool 의 인자로 본다
+            content = (msg.get("content") or "").strip().strip("`")
+            if content.startswith("json"):
+                content = content[4:]
+            try:
+                if isinstance(json.loads(content), dict):
+                    calls = [ToolCall(tools[0]["function"]["name"], content.strip())]
+            except ValueError:
+                pass
+        return calls
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        t0 = time.perf_counter()
+        conn, resp = self.pool.request("POST", "/api/chat",
+                                       self._body(messages, tools, temperature, max_tokens, False), timeout)
+        try:
+            raw = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        self.pool.release(conn)
+        if resp.status != 200:
+            raise BackendError(f"ollama HTTP {resp.status}: {raw[:200]!r}")
+        msg = json.loads(raw).get("message") or {}
+        return ChatResult(msg.get("content"), self._tool_calls(msg, tools), self.name, time.perf_counter() - t0)
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        conn, resp = self.pool.request("POST", "/api/chat",
+                                       self._body(messages, tools, temperature, max_tokens, True), timeout)
+        if resp.status != 200:
+            raw = resp.read()
+            self.pool.release(conn)
+            raise BackendError(f"ollama HTTP {resp.status}: {raw[:200]!r}")
+        content = []
+        yielded = False
+        complete = False
+        try:
+            for line in resp:
+                if is_stale and is_stale():
+                    break
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                msg = chunk.get("message") or {}
+                for tc in msg.get("tool_calls") or []:
+                    yielded = True
+                    yield _as_json(tc["function"].get("arguments"))
+                    break
+                if msg.get("content"):
+                    content.append(msg["content"])
+                if chunk.get("done"):
+                    complete = True
+                    break
+        finally:
+            # 끝까지 읽은 응답만 연결을 재사용한다 (done 이후 남은 청크 종료부까지 소비)
+            if complete:
+                try:
+                    resp.read()
+                    self.pool.release(conn)
+                except Exception:
+                    conn.close()
+            else:
+                conn.close()
+        if not yielded and content:
+            calls = self._tool_calls({"content": "".join(content)}, tools)
+            if calls:
+                yield calls[0].arguments
+
+    def close(self):
+        self.pool.close()
+
+
+def _as_json(args):
+    return args if isinstance(args, str) else json.dumps(args or {}, ensure_ascii=False)
+
+
+# ---------------- 공유 계획 서비스 ----------------
+
+class ServiceBackend(LLMBackend):
+    """planning_service.py 프로세스에 요청을 넘기는 클라이언트.
+
+    연결(소켓)은 요청 하나가 끝날 때까지 독점하고, 응답을 끝까지 읽은 것만 풀에 돌려놓는다.
+    """
+    name = "service"
+
+    def __init__(self, address, client_id=None, timeout=30.0, pool_size=2):
+        super().__init__("service", timeout)
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.model = f"{self.address[0]}:{self.address[1]}"
+        self.client_id = client_id or os.getenv("PLANNING_CLIENT_ID") or f"pid{os.getpid()}"
+        self._idle = LifoQueue(maxsize=pool_size)
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout):
+        try:
+            sock, rfile = self._idle.get_nowait()
+            sock.settimeout(timeout)
+            return sock, rfile
+        except Empty:
+            sock = socket.create_connection(self.address, timeout=timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock, sock.makefile("rb")
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except Exception:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn):
+        for c in reversed(conn):
+            try:
+                c.close()
+            except OSError:
+                pass
+
+    def _request(self, op, messages=None, tools=None, is_stale=None, timeout=None, **params):
+        """요청을 보내고 응답 줄(dict)을 차례로 yield. 마지막은 done 또는 오류"""
+        timeout = timeout or self.timeout
+        with self._lock:
+            self._ids += 1
+            rid = self._ids
+        head = {"id": rid, "client": self.client_id, "op": op, "messages": messages, "timeout": timeout}
+        head.update((k, v) for k, v in params.items() if v is not None)
+        data = json.dumps(head, ensure_ascii=False).encode("utf-8")
+        if tools:
+            data = data[:-1] + b',"tools":' + freeze_tools(tools).json.encode("utf-8") + b"}"
+        for attempt in range(2):
+            conn = self._acquire(timeout)
+            try:
+                conn[0].sendall(data + b"\n")
+                line = conn[1].readline()
+                if line:
+                    break
+            except OSError:
+                pass
+            self._discard(conn)  # 서비스가 재시작돼 끊긴 유휴 연결이면 한 번 다시 연결
+            if attempt:
+                raise BackendError("planning service closed the connection")
+        complete = False
+        try:
+            while line:
+                msg = json.loads(line)
+                if "error" in msg:
+                    complete = True
+                    err = RateLimited if msg.get("code") == "rate_limited" else BackendError
+                    raise err(f"planning service {msg.get('code')}: {msg['error']}")
+                if msg.get("done"):
+                    complete = True
+                    yield msg
+                    return
+                yield msg
+                if is_stale and is_stale():
+                    return
+                line = conn[1].readline()
+            raise BackendError("planning service closed the connection")
+        finally:
+            # 중간에 그만둔 연결은 닫는다 → 서비스가 따라 읽는 쪽이 없으면 원 요청을 멈춘다
+            self._release(conn) if complete else self._discard(conn)
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        t0 = time.perf_counter()
+        for msg in self._request("chat", messages, tools, None, timeout, tool_choice=tool_choice,
+                                 temperature=temperature, max_tokens=max_tokens):
+            if msg.get("done"):
+                r = msg["result"]
+                return ChatResult(r.get("content"), [ToolCall(*tc) for tc in r.get("tool_calls") or []],
+                                  f"{self.name}/{r.get('backend')}", time.perf_counter() - t0)
+        raise BackendError("planning service returned no result")
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        for msg in self._request("stream", messages, tools, is_stale, timeout, tool_choice=tool_choice,
+                                 temperature=temperature, max_tokens=max_tokens):
+            if "piece" in msg:
+                yield msg["piece"]
+
+    def warmup(self):
+        try:
+            for _ in self._request("ping"):
+                pass
+            return True
+        except Exception as e:
+            print(f"⚠️ {self} warm-up failed: {e}")
+            return False
+
+    def stats(self):
+        for msg in self._request("stats"):
+            return msg.get("result")
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except Empty:
+                break
+
+
+# ---------------- 폴백 ----------------
+
+class FallbackBackend(LLMBackend):
+    """앞의 백엔드부터 시도하고 실패하면 다음으로. 실패한 백엔드는 cooldown 동안 건너뛴다"""
+    name = "fallback"
+
+    def __init__(self, backends, cooldown=30.0):
+        super().__init__("+".join(b.model for b in backends), max(b.timeout for b in backends))
+        self.backends = backends
+        self.cooldown = cooldown
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def _candidates(self):
+        now = time.monotonic()
+        with self._lock:
+            live = [b for b in self.backends if self._down_until.get(b.name, 0) <= now]
+        return live or self.backends[-1:]
+
+    def _mark_down(self, b, e):
+        print(f"⚠️ LLM backend {b} failed ({e}); falling back")
+        with self._lock:
+            self._down_until[b.name] = time.monotonic() + self.cooldown
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        err = None
+        for b in self._candidates():
+            try:
+                return b.chat(messages, tools, tool_choice, temperature, max_tokens, timeout)
+            except RateLimited:
+                raise
+            except Exception as e:
+                err = e
+                self._mark_down(b, e)
+        raise err
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        err = None
+        for b in self._candidates():
+            started = False
+            try:
+                for piece in b.stream_tool_args(messages, tools, tool_choice, temperature,
+                                                max_tokens, timeout, is_stale):
+                    started = True
+                    yield piece
+                return
+            except RateLimited:
+                raise
+            except Exception as e:
+                if started:
+                    raise  # 이미 일부를 내보냈으면 다른 백엔드로 이어 붙일 수 없다
+                err = e
+                self._mark_down(b, e)
+        raise err
+
+    def warmup(self):
+        ok = False
+        for b in self.backends:
+            if b.warmup():
+                ok = True
+            else:
+                self._mark_down(b, "warm-up failed")
+        return ok
+
+    def close(self):
+        for b in self.backends:
+            b.close()
+
+
+# ---------------- 마감 시간 / 헤징 / 회로 차단 ----------------
+
+class CircuitOpen(BackendError):
+    """회로 차단기가 열려 있어 백엔드를 부르지 않음 (호출 측은 바로 오프라인 경로로)"""
+
+
+class DeadlineExceeded(BackendError):
+    """호출 마감 시간 안에 응답이 오지 않음"""
+
+
+def _quantile(values, q):
+    v = sorted(values)
+    return v[min(len(v) - 1, int(q * (len(v) - 1) + 0.5))]
+
+
+class ResilientBackend(LLMBackend):
+    """백엔드 호출에 마감 시간, 헤징(중복 요청), 회로 차단기를 씌운다.
+
+      - deadline: 호출 하나가 쓸 수 있는 최대 시간 (s). 제어 루프가 기다릴 수 있는 시간에서
+        정하고, 각 시도의 timeout 도 남은 시간으로 줄인다.
+      - 헤징: 최근 성공 지연(첫 응답까지)의 p95 가 지나도 응답이 없으면 같은 요청을 한 번 더
+        보내고 먼저 온 쪽을 쓴다. 지연 샘플이 min_samples 개 모이기 전에는 헤징하지 않고,
+        헤지 요청 수는 전체 호출의 hedge_budget 비율로 제한한다.
+      - 회로 차단: 연속 failure_threshold 번 실패(오류/마감 초과)하면 cooldown 동안 호출하지
+        않고 바로 CircuitOpen 을 올린다. cooldown 뒤 시험 호출 하나가 성공하면 다시 닫힌다.
+    스트림은 첫 조각을 먼저 낸 시도로 확정하고 나머지 시도는 is_stale 로 멈춘다.
+    RateLimited 는 백엔드 고장이 아니므로 차단기에 세지 않는다.
+    """
+    name = "resilient"
+
+    def __init__(self, backend, deadline=8.0, failure_threshold=3, cooldown=20.0,
+                 hedge_budget=0.2, min_samples=8, min_hedge_delay=0.05, window=64):
+        super().__init__(backend.model, min(backend.timeout, deadline))
+        self.backend = backend
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_budget = hedge_budget
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self._latency = {"chat": deque(maxlen=window), "stream": deque(maxlen=window)}
+        self._lock = threading.Lock()
+        self.state = "closed"           # closed → open → half_open → closed/open
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.ok = 0
+        self.failed = 0
+        self.deadline_exceeded = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.short_circuited = 0
+        self.trips = 0
+
+    # ---------------- 회로 차단기 ----------------
+
+    def available(self):
+        """지금 호출하면 백엔드까지 갈 수 있는지 (열린 상태로 cooldown 중이면 False)"""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self._opened_at >= self.cooldown
+            return not (self.state == "half_open" and self._probing)
+
+    def _admit(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    self.short_circuited += 1
+                    raise CircuitOpen(f"{self.backend} circuit open")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    self.short_circuited += 1
+                    raise CircuitOpen(f"{self.backend} circuit half-open (probe in flight)")
+                self._probing = True
+            self.calls += 1
+
+    def _record(self, kind, latency=None, error=None):
+        with self._lock:
+            self._probing = False
+            if error is None:
+                self.ok += 1
+                self._failures = 0
+                self.state = "closed"
+                if latency is not None:
+                    self._latency[kind].append(latency)
+                return
+            self.failed += 1
+            if isinstance(error, DeadlineExceeded):
+                self.deadline_exceeded += 1
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"⚠️ LLM circuit open for {self.cooldown:.0f}s after {self._failures} failures ({error})")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def _hedge_delay(self, kind):
+        with self._lock:
+            samples = self._latency[kind]
+            # 이번 헤지까지 세어도 hedge_budget 비율을 넘지 않을 때만
+            if len(samples) < self.min_samples or self.hedged + 1 > self.hedge_budget * max(1, self.calls):
+                return None
+            return max(self.min_hedge_delay, _quantile(samples, 0.95))
+
+    # ---------------- 경주 ----------------
+
+    def _attempt(self, n, run, timeout, cancelled, out):
+        try:
+            for item in run(timeout, cancelled.is_set):
+                out.put((n, "item", item))
+                if cancelled.is_set():
+                    return
+            out.put((n, "done", None))
+        except Exception as e:
+            out.put((n, "error", e))
+
+    def _race(self, kind, run, timeout=None):
+        """run(timeout, is_stale) 이 내는 항목을 먼저 응답한 시도에서 yield"""
+        self._admit()
+        start = time.monotonic()
+        end = start + min(timeout or self.deadline, self.deadline)
+        out = Queue()
+        attempts = []
+
+        def launch():
+            flag = threading.Event()
+            attempts.append(flag)
+            threading.Thread(target=self._attempt, name=f"llm-{kind}-{len(attempts)}", daemon=True,
+                             args=(len(attempts) - 1, run, max(0.1, end - time.monotonic()), flag, out)).start()
+
+        launch()
+        hedge_at = self._hedge_delay(kind)
+        hedge_at = start + hedge_at if hedge_at is not None and start + hedge_at < end else None
+        winner, failed, outcome = None, 0, None
+        try:
+            while True:
+                now = time.monotonic()
+                if hedge_at is not None and winner is None and now >= hedge_at:
+                    hedge_at = None
+                    if end - now > self.min_hedge_delay:
+                        with self._lock:
+                            self.hedged += 1
+                        launch()
+                wait = end - now
+                if hedge_at is not None:
+                    wait = min(wait, hedge_at - now)
+                if wait <= 0 and hedge_at is None:
+                    outcome = DeadlineExceeded(f"{self.backend} no response within {end - start:.1f}s")
+                    raise outcome
+                try:
+                    n, what, value = out.get(timeout=max(0.0, wait))
+                except Empty:
+                    continue
+                if winner is not None and n != winner:
+                    continue
+                if what == "error":
+                    # 확정된 시도가 실패했거나 살아 있는 시도가 없으면 바로 실패 (재시도는 하지 않는다)
+                    failed += 1
+                    if winner is not None or failed == len(attempts):
+                        outcome = value
+                        raise value
+                    continue
+                if winner is None:
+                    winner = n
+                    latency = time.monotonic() - start
+                    for i, flag in enumerate(attempts):
+                        if i != n:
+                            flag.set()
+                    if n > 0:
+                        with self._lock:
+                            self.hedge_wins += 1
+                if what == "done":
+                    outcome = True
+                    return
+                yield value
+        finally:
+            for flag in attempts:
+                flag.set()
+            if outcome is True:
+                self._record(kind, latency)
+            elif isinstance(outcome, RateLimited):
+                self._record(kind)
+            elif outcome is not None:
+                self._record(kind, error=outcome)
+            else:
+                with self._lock:       # 호출 측이 중간에 그만둠: 성공/실패로 세지 않는다
+                    self._probing = False
+
+    # ---------------- LLMBackend ----------------
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        def run(t, is_stale):
+            yield self.backend.chat(messages, tools, tool_choice, temperature, max_tokens, t)
+        res = None
+        for res in self._race("chat", run, timeout):
+            pass    # 끝까지 읽어야 성공으로 기록된다
+        if res is None:
+            raise BackendError(f"{self.backend} returned no result")
+        return res
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        def run(t, cancelled):
+            stale = (lambda: cancelled() or is_stale()) if is_stale else cancelled
+            return self.backend.stream_tool_args(messages, tools, tool_choice, temperature,
+                                                 max_tokens, t, stale)
+        yield from self._race("stream", run, timeout)
+
+    def warmup(self):
+        return self.backend.warmup()
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self):
+        with self._lock:
+            p95 = {k: round(_quantile(v, 0.95) * 1000) for k, v in self._latency.items() if v}
+            return {
+                "state": self.state, "calls": self.calls, "ok": self.ok, "failed": self.failed,
+                "deadline_exceeded": self.deadline_exceeded, "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins, "short_circuited": self.short_circuited,
+                "trips": self.trips, "p95_ms": p95,
+            }
+
+    def __repr__(self):
+        return f"{self.backend!r}[deadline={self.deadline:.1f}s]"
+
+
+# ---------------- 생성 ----------------
+
+def create_backend(openai_model=None, ollama_model=None, kind=None, service=None,
+                   client_id=None, pool_size=None):
+    """환경 변수로 백엔드 구성. 사용할 수 있는 백엔드가 없으면 None
+
+    PLANNING_SERVICE=host:port 가 있으면 공유 계획 서비스를 먼저 쓰고, 서비스가 죽어 있으면
+    직접 호출로 폴백한다. service=False 는 서비스 프로세스 자신이 쓴다.
+    """
+    kind = (kind or os.getenv("LLM_BACKEND", "auto")).lower()
+    address = os.getenv("PLANNING_SERVICE") if service is not False else None
+    backends = []
+    if address:
+        backends.append(ServiceBackend(address, client_id, timeout=float(os.getenv("PLANNING_TIMEOUT", "30"))))
+    if kind in ("auto", "ollama"):
+        backends.append(OllamaBackend(
+            ollama_model or os.getenv("OLLAMA_MODEL", "qwen2.5:7b"),
+            host=os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434"),
+            timeout=float(os.getenv("OLLAMA_TIMEOUT", "30")),
+            pool_size=pool_size or int(os.getenv("OLLAMA_POOL_SIZE", "4")),
+        ))
+    if kind in ("auto", "openai"):
+        try:
+            backends.append(OpenAIBackend(
+                openai_model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                timeout=float(os.getenv("OPENAI_TIMEOUT", "15")),
+            ))
+        except Exception as e:
+            print(f"⚠️ OpenAI backend unavailable: {e}")
+    if not backends:
+        return None
+    return backends[0] if len(backends) == 1 else FallbackBackend(backends)
@@ -0,0 +1,90 @@
+"""LLM 플래너 비동기 워커.
+
+robot.step 루프가 LLM 왕복 시간 동안 멈추지 않도록 계획 요청을 스레드 풀에서
+처리한다. 메인 루프는 매 스텝 poll()로 끝난 결과만 가져간다.
+새 명령이 들어오면 아직 끝나지 않은 이전 요청은 stale 로 표시되어
+(대기 중이면 취소, 실행 중이면 결과 폐기) 오래된 계획이 실행되지 않는다.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
+
+
+class PlannerWorker:
+    def __init__(self, plan_fn, max_workers=2, cancel_stale=True):
+        """plan_fn(utterance, is_stale) -> plan
+
+        is_stale 은 인자 없는 함수로, 더 새로운 요청이 들어와 현재 요청이
+        무의미해졌으면 True 를 돌려준다. 긴 호출 도중 중단 지점으로 쓰면 된다.
+        """
+        self._plan_fn = plan_fn
+        self._cancel_stale = cancel_stale
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="planner")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = {}
+        self._stale = set()
+        self._done = Queue()
+
+    def submit(self, utterance):
+        """발화를 비동기로 계획한다. concurrent.futures.Future 를 돌려준다."""
+        with self._lock:
+            self._generation += 1
+            gen = self._generation
+            if self._cancel_stale:
+                self._supersede_locked()
+            submitted = time.perf_counter()
+            fut = self._pool.submit(self._plan_fn, utterance, lambda: self.is_stale(gen))
+            self._pending[gen] = fut
+        fut.add_done_callback(lambda f: self._done.put((gen, utterance, submitted, f)))
+        return fut
+
+    def supersede(self):
+        """아직 끝나지 않은 요청을 모두 stale 로 만든다 (캐시 적중 등으로 대체됐을 때)."""
+        with self._lock:
+            self._supersede_locked()
+
+    def _supersede_locked(self):
+        for g, f in self._pending.items():
+            if not f.done():
+                f.cancel()
+                self._stale.add(g)
+
+    def is_stale(self, gen):
+        return gen in self._stale
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for f in self._pending.values() if not f.done())
+
+    def poll(self):
+        """완료된 (utterance, plan, latency_s) 목록. 블로킹하지 않는다.
+
+        취소됐거나 stale 인 요청, 예외로 끝난 요청은 건너뛴다.
+        """
+        results = []
+        while True:
+            try:
+                gen, utterance, submitted, fut = self._done.get_nowait()
+            except Empty:
+                break
+            with self._lock:
+                self._pending.pop(gen, None)
+                stale = gen in self._stale
+                self._stale.discard(gen)
+            if fut.cancelled() or stale:
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                print(f"⚠️ planner error: {exc}")
+                continue
+            results.append((utterance, fut.result(), time.perf_counter() - submitted))
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            for f in self._pending.values():
+                f.cancel()
+        self._pool.shutdown(wait=False)
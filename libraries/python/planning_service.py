@@ -0,0 +1,330 @@
+"""여러 로봇 컨트롤러가 공유하는 로컬 계획(LLM) 서비스.
+
+컨트롤러마다 LLM 클라이언트를 만들고 한 번에 하나씩 호출하는 대신, 이 프로세스
+하나가 백엔드(keep-alive 연결 풀)를 들고 모든 로봇의 요청을 받아 처리한다.
+  - 동시 처리: 최대 concurrency 개의 요청을 같은 연결 풀 위에서 동시에 보낸다.
+    자리가 없으면 로봇별 대기열에 쌓고 라운드 로빈으로 꺼내 한 로봇이 독점하지 못한다.
+  - 중복 제거: 같은 (messages, tools, 파라미터) 요청이 이미 처리 중이면 새로 보내지 않고
+    그 결과(스트림 조각 포함)를 함께 받는다.
+  - 로봇별 rate limit: 토큰 버킷 (rate 개/초, burst 개). 초과하면 rate_limited 응답.
+
+프로토콜: TCP(localhost) 위의 줄 단위 JSON. 연결 하나에서 요청을 순서대로 처리한다.
+  요청  {"id", "client", "op": "chat"|"stream"|"ping"|"stats", "messages", "tools", ...}
+  응답  stream 은 {"id", "piece"} 여러 줄 뒤 {"id", "done": true, "shared"}
+        chat 은 {"id", "done": true, "result": {...}, "shared"}
+        오류는 {"id", "error", "code"}  (code: rate_limited / backend / bad_request)
+
+    python libraries/python/planning_service.py --port 8770
+    PLANNING_SERVICE=127.0.0.1:8770   # 컨트롤러 쪽 (create_backend 가 ServiceBackend 를 쓴다)
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from llm_backend import create_backend, FrozenTools  # noqa: E402
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+
+    def take(self):
+        """토큰 하나를 쓴다. (허용 여부, 다음 토큰까지 남은 초)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True, 0.0
+        return False, (1.0 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class _Flight:
+    """처리 중인 요청 하나. 같은 키로 들어온 모든 연결이 이 결과를 따라 읽는다"""
+
+    def __init__(self, key, client, op, req):
+        self.key = key
+        self.client = client
+        self.op = op
+        self.req = req
+        self.pieces = []
+        self.result = None
+        self.error = None
+        self.done = False
+        self.followers = 0
+        self.cond = threading.Condition()
+
+    def push(self, piece):
+        with self.cond:
+            self.pieces.append(piece)
+            self.cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self.cond:
+            self.result, self.error, self.done = result, error, True
+            self.cond.notify_all()
+
+    def abandoned(self):
+        return self.followers <= 0
+
+    def follow(self, timeout):
+        """지금까지의 조각부터 차례로 yield. 끝나면 return (오류는 self.error 로 확인)"""
+        i = 0
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.cond:
+                while i >= len(self.pieces) and not self.done:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise TimeoutError("planning request timed out")
+                    self.cond.wait(left)
+                new, finished = self.pieces[i:], self.done
+            i += len(new)
+            yield from new
+            if finished and i >= len(self.pieces):
+                return
+
+
+class PlanningService:
+    def __init__(self, backend, concurrency=4, rate=2.0, burst=5, timeout=30.0):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="plan-svc")
+        self._lock = threading.Condition()
+        self._inflight = {}
+        self._waiting = OrderedDict()       # client → deque[_Flight]
+        self._running = 0
+        self._buckets = {}
+        self._tools = {}
+        self._closed = False
+        self.counts = {"requests": 0, "dispatched": 0, "shared": 0, "rate_limited": 0, "errors": 0}
+        self._dispatcher = threading.Thread(target=self._dispatch, name="plan-svc-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    # ---------------- 요청 접수 ----------------
+
+    def allow(self, client):
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            ok, retry = bucket.take()
+            if not ok:
+                self.counts["rate_limited"] += 1
+            return ok, retry
+
+    def join(self, client, op, req):
+        """요청을 처리 중인 같은 요청에 합치거나 새로 대기열에 넣는다. (_Flight, shared)"""
+        tools = req.get("tools")
+        tools_json = json.dumps(tools, ensure_ascii=False, separators=(",", ":")) if tools else ""
+        params = [op, req.get("tool_choice"), req.get("temperature"), req.get("max_tokens")]
+        h = hashlib.sha1(json.dumps([params, req.get("messages")], ensure_ascii=False,
+                                    separators=(",", ":")).encode("utf-8"))
+        h.update(tools_json.encode("utf-8"))
+        key = h.hexdigest()
+        with self._lock:
+            self.counts["requests"] += 1
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.counts["shared"] += 1
+                return flight, True
+            if tools_json:
+                # 같은 스키마는 한 번만 직렬화해 백엔드가 그대로 재사용한다
+                frozen = self._tools.get(tools_json)
+                if frozen is None:
+                    frozen = self._tools[tools_json] = FrozenTools(tools)
+                req["tools"] = frozen
+            flight = self._inflight[key] = _Flight(key, client, op, req)
+            flight.followers = 1
+            self._waiting.setdefault(client, deque()).append(flight)
+            self._lock.notify()
+            return flight, False
+
+    def leave(self, flight):
+        with self._lock:
+            flight.followers -= 1
+
+    # ---------------- 디스패치 ----------------
+
+    def _next_locked(self):
+        """대기 중인 로봇을 돌아가며 하나씩 꺼낸다"""
+        client, queue = next(iter(self._waiting.items()))
+        flight = queue.popleft()
+        del self._waiting[client]
+        if queue:
+            self._waiting[client] = queue  # 맨 뒤로 보내 다음 로봇에게 차례를 준다
+        return flight
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                while not self._closed and (not self._waiting or self._running >= self.concurrency):
+                    self._lock.wait()
+                if self._closed:
+                    return
+                flight = self._next_locked()
+                if flight.abandoned():
+                    self._inflight.pop(flight.key, None)
+                    flight.finish(error="cancelled")
+                    continue
+                self._running += 1
+                self.counts["dispatched"] += 1
+            self._pool.submit(self._run, flight)
+
+    def _run(self, flight):
+        r = flight.req
+        args = (r.get("messages") or [], r.get("tools"), r.get("tool_choice"), r.get("temperature"),
+                r.get("max_tokens"), r.get("timeout"))
+        try:
+            if flight.op == "stream":
+                for piece in self.backend.stream_tool_args(*args, is_stale=flight.abandoned):
+                    flight.push(piece)
+                flight.finish()
+            else:
+                res = self.backend.chat(*args)
+                flight.finish({"content": res.content, "tool_calls": [list(tc) for tc in res.tool_calls],
+                               "backend": res.backend, "latency": res.latency})
+        except Exception as e:
+            with self._lock:
+                self.counts["errors"] += 1
+            flight.finish(error=str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                if self._inflight.get(flight.key) is flight:
+                    del self._inflight[flight.key]
+                self._running -= 1
+                self._lock.notify()
+
+    # ---------------- 기타 ----------------
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, in_flight=len(self._inflight), running=self._running,
+                        waiting=sum(len(q) for q in self._waiting.values()), clients=len(self._buckets))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._pool.shutdown(wait=False)
+        self.backend.close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    service = None
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _send(self, obj):
+        self.wfile.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        svc = self.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                req = json.loads(line)
+            except ValueError as e:
+                self._send({"error": f"bad json: {e}", "code": "bad_request"})
+                continue
+            rid, op = req.get("id"), req.get("op", "chat")
+            if op == "ping":
+                self._send({"id": rid, "done": True, "result": {"backend": repr(svc.backend)}})
+                continue
+            if op == "stats":
+                self._send({"id": rid, "done": True, "result": svc.stats()})
+                continue
+            if op not in ("chat", "stream"):
+                self._send({"id": rid, "error": f"unknown op: {op}", "code": "bad_request"})
+                continue
+            client = str(req.get("client") or self.client_address[0])
+            ok, retry = svc.allow(client)
+            if not ok:
+                self._send({"id": rid, "error": "rate limited", "code": "rate_limited",
+                            "retry_after": round(retry, 3)})
+                continue
+            flight, shared = svc.join(client, op, req)
+            try:
+                for piece in flight.follow(float(req.get("timeout") or svc.timeout)):
+                    self._send({"id": rid, "piece": piece})
+                if flight.error:
+                    self._send({"id": rid, "error": flight.error, "code": "backend"})
+                else:
+                    self._send({"id": rid, "done": True, "result": flight.result, "shared": shared})
+            except TimeoutError as e:
+                self._send({"id": rid, "error": str(e), "code": "timeout"})
+            finally:
+                svc.leave(flight)
+
+
+class PlanningServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(service, host="127.0.0.1", port=8770):
+    handler = type("Handler", (_Handler,), {"service": service})
+    return PlanningServer((host, port), handler)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8770)
+    ap.add_argument("--concurrency", type=int, default=int(os.getenv("PLANNING_CONCURRENCY", "4")),
+                    help="동시에 백엔드로 보낼 요청 수")
+    ap.add_argument("--rate", type=float, default=float(os.getenv("PLANNING_RATE", "2")),
+                    help="로봇별 초당 요청 수")
+    ap.add_argument("--burst", type=int, default=int(os.getenv("PLANNING_BURST", "5")),
+                    help="로봇별 순간 최대 요청 수")
+    ap.add_argument("--stats-every", type=float, default=30.0, help="통계 출력 주기 (초, 0 이면 끔)")
+    a = ap.parse_args()
+    try:
+        import dotenv
+        dotenv.load_dotenv()
+    except ImportError:
+        pass
+    backend = create_backend(service=False, pool_size=a.concurrency)
+    if backend is None:
+        sys.exit("사용할 수 있는 LLM 백엔드가 없습니다")
+    backend.warmup()
+    service = PlanningService(backend, a.concurrency, a.rate, a.burst)
+    server = make_server(service, a.host, a.port)
+    print(f"planning service on {a.host}:{a.port} → {backend}")
+    if a.stats_every > 0:
+        def report():
+            while True:
+                time.sleep(a.stats_every)
+                print(f"📊 {service.stats()}")
+        threading.Thread(target=report, name="plan-svc-stats", daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""다중 거리 센서 → 바퀴 속도 반응형 조향 (퍼텐셜 필드 / Braitenberg).
+
+로봇의 모든 DistanceSensor 를 찾아 켜고, 매 스텝 값을 배열 하나로 읽어
+  1) 센서의 lookup table 을 뒤집어 원시 값 → 거리(m) 로 바꾸고 (같은 표를 쓰는 센서끼리 한 번에 보간)
+  2) 거리 → 근접도 p = clip((influence - d) / (influence - stop_distance), 0, 1)
+  3) 센서 방향 θ (로봇 기준, 왼쪽 +) 로 미리 만든 가중치와 곱해
+        front = max(p * max(cos θ, 0))               정면 장애물 정도 → 감속
+        ω     = Σ p * (-turn_gain * sin θ) ± front       왼쪽 장애물이면 오른쪽으로 (좌우가 비기면 bias 방향)
+        v_l, v_r = speed * (1 - brake * front) ∓ ω
+바퀴 속도를 낸다. 센서 수와 무관하게 스텝당 배열 연산 몇 번이고, 센서 API 호출만 센서 수에 비례한다.
+NumPy 가 없으면 같은 식을 순수 Python 으로 계산한다 (센서가 몇 개일 때는 충분히 빠르다).
+
+센서 방향은 angles({이름: 라디안}, parse_angles 참고) 로 주거나, Supervisor 면 장치 노드의 rotation 에서 읽는다.
+둘 다 없으면 정면(0) 으로 본다.
+"""
+import bisect
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def find_distance_sensors(robot, node_type, names=None):
+    """getNodeType() 이 node_type (controller.Node.DISTANCE_SENSOR) 인 장치 목록"""
+    out = []
+    for i in range(robot.getNumberOfDevices()):
+        dev = robot.getDeviceByIndex(i)
+        if dev.getNodeType() == node_type and (names is None or dev.getName() in names):
+            out.append(dev)
+    return out
+
+
+def sensor_heading(robot, device, default=0.0):
+    """장치 노드 rotation 으로 센서 광선(+x)이 향하는 방향 (라디안, 왼쪽 +). Supervisor 가 아니면 default"""
+    get_node = getattr(robot, "getFromDevice", None)
+    if get_node is None:
+        return default
+    try:
+        kx, ky, kz, a = get_node(device).getField("rotation").getSFRotation()
+    except Exception:
+        return default
+    norm = math.sqrt(kx * kx + ky * ky + kz * kz) or 1.0
+    kx, ky, kz = kx / norm, ky / norm, kz / norm
+    # 축-각 회전으로 x 축을 돌린 벡터의 수평 방향
+    rx = math.cos(a) + (1 - math.cos(a)) * kx * kx
+    ry = math.sin(a) * kz + (1 - math.cos(a)) * kx * ky
+    return math.atan2(ry, rx)
+
+
+def parse_angles(text):
+    """"DS_0:0,DS_1:30,DS_2:-30" (도) → {이름: 라디안}. 빈 문자열이면 {}"""
+    out = {}
+    for item in (text or "").split(","):
+        name, _, deg = item.strip().rpartition(":")
+        if name:
+            out[name] = math.radians(float(deg))
+    return out
+
+
+def inverse_table(table):
+    """getLookupTable() 의 [거리, 값, 잡음]* → (값 오름차순, 대응 거리). 표가 없으면 None"""
+    rows = [table[i:i + 3] for i in range(0, len(table) - 2, 3)]
+    if len(rows) < 2:
+        return None
+    pairs = sorted((v, d) for d, v, _ in rows)
+    return tuple(v for v, _ in pairs), tuple(d for _, d in pairs)
+
+
+def _interp(x, xs, ys):
+    """np.interp 와 같은 선형 보간 (끝 값 유지)"""
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    i = bisect.bisect_right(xs, x)
+    x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0) if x1 > x0 else y1
+
+
+class ReactiveSteering:
+    def __init__(self, devices, headings=None, influence=0.5, stop_distance=0.1, turn_gain=2.0,
+                 brake=1.0, bias=1.0, max_speed=None, raw_scale=0.001):
+        """devices: 켜 둔 DistanceSensor 목록, headings: 센서별 방향 (라디안, 왼쪽 +)
+        influence: 이보다 먼 장애물은 무시 (m), stop_distance: 근접도 1 이 되는 거리 (m)
+        bias: 정면 장애물일 때 도는 방향 (+1 왼쪽, -1 오른쪽), raw_scale: 표가 없는 센서 값 → m"""
+        self.devices = list(devices)
+        self.names = [d.getName() for d in self.devices]
+        headings = list(headings) if headings is not None else [0.0] * len(self.devices)
+        self.influence = influence
+        self.stop_distance = stop_distance
+        self.brake = brake
+        self.bias = bias
+        self.max_speed = max_speed
+        self.raw_scale = raw_scale
+        # 같은 lookup table 을 쓰는 센서끼리 묶어 한 번에 보간
+        groups = {}
+        for i, d in enumerate(self.devices):
+            table = inverse_table(list(d.getLookupTable()) if hasattr(d, "getLookupTable") else [])
+            groups.setdefault(table, []).append(i)
+        self._groups = list(groups.items())
+        front = [max(math.cos(h), 0.0) for h in headings]
+        turn = [-turn_gain * math.sin(h) for h in headings]
+        if np is not None:
+            self._front = np.array(front)
+            self._turn = np.array(turn)
+            self._groups = [(t, np.array(idx)) for t, idx in self._groups]
+        else:
+            self._front, self._turn = front, turn
+        self.raw = None
+        self.distances = None
+        self.nearest = math.inf
+        self.reads = 0
+        self.compute_time = 0.0
+
+    @classmethod
+    def from_robot(cls, robot, timestep, node_type, angles=None, names=None, **kwargs):
+        """로봇의 DistanceSensor 를 모두 켜고 방향을 정해 만든다. 센서가 없으면 None"""
+        devices = find_distance_sensors(robot, node_type, names)
+        if not devices:
+            return None
+        for d in devices:
+            d.enable(timestep)
+        angles = angles or {}
+        headings = [angles[d.getName()] if d.getName() in angles else sensor_heading(robot, d)
+                    for d in devices]
+        return cls(devices, headings, **kwargs)
+
+    # ---------------- 인지 ----------------
+
+    def read(self):
+        """모든 센서 값 → 거리 (m). 가장 가까운 거리는 nearest"""
+        raw = [d.getValue() for d in self.devices]
+        t0 = time.perf_counter()
+        if np is not None:
+            raw = np.asarray(raw, dtype=float)
+            dist = np.empty_like(raw)
+            for table, idx in self._groups:
+                dist[idx] = raw[idx] * self.raw_scale if table is None else np.interp(raw[idx], *table)
+            self.nearest = float(dist.min()) if len(dist) else math.inf
+        else:
+            dist = [0.0] * len(raw)
+            for table, idx in self._groups:
+                for i in idx:
+                    dist[i] = raw[i] * self.raw_scale if table is None else _interp(raw[i], *table)
+            self.nearest = min(dist, default=math.inf)
+        self.raw, self.distances = raw, dist
+        self.reads += 1
+        self.compute_time += time.perf_counter() - t0
+        return dist
+
+    # ---------------- 조향 ----------------
+
+    def mix(self, speed):
+        """마지막으로 읽은 거리로 (왼쪽 바퀴, 오른쪽 바퀴) 속도"""
+        if self.distances is None:
+            return speed, speed
+        t0 = time.perf_counter()
+        span = max(self.influence - self.stop_distance, 1e-6)
+        if np is not None:
+            p = np.clip((self.influence - self.distances) / span, 0.0, 1.0)
+            front = float((p * self._front).max()) if len(p) else 0.0
+            omega = float(p @ self._turn)
+        else:
+            p = [min(1.0, max(0.0, (self.influence - d) / span)) for d in self.distances]
+            front = max((a * b for a, b in zip(p, self._front)), default=0.0)
+            omega = sum(a * b for a, b in zip(p, self._turn))
+        # 정면이 막힐수록 이미 정해진 방향으로 더 세게 돈다. 좌우가 비슷하면 bias 방향으로
+        side = math.copysign(1.0, omega) if abs(omega) > 1e-3 else self.bias
+        omega = (omega + side * front) * abs(speed)
+        v = speed * (1.0 - self.brake * front)
+        left, right = v - omega, v + omega
+        if self.max_speed:
+            left = max(-self.max_speed, min(self.max_speed, left))
+            right = max(-self.max_speed, min(self.max_speed, right))
+        self.compute_time += time.perf_counter() - t0
+        return left, right
+
+    def command(self, speed):
+        """센서를 읽고 바로 바퀴 속도 계산"""
+        self.read()
+        return self.mix(speed)
+
+    def stats(self):
+        return {
+            "sensors": len(self.devices), "reads": self.reads, "numpy": np is not None,
+            "mean_us": round(self.compute_time / self.reads * 1e6, 1) if self.reads else 0.0,
+        }
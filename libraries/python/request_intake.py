@@ -0,0 +1,82 @@
+"""WWI 발화 접수: 묶기(debounce) + 중복/초과 제거 + 백프레셔.
+
+발화가 짧은 간격으로 몰려 들어오면 LLM 을 발화마다 부르지 않고, 마지막 발화 뒤
+window 초 동안 새 발화가 없을 때(또는 첫 발화 뒤 max_wait 초, max_batch 개가 모였을 때)
+모인 발화를 순서대로 이어 붙여 요청 하나로 넘긴다. 이전 요청이 처리 중이면 끝날 때까지
+모아 두었다가 한 번에 넘기므로 LLM 호출 수는 발화 수가 아니라 처리 속도에 맞춰진다.
+
+대기 중인 발화는 max_pending 개까지만 둔다. 같은 발화가 다시 오면 새 것은 버리고,
+넘치면 가장 오래된 발화(새 발화로 대체된 것)를 버린 뒤 그 사실을 답장으로 알린다.
+"""
+import time
+from collections import deque
+
+
+def _key(message):
+    return " ".join(message.lower().split())
+
+
+class RequestIntake:
+    def __init__(self, window=0.3, max_wait=1.0, max_batch=4, max_pending=6, joiner=", 그 다음 "):
+        self.window = window
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.joiner = joiner
+        self.pending = deque()            # (발화, 받은 시각)
+        self._last = 0.0
+        self.received = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.dropped_duplicate = 0
+        self.dropped_overflow = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def offer(self, message, now=None):
+        """발화 접수. 버린 발화가 있으면 답장할 안내 문자열, 아니면 None"""
+        now = time.monotonic() if now is None else now
+        self.received += 1
+        key = _key(message)
+        if any(_key(m) == key for m, _ in self.pending):
+            self.dropped_duplicate += 1
+            return f"같은 명령이 이미 대기 중이라 무시했습니다: {message}"
+        reply = None
+        if len(self.pending) >= self.max_pending:
+            old, _ = self.pending.popleft()
+            self.dropped_overflow += 1
+            reply = f"대기 명령이 너무 많아 가장 오래된 명령을 버렸습니다: {old}"
+        self.pending.append((message, now))
+        self._last = now
+        return reply
+
+    def take(self, busy=False, now=None):
+        """보낼 차례가 된 묶음 (발화 목록) 또는 None. busy 면 (처리 중인 요청이 있으면) 계속 모은다"""
+        if not self.pending or busy:
+            return None
+        now = time.monotonic() if now is None else now
+        first = self.pending[0][1]
+        if (now - self._last < self.window and now - first < self.max_wait
+                and len(self.pending) < self.max_batch):
+            return None
+        batch = [self.pending.popleft()[0] for _ in range(min(self.max_batch, len(self.pending)))]
+        self.batches += 1
+        self.coalesced += len(batch) - 1
+        return batch
+
+    def join(self, batch):
+        return self.joiner.join(batch)
+
+    def clear(self):
+        """대기 중인 발화를 모두 버린다 (정지 명령 등). 버린 개수"""
+        n = len(self.pending)
+        self.pending.clear()
+        return n
+
+    def stats(self):
+        return {
+            "received": self.received, "batches": self.batches, "coalesced": self.coalesced,
+            "dropped_duplicate": self.dropped_duplicate, "dropped_overflow": self.dropped_overflow,
+            "pending": len(self.pending),
+        }
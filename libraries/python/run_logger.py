@@ -0,0 +1,154 @@
+"""버퍼링 백그라운드 로그 기록기.
+
+log() 는 (시각, 종류, 데이터) 튜플을 메모리 링 버퍼에 넣기만 하고 바로
+돌아온다. 직렬화와 파일 쓰기는 백그라운드 스레드가 모아서 처리하며,
+버퍼가 flush_size 만큼 차거나 flush_interval 이 지나거나 종료될 때 비운다.
+
+파일은 날짜별 `rollout_YYYYMMDD.jsonl` 로 나뉘고, max_bytes 를 넘으면
+`rollout_YYYYMMDD.1.jsonl`, `.2` ... 로 회전한다.
+binary=True 이고 msgpack 이 설치돼 있으면 `.msgpack` 으로 기록한다.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class RunLogger:
+    def __init__(self, log_dir="logs", prefix="rollout", capacity=10000, flush_size=256,
+                 flush_interval=1.0, max_bytes=50 * 1024 * 1024, binary=False):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.binary = binary and msgpack is not None
+        if binary and msgpack is None:
+            print("⚠️ msgpack 미설치: JSONL 로 기록합니다")
+        self.ext = "msgpack" if self.binary else "jsonl"
+
+        self._buf = deque(maxlen=capacity)  # 가득 차면 가장 오래된 항목부터 버림
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self.written = 0
+        self._day = None
+        self._index = 0
+        self._file = None
+
+        os.makedirs(log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="run-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, kind: str, data: dict = None):
+        """핫패스용: 버퍼에 추가만 한다 (직렬화/IO 없음).
+
+        data 는 나중에 직렬화되므로 호출 뒤에 변경하지 않아야 한다.
+        """
+        item = (time.time(), kind, data)
+        with self._cond:
+            if len(self._buf) == self._buf.maxlen:
+                self.dropped += 1
+            self._buf.append(item)
+            if len(self._buf) >= self.flush_size:
+                self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5.0)
+
+    @property
+    def path(self):
+        return self._path(self._day or self._today(time.time()), self._index)
+
+    # ---------------- 백그라운드 ----------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buf) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                batch = list(self._buf)
+                self._buf.clear()
+                closed = self._closed
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    print(f"⚠️ log write failed: {e}")
+            if closed:
+                break
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch):
+        by_day = {}
+        for item in batch:
+            by_day.setdefault(self._today(item[0]), []).append(item)
+        for day, items in by_day.items():
+            f = self._open(day)
+            size = f.tell()
+            chunk = []
+            for item in items:
+                b = self._encode(item)
+                if self.max_bytes and size > 0 and size + len(b) > self.max_bytes:
+                    f.write(b"".join(chunk))
+                    chunk = []
+                    f = self._rotate()
+                    size = 0
+                chunk.append(b)
+                size += len(b)
+            f.write(b"".join(chunk))
+            f.flush()
+            self.written += len(items)
+
+    def _encode(self, item):
+        t, kind, data = item
+        entry = {"t": datetime.fromtimestamp(t, timezone.utc).isoformat(), "kind": kind, **(data or {})}
+        if self.binary:
+            return msgpack.packb(entry, use_bin_type=True, default=str)
+        return (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def _open(self, day):
+        if day != self._day:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._day, self._index = day, 0
+            while os.path.exists(self._path(day, self._index + 1)):
+                self._index += 1
+        if self._file is None:
+            self._file = open(self._path(day, self._index), "ab")
+        return self._file
+
+    def _rotate(self):
+        self._file.close()
+        self._index += 1
+        self._file = open(self._path(self._day, self._index), "ab")
+        return self._file
+
+    def _path(self, day, index):
+        name = f"{self.prefix}_{day}" + (f".{index}" if index else "") + f".{self.ext}"
+        return os.path.join(self.log_dir, name)
+
+    @staticmethod
+    def _today(t):
+        return datetime.fromtimestamp(t, timezone.utc).strftime("%Y%m%d")
@@ -0,0 +1,221 @@
+"""명령 처리 단계별 지연 계측.
+
+명령 하나가 receive → plan_request → first_token → parsed → enqueued →
+exec_start → exec_end 를 거치는 동안 각 단계 시각을 찍고, 수신 시점부터의 경과
+시간(ms)을 단계별 rolling 윈도우에 쌓아 p50/p95/p99 를 낸다.
+요청은 발화 문자열(key)로 구분한다 (플래너 스레드에서도 같은 key 로 찍을 수 있도록).
+
+실행 단계는 명령 큐 순서로 추적한다: enqueued(key, n) 로 넣은 명령 수를 기록해 두고
+실행기가 명령을 시작/끝낼 때 command_started()/command_finished() 를 부르면
+큐 맨 앞 요청의 exec_start/exec_end 가 찍힌다. planned(key) 로 더 넣을 명령이 없다고
+알린 뒤 마지막 명령이 끝나면 요청이 완료된다.
+
+완료된 요청과 주기 요약은 RunLogger 로 JSONL 파일에 남긴다.
+비활성화(create_metrics 가 NullMetrics 반환) 시 모든 호출은 아무 일도 하지 않는다.
+
+    STAGE_METRICS=1 STAGE_METRICS_DIR=logs STAGE_METRICS_EVERY=5
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from run_logger import RunLogger
+
+STAGES = ("receive", "plan_request", "first_token", "parsed", "enqueued", "exec_start", "exec_end")
+
+
+class NullMetrics:
+    """계측 비활성화: 모든 메서드가 즉시 반환"""
+    enabled = False
+
+    def __bool__(self):
+        return False
+
+    def begin(self, key):
+        pass
+
+    def mark(self, key, stage):
+        pass
+
+    def enqueued(self, key, n):
+        pass
+
+    def planned(self, key):
+        pass
+
+    def command_started(self, cmd=None):
+        pass
+
+    def command_finished(self, cmd=None):
+        pass
+
+    def due_summary(self):
+        return None
+
+    def summary(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class StageMetrics(NullMetrics):
+    enabled = True
+
+    def __init__(self, log_dir="logs", prefix="metrics", window=512, summary_every=5.0, source=None,
+                 max_open=64):
+        self.window = window
+        self.max_open = max_open
+        self.summary_every = summary_every
+        self.source = source
+        self.logger = RunLogger(log_dir, prefix=prefix) if log_dir else None
+        self._hist = {s: deque(maxlen=window) for s in STAGES[1:]}
+        self._open = {}                # key → {stage: perf_counter}
+        self._fifo = deque()           # [key, 남은 명령 수] (명령 큐 순서)
+        self._pending = {}             # key → 아직 끝나지 않은 명령 수
+        self._planned = set()          # 계획이 끝나 더 넣을 명령이 없는 key
+        self._completed = 0
+        self._next_summary = time.monotonic() + summary_every
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return True
+
+    # ---------------- 단계 기록 ----------------
+
+    def begin(self, key):
+        """새 요청 수신. 같은 key 의 이전 요청 기록은 버린다"""
+        with self._lock:
+            self._open.pop(key, None)
+            self._planned.discard(key)
+            while len(self._open) >= self.max_open:
+                # 끝나지 않은 요청(무효화된 계획 등)이 쌓이지 않도록 가장 오래된 것부터 버린다
+                old = next(iter(self._open))
+                del self._open[old]
+                self._planned.discard(old)
+            self._open[key] = {"receive": time.perf_counter()}
+
+    def mark(self, key, stage):
+        """단계 시각 기록. exec_end 를 제외하면 처음 찍힌 시각만 남긴다"""
+        now = time.perf_counter()
+        with self._lock:
+            rec = self._open.get(key)
+            if rec is None or (stage in rec and stage != "exec_end"):
+                return
+            rec[stage] = now
+
+    def enqueued(self, key, n):
+        if n <= 0:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            rec = self._open.get(key)
+            if rec is not None:
+                rec.setdefault("enqueued", now)
+            self._fifo.append([key, n])
+            self._pending[key] = self._pending.get(key, 0) + n
+
+    def planned(self, key):
+        """계획 완료 (parsed 가 아직 없으면 지금 찍음). 남은 명령이 없으면 바로 완료"""
+        now = time.perf_counter()
+        with self._lock:
+            rec = self._open.get(key)
+            if rec is None:
+                return
+            rec.setdefault("parsed", now)
+            self._planned.add(key)
+            if not self._pending.get(key):
+                self._complete_locked(key)
+
+    def command_started(self, cmd=None):
+        now = time.perf_counter()
+        with self._lock:
+            if self._fifo:
+                rec = self._open.get(self._fifo[0][0])
+                if rec is not None:
+                    rec.setdefault("exec_start", now)
+
+    def command_finished(self, cmd=None):
+        now = time.perf_counter()
+        with self._lock:
+            if not self._fifo:
+                return
+            entry = self._fifo[0]
+            key = entry[0]
+            entry[1] -= 1
+            if entry[1] <= 0:
+                self._fifo.popleft()
+            left = self._pending.get(key, 1) - 1
+            if left > 0:
+                self._pending[key] = left
+            else:
+                self._pending.pop(key, None)
+            rec = self._open.get(key)
+            if rec is None:
+                return
+            rec["exec_end"] = now
+            if left <= 0 and key in self._planned:
+                self._complete_locked(key)
+
+    def _complete_locked(self, key):
+        rec = self._open.pop(key)
+        self._planned.discard(key)
+        t0 = rec["receive"]
+        ms = {s: round((rec[s] - t0) * 1000.0, 3) for s in STAGES[1:] if s in rec}
+        for s, v in ms.items():
+            self._hist[s].append(v)
+        self._completed += 1
+        if self.logger:
+            self.logger.log("stage_latency", {"source": self.source, "input": key, "ms": ms})
+
+    # ---------------- 요약 ----------------
+
+    @staticmethod
+    def _percentiles(values):
+        v = sorted(values)
+        n = len(v)
+        return {"n": n, **{f"p{q}": v[min(n - 1, int(q / 100.0 * (n - 1) + 0.5))] for q in (50, 95, 99)}}
+
+    def summary(self):
+        """단계별 수신 후 경과 ms 의 p50/p95/p99"""
+        with self._lock:
+            hist = {s: list(h) for s, h in self._hist.items() if h}
+            completed, open_ = self._completed, len(self._open)
+        return {"completed": completed, "open": open_,
+                "stages": {s: self._percentiles(v) for s, v in hist.items()}}
+
+    def due_summary(self):
+        """summary_every 초마다 한 번 요약을 돌려준다 (그 외에는 None). 메인 루프에서 호출"""
+        now = time.monotonic()
+        if now < self._next_summary:
+            return None
+        self._next_summary = now + self.summary_every
+        s = self.summary()
+        if not s["completed"]:
+            return None
+        if self.logger:
+            self.logger.log("stage_summary", dict(s, source=self.source))
+        return s
+
+    def close(self):
+        if self.logger:
+            self.logger.close()
+
+
+def create_metrics(source=None):
+    """STAGE_METRICS=1 이면 StageMetrics, 아니면 NullMetrics"""
+    if os.getenv("STAGE_METRICS", "0") != "1":
+        return NullMetrics()
+    return StageMetrics(
+        log_dir=os.getenv("STAGE_METRICS_DIR", "logs"),
+        window=int(os.getenv("STAGE_METRICS_WINDOW", "512")),
+        summary_every=float(os.getenv("STAGE_METRICS_EVERY", "5")),
+        source=source,
+    )
+
+
+def format_summary(summary):
+    """로봇 윈도우로 보낼 한 줄 텍스트 ('metrics:' + JSON). 윈도우가 표로 그린다"""
+    return "metrics:" + json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
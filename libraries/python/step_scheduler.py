@@ -0,0 +1,67 @@
+"""시뮬레이션 시간 기반 스텝 스케줄러.
+
+동작 시간(초)을 timestep 단위의 정확한 스텝 수로 바꿔 실행한다.
+벽시계(time.time)에 의존하지 않으므로 호스트 속도와 무관하게 결정적이고,
+Webots 가 fast 모드로 돌면 실시간보다 빠르게 실행된다.
+"""
+import math
+import time
+
+
+class StepScheduler:
+    def __init__(self, robot, timestep: int, min_steps: int = 1, fast_forward: bool = False,
+                 report_every: float = 10.0):
+        self.robot = robot
+        self.timestep = timestep
+        self.min_steps = min_steps
+        self.report_every = report_every
+        self.steps = 0
+        self._t0_sim = robot.getTime()
+        self._t0_wall = time.perf_counter()
+        self._next_report = self._t0_sim + report_every
+        if fast_forward:
+            self.enable_fast_forward()
+
+    def enable_fast_forward(self):
+        """헤드리스 배치 실행용: 가능하면 시뮬레이션을 FAST 모드로 전환"""
+        set_mode = getattr(self.robot, "simulationSetMode", None)
+        if set_mode is None:
+            print("⚠️ fast-forward: Supervisor 가 아니므로 webots --mode=fast --no-rendering 으로 실행하세요")
+            return False
+        set_mode(self.robot.SIMULATION_MODE_FAST)
+        print("⏩ fast-forward mode")
+        return True
+
+    def steps_for(self, duration: float) -> int:
+        """duration(초)에 해당하는 스텝 수 (올림, 최소 min_steps)"""
+        n = math.ceil(max(0.0, duration) * 1000.0 / self.timestep - 1e-9)
+        return max(self.min_steps, n)
+
+    def step(self) -> bool:
+        if self.robot.step(self.timestep) == -1:
+            return False
+        self.steps += 1
+        if self.report_every and self.robot.getTime() >= self._next_report:
+            self._next_report += self.report_every
+            r = self.report()
+            print(f"⏱️ sim {r['sim_time']:.1f}s / wall {r['wall_time']:.1f}s → RTF {r['rtf']:.2f}x")
+        return True
+
+    def run_for(self, duration: float) -> bool:
+        """정확히 steps_for(duration) 스텝을 진행. 시뮬레이션이 끝나면 False"""
+        for _ in range(self.steps_for(duration)):
+            if not self.step():
+                return False
+        return True
+
+    def real_time_factor(self) -> float:
+        wall = time.perf_counter() - self._t0_wall
+        return (self.robot.getTime() - self._t0_sim) / wall if wall > 0 else 0.0
+
+    def report(self) -> dict:
+        return {
+            "steps": self.steps,
+            "sim_time": self.robot.getTime() - self._t0_sim,
+            "wall_time": time.perf_counter() - self._t0_wall,
+            "rtf": self.real_time_factor(),
+        }
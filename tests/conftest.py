@@ -0,0 +1,25 @@
+"""테스트 공통: 컨트롤러/라이브러리 모듈을 패키지 설치 없이 import 한다."""
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("libraries/python", "controllers/vlm_controller", "tools"):
+    path = os.path.join(ROOT, *sub.split("/"))
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def fake_llm():
+    """tools/fake_llm_server.py 를 빈 포트에 띄우고 (host, port, server) 를 돌려준다"""
+    from fake_llm_server import make_server
+    server = make_server(port=0, token_delay=0.0, first_token_delay=0.0, chunk_chars=3)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield host, port, server
+    server.shutdown()
+    server.server_close()
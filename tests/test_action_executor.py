@@ -0,0 +1,83 @@
+from queue import Empty, Queue
+
+from action_executor import ActionExecutor, StepAction
+
+
+class LateQueue(Queue):
+    """비워지는 순간(get_nowait 가 Empty) 다른 스레드가 명령을 넣은 것처럼 한 번 끼워 넣는다"""
+
+    def __init__(self, late):
+        super().__init__()
+        self.late = late
+
+    def get_nowait(self):
+        try:
+            return super().get_nowait()
+        except Empty:
+            if self.late is not None:
+                late, self.late = self.late, None
+                self.put(late)
+            raise
+
+
+def make(source):
+    log = []
+
+    def build(cmd):
+        return StepAction(cmd.get("steps", 2), on_start=lambda: log.append(("start", cmd["name"])),
+                          on_end=lambda: log.append(("end", cmd["name"])), name=cmd["name"])
+    finished = []
+    executor = ActionExecutor(source, build, on_finish=finished.append)
+    return executor, log, finished
+
+
+def test_commands_run_in_order():
+    q = Queue()
+    executor, log, _ = make(q)
+    for name in "ab":
+        q.put({"name": name})
+    for _ in range(6):
+        executor.tick()
+    assert log == [("start", "a"), ("end", "a"), ("start", "b"), ("end", "b")]
+    assert executor.stats()["completed"] == 2 and not executor.busy
+
+
+def test_preempt_starts_command_before_late_arrivals():
+    q = LateQueue({"name": "late"})
+    executor, log, finished = make(q)
+    q.put({"name": "a", "steps": 10})
+    q.put({"name": "b"})
+    executor.tick()
+    flushed = executor.preempt({"name": "stop"})
+    assert flushed == 1
+    assert executor.current_cmd == {"name": "stop"}
+    assert log[-1] == ("start", "stop")       # 비운 뒤 들어온 명령보다 먼저, 그 자리에서 시작
+    assert [c["name"] for c in finished] == ["a", "b"]
+    for _ in range(6):
+        executor.tick()
+    assert [e for e in log if e[0] == "start"] == [("start", "a"), ("start", "stop"), ("start", "late")]
+    assert q.unfinished_tasks == 0            # 큐를 거치지 않은 명령은 task_done 을 부르지 않는다
+    assert executor.stats()["preempted"] == 1
+
+
+def test_preempt_without_command_only_cancels():
+    q = Queue()
+    executor, log, finished = make(q)
+    q.put({"name": "a", "steps": 10})
+    executor.tick()
+    assert executor.preempt() == 0
+    assert executor.current is None and not executor.busy
+    assert [c["name"] for c in finished] == ["a"]
+    assert q.unfinished_tasks == 0
+
+
+def test_preempt_build_error_is_reported():
+    q = Queue()
+    errors = []
+
+    def build(cmd):
+        raise ValueError("bad command")
+    executor = ActionExecutor(q, build, on_error=errors.append)
+    executor.preempt({"name": "x"})
+    assert executor.current is None and executor.current_cmd is None
+    assert len(errors) == 1 and q.unfinished_tasks == 0
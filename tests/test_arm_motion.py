@@ -0,0 +1,67 @@
+import math
+
+from arm_motion import JointMoveAction
+
+
+class FakeMotor:
+    def __init__(self, acceleration=-1.0):
+        self.acceleration = acceleration
+        self.velocity = None
+        self.target = 0.0
+
+    def getAcceleration(self):
+        return self.acceleration
+
+    def setAcceleration(self, a):
+        self.acceleration = a
+
+    def setVelocity(self, v):
+        self.velocity = v
+
+    def setPosition(self, p):
+        self.target = p
+
+    def getTargetPosition(self):
+        return self.target
+
+
+class FakeSensor:
+    def __init__(self, value=0.0):
+        self.value = value
+
+    def getValue(self):
+        return self.value
+
+
+def move(motors, sensors, targets, speed, vmax=None, amax=None):
+    action = JointMoveAction(motors, sensors, targets, speed, 16, vmax=vmax, amax=amax)
+    action.start()
+    return action
+
+
+def test_unlimited_acceleration_restores_motor_default():
+    motors = {"a": FakeMotor(-1.0), "b": FakeMotor(5.0)}
+    sensors = {"a": FakeSensor(), "b": FakeSensor()}
+    vmax = {"a": 2.0, "b": 2.0}
+    move(motors, sensors, {"a": 1.0, "b": 0.5}, 2.0, vmax, {"a": 1.0, "b": 1.0})
+    assert motors["a"].acceleration == 1.0 and motors["b"].acceleration < 5.0
+    # 가속도 한계 없는 다음 이동: 앞 이동의 가속도가 남지 않는다
+    move(motors, sensors, {"a": 0.0, "b": 0.0}, 2.0, vmax, None)
+    assert motors["a"].acceleration == -1
+    assert motors["b"].acceleration == 5.0
+    move(motors, sensors, {"a": 1.0}, 2.0)
+    assert motors["a"].acceleration == -1
+
+
+def test_profile_velocity_is_capped_by_command_speed():
+    motors = {"a": FakeMotor(), "b": FakeMotor()}
+    sensors = {"a": FakeSensor(), "b": FakeSensor()}
+    vmax = {"a": 3.0, "b": 3.0}
+    fast = move(motors, sensors, {"a": 1.5, "b": 0.75}, 3.0, vmax)
+    assert math.isclose(motors["a"].velocity, 3.0) and math.isclose(motors["b"].velocity, 1.5)
+    slow = move(motors, sensors, {"a": 1.5, "b": 0.75}, 0.5, vmax)
+    assert math.isclose(motors["a"].velocity, 0.5) and math.isclose(motors["b"].velocity, 0.25)
+    assert math.isclose(slow.planned, 3.0) and math.isclose(fast.planned, 0.5)
+    # 한계가 명령보다 낮으면 한계를 따른다
+    move(motors, sensors, {"a": 1.5}, 5.0, vmax)
+    assert math.isclose(motors["a"].velocity, 3.0)
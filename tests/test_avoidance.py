@@ -0,0 +1,132 @@
+import pytest
+
+from avoidance import BACKUP, CRUISE, TURN, AvoidanceFSM
+
+FAR, MID, NEAR, CRITICAL = 1000, 400, 300, 150     # near=350, clear=450, critical=210
+
+
+def fsm(**kw):
+    """짧은 스크립트로 검사할 수 있게 스텝 수를 줄인 상태 기계 (기본은 필터 없음)"""
+    params = dict(near=350, clear=450, alpha=1.0, min_backup=3, max_backup=10, min_turn=4,
+                  turn_steps=8, max_turn=15, clear_steps=2, max_retries=2)
+    params.update(kw)
+    return AvoidanceFSM(**params)
+
+
+def run(machine, script):
+    """[(값, 스텝 수)] 를 차례로 넣고 바뀐 상태를 [(1부터 센 스텝, 상태)] 로"""
+    out, step = [], 0
+    for value, n in script:
+        for _ in range(n):
+            step += 1
+            changed = machine.update(value)
+            if changed is not None:
+                out.append((step, changed))
+    return out
+
+
+def test_cruise_until_near():
+    m = fsm()
+    assert run(m, [(FAR, 20), (MID, 20), (NEAR, 1)]) == [(41, BACKUP)]
+    assert m.active and m.stats()["maneuvers"] == 1
+
+
+def test_confirm_needs_consecutive_near_readings():
+    m = fsm(confirm=3)
+    assert run(m, [(NEAR, 2), (FAR, 1), (NEAR, 3)]) == [(6, BACKUP)]
+
+
+def test_hysteresis_keeps_backing_up_between_near_and_clear():
+    # near 보다 멀어져도 clear 를 넘지 않으면 끝내지 않는다
+    # → max_backup(10) 에서 회전, 회전도 max_turn(15) 까지 계속
+    m = fsm()
+    assert run(m, [(NEAR, 1), (MID, 30)]) == [(1, BACKUP), (11, TURN), (26, CRUISE)]
+    assert m.stats()["gave_up"] == 1
+
+
+def test_abort_when_clear_early():
+    m = fsm()
+    # 후진: clear_steps(2) 연속 멀어짐 + min_backup(3) → 3 스텝째 회전
+    # 회전: min_turn(4) 스텝째에 끝 (turn_steps 8 보다 이르므로 abort)
+    assert run(m, [(NEAR, 1), (FAR, 7)]) == [(1, BACKUP), (4, TURN), (8, CRUISE)]
+    s = m.stats()
+    assert (s["aborted"], s["extended"], s["gave_up"], s["transitions"]) == (1, 0, 0, 3)
+
+
+def test_clear_count_resets_on_near_reading():
+    m = fsm(min_backup=1)
+    assert run(m, [(NEAR, 1), (FAR, 1), (MID, 1), (FAR, 2)]) == [(1, BACKUP), (5, TURN)]
+
+
+def test_extend_while_still_blocked_then_finish():
+    m = fsm()
+    script = [(NEAR, 1), (FAR, 3),          # 4 스텝째 회전 시작
+              (MID, 10),                    # 회전 10 스텝: turn_steps(8) 를 넘김 → extend
+              (FAR, 2)]                     # clear_steps 뒤 끝
+    assert run(m, script) == [(1, BACKUP), (4, TURN), (16, CRUISE)]
+    s = m.stats()
+    assert (s["extended"], s["aborted"], s["gave_up"]) == (1, 0, 0)
+
+
+def test_give_up_at_max_turn():
+    m = fsm()
+    assert run(m, [(NEAR, 1), (FAR, 3), (MID, 20)]) == [(1, BACKUP), (4, TURN), (19, CRUISE)]
+    s = m.stats()
+    assert (s["extended"], s["gave_up"]) == (1, 1)
+
+
+def test_critical_during_turn_backs_up_again():
+    m = fsm()
+    script = [(NEAR, 1), (FAR, 3), (MID, 2), (CRITICAL, 1), (FAR, 3), (FAR, 4)]
+    assert run(m, script) == [(1, BACKUP), (4, TURN), (7, BACKUP), (10, TURN), (14, CRUISE)]
+    assert m.stats()["retried"] == 1
+
+
+def test_re_backup_is_limited_by_max_retries():
+    m = fsm(max_retries=2)
+    script = [(NEAR, 1), (FAR, 3)]
+    for _ in range(3):
+        script += [(CRITICAL, 1), (FAR, 3)]
+    script += [(FAR, 4)]
+    states = [s for _, s in run(m, script)]
+    # 두 번까지만 다시 후진하고, 세 번째 critical 은 회전을 계속한다
+    assert states == [BACKUP, TURN, BACKUP, TURN, BACKUP, TURN, CRUISE]
+    assert m.stats()["retried"] == 2
+
+
+def test_retries_reset_for_next_maneuver():
+    m = fsm(max_retries=1)
+    run(m, [(NEAR, 1), (FAR, 3), (CRITICAL, 1), (FAR, 3), (FAR, 4)])
+    assert not m.active
+    states = [s for _, s in run(m, [(NEAR, 1), (FAR, 3), (CRITICAL, 1)])]
+    assert states == [BACKUP, TURN, BACKUP]
+    assert m.stats()["retried"] == 2
+
+
+def test_filter_follows_near_fast_and_far_slowly():
+    m = fsm(alpha=0.3)
+    assert run(m, [(NEAR, 1)]) == [(1, BACKUP)]       # 가까워지는 값은 바로
+    # 멀어지는 값은 천천히: 300 → 1000 이면 한 스텝에 510 까지만 따라간다
+    assert run(m, [(FAR, 1)]) == []
+    assert m.filtered == pytest.approx(510)
+    # 한 스텝 튄 먼 값만으로는 후진을 끝내지 않는다
+    m2 = fsm(alpha=0.3, min_backup=1, clear_steps=2)
+    assert run(m2, [(NEAR, 1), (FAR, 1), (NEAR, 1), (FAR, 1)]) == [(1, BACKUP)]
+
+
+def test_reset_cancels_maneuver():
+    m = fsm()
+    run(m, [(NEAR, 1), (FAR, 2)])
+    assert m.reset() is True
+    assert m.state == CRUISE and not m.active
+    assert m.reset() is False
+    # 다음 회피는 처음부터
+    assert run(m, [(NEAR, 1)]) == [(1, BACKUP)]
+
+
+def test_defaults_match_legacy_timing():
+    # 기본값은 예전 100 스텝 후진 + 100 스텝 회전을 상한/기본으로 둔다
+    m = AvoidanceFSM(alpha=1.0)
+    states = run(m, [(NEAR, 1), (MID, 100), (MID, 250)])
+    assert states == [(1, BACKUP), (101, TURN), (351, CRUISE)]
+    assert m.critical == pytest.approx(210)
@@ -0,0 +1,53 @@
+from conversation import Conversation
+
+SYSTEM = {"role": "system", "content": "robot"}
+ARGS = '{"actions":[{"direction":"forward","duration":2}]}'
+
+
+def test_tool_call_turn_is_structured():
+    conv = Conversation("robot")
+    ids = conv.record("앞으로 2초", tool_calls=[("move_robot", ARGS)], tool_results=["queued 1"])
+    conv.record("안녕", "안녕하세요")
+    assert ids == ["call_1"]
+    assert conv.messages("다시 해줘") == [
+        SYSTEM,
+        {"role": "user", "content": "앞으로 2초"},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": "move_robot", "arguments": ARGS}}]},
+        {"role": "tool", "tool_call_id": "call_1", "content": "queued 1"},
+        {"role": "user", "content": "안녕"},
+        {"role": "assistant", "content": "안녕하세요"},
+        {"role": "user", "content": "다시 해줘"},
+    ]
+
+
+def test_tool_result_is_filled_in_later():
+    conv = Conversation("robot")
+    call_id, = conv.record("앞으로 2초", "네", [("move_robot", ARGS)])
+    before = conv.tokens()
+    assert conv.messages("x")[3] == {"role": "tool", "tool_call_id": call_id, "content": ""}
+    assert conv.tool_result(call_id, "명령이 큐에 추가되었습니다.")
+    assert conv.messages("x")[2:4] == [
+        {"role": "assistant", "content": "네", "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "move_robot", "arguments": ARGS}}]},
+        {"role": "tool", "tool_call_id": call_id, "content": "명령이 큐에 추가되었습니다."},
+    ]
+    assert conv.tokens() > before
+    assert not conv.tool_result("call_99", "x")
+
+
+def test_folded_tool_turn_is_summarized_as_call():
+    conv = Conversation("robot", budget=40, keep_last=1)
+    conv.record("앞으로 2초", tool_calls=[("move_robot", ARGS)], tool_results=["ok"])
+    conv.record("왼쪽으로 돌아", tool_calls=[("move_robot", ARGS)], tool_results=["ok"])
+    msgs = conv.messages("x")
+    assert msgs[1] == {"role": "system", "content": f"이전 대화 요약:\n'앞으로 2초' → move_robot {ARGS}"}
+    # 접힌 턴의 tool 메시지가 짝 없이 남지 않는다
+    assert [m["role"] for m in msgs] == ["system", "system", "user", "assistant", "tool", "user"]
+    assert msgs[4]["tool_call_id"] == msgs[3]["tool_calls"][0]["id"] == "call_2"
+
+
+def test_disabled_history_records_nothing():
+    conv = Conversation("robot", budget=0)
+    assert conv.record("앞으로", tool_calls=[("move_robot", ARGS)]) == []
+    assert conv.messages("x") == [SYSTEM, {"role": "user", "content": "x"}]
@@ -0,0 +1,55 @@
+import pytest
+
+from intent_parser import IntentParser
+
+CASES = [
+    ("forward 1.0 2", [{"direction": "forward", "speed": 1.0, "duration": 2.0}]),
+    ("stop", [{"direction": "stop"}]),
+    ("좌회전", [{"direction": "left"}]),
+    ("앞으로 2초 가다가 왼쪽으로 돌아줘", [{"direction": "forward", "duration": 2.0}, {"direction": "left"}]),
+    ("천천히 뒤로 3초", [{"direction": "backward", "speed": 0.5, "duration": 3.0}]),
+    ("go forward then turn left", [{"direction": "forward"}, {"direction": "left"}]),
+    ("right now go left", [{"direction": "left"}]),
+    ("불 켜고 앞으로 가줘", [{"direction": "forward"}, {"direction": "led_on", "with_previous": True}]),
+    ("go forward and lights on", [{"direction": "forward"}, {"direction": "led_on", "with_previous": True}]),
+    ("불 켜고 나서 앞으로", [{"direction": "led_on"}, {"direction": "forward"}]),
+    ("앞으로 가고 왼쪽", [{"direction": "forward"}, {"direction": "left"}]),
+]
+
+FALLBACK = [
+    "turn right 90",          # 90 은 속도 범위 밖 (각도일 것)
+    "forward 5",
+    "forward 1.0 30",         # 시간 범위 밖
+    "속도 9 로 앞으로",
+    "stop 3",
+    "turn right now",         # "right now" 는 방향이 아니다 → 방향 없음
+    "오른쪽으로 90도 회전",     # turn_rate 를 모름
+    "사과를 집어",
+    "",
+]
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_parses_simple_commands(text, expected):
+    assert IntentParser().parse(text) == expected
+
+
+@pytest.mark.parametrize("text", FALLBACK)
+def test_uncertain_input_falls_back_to_llm(text):
+    assert IntentParser().parse(text) is None
+
+
+def test_units_with_calibration():
+    p = IntentParser(unit_speed=0.5, turn_rate=90.0)
+    assert p.parse("앞으로 1미터") == [{"direction": "forward", "duration": 2.0}]
+    assert p.parse("오른쪽으로 90도") == [{"direction": "right", "duration": 1.0}]
+    assert p.parse("앞으로 10미터") is None     # 20초: 범위 밖
+
+
+def test_hit_ratio():
+    p = IntentParser()
+    p.parse("stop")
+    p.parse("사과를 집어")
+    st = p.stats()
+    assert (st["hits"], st["misses"], st["hit_ratio"]) == (1, 1, 0.5)
+    assert st["recent_misses"] == ["사과를 집어"]
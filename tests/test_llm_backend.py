@@ -0,0 +1,193 @@
+import json
+import time
+
+import pytest
+
+import llm_backend
+from llm_backend import (BackendError, FallbackBackend, LLMBackend, OllamaBackend, ServiceBackend,
+                         create_backend)
+
+MOVE_ROBOT = [{"type": "function", "function": {"name": "move_robot", "parameters": {}}}]
+MESSAGES = [{"role": "user", "content": "앞으로 가다가 왼쪽"}]
+ENV = ("LLM_BACKEND", "OLLAMA_HOST", "OLLAMA_MODEL", "PLANNING_SERVICE", "OPENAI_BASE_URL")
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ENV:
+        monkeypatch.delenv(name, raising=False)
+
+
+def drop_after_response(server):
+    """이후 응답마다 서버 쪽에서 소켓을 닫는다 (클라이언트는 keep-alive 로 알고 있음)"""
+    handler = server.RequestHandlerClass
+    original = handler.handle_one_request
+
+    def handle_one_request(self):
+        original(self)
+        self.close_connection = True
+    handler.handle_one_request = handle_one_request
+
+
+def test_ollama_reuses_keep_alive_connection(fake_llm):
+    host, port, _ = fake_llm
+    backend = OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+    for _ in range(3):
+        res = backend.chat(MESSAGES, MOVE_ROBOT)
+        assert json.loads(res.tool_calls[0].arguments)["actions"][0] == {"direction": "forward"}
+    assert backend.pool.created == 1
+    backend.close()
+
+
+def test_ollama_retries_once_when_pooled_socket_was_dropped(fake_llm):
+    host, port, server = fake_llm
+    backend = OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+    drop_after_response(server)
+    backend.chat(MESSAGES, MOVE_ROBOT)
+    time.sleep(0.05)  # 서버가 보낸 FIN 이 도착하도록
+    pooled = backend.pool._idle.queue[-1]
+    assert pooled.sock is not None  # 클라이언트는 아직 살아 있는 연결로 본다
+    res = backend.chat(MESSAGES, MOVE_ROBOT)
+    assert res.tool_calls[0].name == "move_robot"
+    assert backend.pool.created == 2  # 끊긴 연결 대신 새 연결 하나로 재시도
+    backend.close()
+
+
+def test_ollama_fresh_connection_failure_is_not_retried():
+    backend = OllamaBackend("fake", host="http://127.0.0.1:9", timeout=1)
+    with pytest.raises(OSError):
+        backend.chat(MESSAGES, MOVE_ROBOT)
+    assert backend.pool.created == 1
+
+
+class DeadBackend(LLMBackend):
+    name = "dead"
+
+    def __init__(self):
+        super().__init__("dead", 1.0)
+        self.calls = 0
+
+    def chat(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionRefusedError("down")
+
+
+def test_fallback_skips_failed_backend_during_cooldown(fake_llm, monkeypatch):
+    host, port, _ = fake_llm
+    dead = DeadBackend()
+    live = OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+    fb = FallbackBackend([dead, live], cooldown=30.0)
+    now = [1000.0]
+    monkeypatch.setattr(llm_backend.time, "monotonic", lambda: now[0])
+
+    assert fb.chat(MESSAGES, MOVE_ROBOT).backend == "ollama"
+    assert dead.calls == 1
+    now[0] += 29.0
+    assert fb.chat(MESSAGES, MOVE_ROBOT).backend == "ollama"
+    assert dead.calls == 1  # cooldown 동안은 부르지 않는다
+    now[0] += 2.0
+    assert fb.chat(MESSAGES, MOVE_ROBOT).backend == "ollama"
+    assert dead.calls == 2  # cooldown 이 지나면 다시 시도
+    live.close()
+
+
+def test_fallback_stream_falls_through_before_first_piece(fake_llm):
+    host, port, _ = fake_llm
+    dead = DeadBackend()
+    live = OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+    fb = FallbackBackend([dead, live], cooldown=30.0)
+    pieces = list(fb.stream_tool_args(MESSAGES, MOVE_ROBOT))
+    assert json.loads("".join(pieces))["actions"] == [{"direction": "forward"}, {"direction": "left"}]
+    live.close()
+
+
+def test_fallback_uses_last_backend_when_all_are_down():
+    a, b = DeadBackend(), DeadBackend()
+    b.name = "dead2"
+    fb = FallbackBackend([a, b], cooldown=30.0)
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            fb.chat(MESSAGES)
+    assert (a.calls, b.calls) == (1, 2)
+
+
+class FakeOpenAI:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+def test_create_backend_ollama_from_env(fake_llm, monkeypatch):
+    host, port, _ = fake_llm
+    monkeypatch.setenv("LLM_BACKEND", "ollama")
+    monkeypatch.setenv("OLLAMA_HOST", f"http://{host}:{port}")
+    monkeypatch.setenv("OLLAMA_MODEL", "fake")
+    backend = create_backend()
+    assert isinstance(backend, OllamaBackend)
+    assert backend.model == "fake"
+    assert backend.chat(MESSAGES, MOVE_ROBOT).tool_calls[0].name == "move_robot"
+    backend.close()
+
+
+@pytest.mark.parametrize("kind, expected", [
+    ("ollama", ["ollama"]),
+    ("OpenAI", ["openai"]),
+    ("auto", ["ollama", "openai"]),
+    ("none", None),
+])
+def test_create_backend_selection(monkeypatch, kind, expected):
+    monkeypatch.setattr(llm_backend, "OpenAI", FakeOpenAI)
+    monkeypatch.setenv("LLM_BACKEND", kind)
+    backend = create_backend()
+    if expected is None:
+        assert backend is None
+    elif len(expected) == 1:
+        assert backend.name == expected[0]
+    else:
+        assert isinstance(backend, FallbackBackend)
+        assert [b.name for b in backend.backends] == expected
+
+
+def test_create_backend_kind_argument_overrides_env(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "openai")
+    assert create_backend(kind="ollama").name == "ollama"
+
+
+def test_create_backend_without_openai_package(monkeypatch):
+    monkeypatch.setattr(llm_backend, "OpenAI", None)
+    monkeypatch.setenv("LLM_BACKEND", "openai")
+    assert create_backend() is None
+    monkeypatch.setenv("LLM_BACKEND", "auto")
+    assert create_backend().name == "ollama"
+
+
+def test_create_backend_puts_planning_service_first(monkeypatch):
+    monkeypatch.setattr(llm_backend, "OpenAI", None)
+    monkeypatch.setenv("PLANNING_SERVICE", "127.0.0.1:8799")
+    backend = create_backend(kind="ollama")
+    assert [type(b) for b in backend.backends] == [ServiceBackend, OllamaBackend]
+    assert create_backend(kind="ollama", service=False).name == "ollama"
+
+
+def test_openai_backend_requires_package(monkeypatch):
+    monkeypatch.setattr(llm_backend, "OpenAI", None)
+    with pytest.raises(BackendError):
+        llm_backend.OpenAIBackend("gpt")
+
+
+def test_ollama_converts_tool_call_turns(fake_llm):
+    from conversation import Conversation
+
+    host, port, _ = fake_llm
+    conv = Conversation("robot")
+    conv.record("앞으로 2초", tool_calls=[("move_robot", '{"actions":[{"direction":"forward"}]}')],
+                tool_results=["queued"])
+    messages = conv.messages("다시 해줘")
+    assert OllamaBackend._messages(messages)[2:4] == [
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"function": {"name": "move_robot", "arguments": {"actions": [{"direction": "forward"}]}}}]},
+        {"role": "tool", "content": "queued", "tool_name": "move_robot"},
+    ]
+    assert OllamaBackend._messages(MESSAGES) is MESSAGES
+    backend = OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+    assert backend.chat(messages, MOVE_ROBOT).tool_calls[0].name == "move_robot"
+    backend.close()
@@ -0,0 +1,50 @@
+import pytest
+
+from plan_cache import PlanCache, normalize_utterance
+
+PLAN_90 = [{"action": "move_arm", "params": {"targets": {"shoulder_pan_joint": 1.57}}}]
+
+
+def test_fuzzy_match_ignores_entries_with_different_numbers():
+    cache = PlanCache(similarity=0.5)
+    cache.put("rotate the base joint by 90 degrees and then open the gripper", PLAN_90)
+    assert cache.get("rotate the base joint by 45 degrees and then open the gripper") is None
+    assert cache.get("please rotate base joint by 90 degrees then open the gripper") == PLAN_90
+    assert cache.fuzzy_hits == 1
+
+
+def test_numbers_compare_by_value():
+    cache = PlanCache(similarity=0.5)
+    cache.put("wait 0.50 seconds then lift the arm up", PLAN_90)
+    assert cache.get("wait 0.5 seconds and then lift the arm up") == PLAN_90
+    assert cache.get("wait 2 seconds and then lift the arm up") is None
+
+
+def test_exact_match_and_normalization():
+    cache = PlanCache(similarity=0)
+    cache.put("그리퍼를 열어 줘!", PLAN_90)
+    assert normalize_utterance("그리퍼를 열어 줘!") == normalize_utterance("그리퍼 열어")
+    assert cache.get("그리퍼 열어") == PLAN_90
+    assert cache.get("그리퍼 닫아") is None
+
+
+def test_default_is_exact_match_only():
+    cache = PlanCache()
+    cache.put("rotate the base joint by 90 degrees and then open the gripper", PLAN_90)
+    assert cache.get("please rotate base joint by 90 degrees then open the gripper") is None
+    assert cache.fuzzy_hits == 0
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("open the gripper and lift the arm up", "close the gripper and lift the arm up"),
+    ("move the base joint to the left by 30 degrees slowly", "move the base joint to the right by 30 degrees slowly"),
+    ("raise the wrist joint a little bit and wait", "lower the wrist joint a little bit and wait"),
+    ("그리퍼를 열고 팔을 천천히 위로 올려", "그리퍼를 닫고 팔을 천천히 위로 올려"),
+    ("베이스를 왼쪽으로 30도 천천히 돌려 줘", "베이스를 오른쪽으로 30도 천천히 돌려 줘"),
+    ("turn the base joint to 90 degrees slowly", "turn the base joint to -90 degrees slowly"),
+])
+def test_fuzzy_match_refuses_opposite_commands(stored, asked):
+    cache = PlanCache(similarity=0.3)
+    cache.put(stored, PLAN_90)
+    assert cache.get(asked) is None
+    assert cache.fuzzy_hits == 0
@@ -0,0 +1,85 @@
+import pytest
+
+from plan_optimizer import GripperCmd, MoveCmd, PlanCompiler
+
+JOINTS = ["shoulder_pan_joint", "shoulder_lift_joint", "elbow_joint",
+          "wrist_1_joint", "wrist_2_joint", "wrist_3_joint"]
+
+
+class FakeIK:
+    """자세 x 좌표를 모든 관절 각도로 쓰는 IK (x < 0 이면 해 없음)"""
+
+    def __init__(self):
+        self.prepared = []
+
+    def prepare(self, poses):
+        self.prepared.append(list(poses))
+
+        def pick(i, seed):
+            x = poses[i][0][0]
+            return [x] * 6 if x >= 0 else None
+        return pick
+
+
+def compiler(**kw):
+    kw.setdefault("initial", [0.0] * 6)
+    return PlanCompiler(JOINTS, lambda n: n, speed=1.0, cmd_overhead=0.0, ik=FakeIK(), **kw)
+
+
+def pose(x):
+    return {"action": "move_to_pose", "params": {"position": [x, 0.0, 0.5]}}
+
+
+def test_estimates_use_ik_resolved_poses():
+    c = compiler()
+    cmds, report = c.optimize([pose(0.5), pose(0.5), pose(1.0)])
+    assert [list(m.angles) for m in cmds] == [[1.0] * 6]     # 연속 이동은 하나로
+    # 자세 명령도 관절 변위로 추정: 0 → 0.5 → 0.5 → 1.0 (속도 1)
+    assert report["est_before_s"] == pytest.approx(1.0)
+    assert report["est_after_s"] == pytest.approx(1.0)
+    assert len(c.ik.prepared) == 1     # 계획 안의 자세는 한 번에 푼다
+
+
+def test_before_estimate_counts_removed_work():
+    c = compiler(gripper_time=0.25)
+    plan = [pose(0.5), {"action": "move_arm", "params": {"targets": {"elbow_joint": 0.5}}},
+            {"action": "control_gripper", "params": {"action": "open"}},
+            {"action": "control_gripper", "params": {"action": "open"}}]
+    cmds, report = c.optimize(plan)
+    assert cmds == [cmds[0], GripperCmd("open")]
+    assert report["est_before_s"] == pytest.approx(0.5 + 0.25 * 2)
+    assert report["est_after_s"] == pytest.approx(0.5 + 0.25)
+
+
+def test_unreachable_pose_is_dropped_from_both_estimates():
+    c = compiler()
+    cmds, report = c.optimize([pose(-1.0), pose(0.2)])
+    assert [list(m.angles) for m in cmds] == [[0.2] * 6]
+    assert report["est_before_s"] == report["est_after_s"] == pytest.approx(0.2)
+
+
+def test_parallel_poses_are_resolved_in_order():
+    c = compiler()
+    plan = [{"action": "parallel", "params": {"steps": [
+        pose(0.3), {"action": "control_gripper", "params": {"action": "close"}}]}}]
+    cmds, report = c.optimize(plan)
+    group = cmds[0].cmds
+    assert isinstance(group[0], MoveCmd) and list(group[0].angles) == [0.3] * 6
+    assert report["est_before_s"] == pytest.approx(0.3)
+
+
+def test_sync_forgets_gripper_state():
+    c = compiler()
+    close = [{"action": "control_gripper", "params": {"action": "close"}}]
+    assert c.optimize(close)[0] == [GripperCmd("close")]
+    assert c.optimize(close)[0] == []          # 같은 상태면 생략
+    c.sync([0.0] * 6)
+    assert c.optimize(close)[0] == [GripperCmd("close")]
+
+
+def test_joint_speeds_are_capped_by_command_speed():
+    c = compiler(joint_speeds=[4.0] * 6)
+    move = [{"action": "move_arm", "params": {"targets": {"elbow_joint": 2.0}}}]
+    assert c.optimize(move)[1]["est_after_s"] == pytest.approx(2.0)
+    c = compiler(joint_speeds=[0.5] * 6)
+    assert c.optimize(move)[1]["est_after_s"] == pytest.approx(4.0)
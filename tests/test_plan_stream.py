@@ -0,0 +1,176 @@
+import http.client
+import json
+
+import pytest
+
+from plan_stream import StepBatcher, StepStreamParser
+
+PLAN = {"steps": [
+    {"action": "control_gripper", "params": {"action": "open"}},
+    {"action": "move_arm", "params": {"targets": {"elbow_joint": 1.0}}},
+    {"action": "control_gripper", "params": {"action": "close"}},
+]}
+
+
+def feed_all(parser, chunks):
+    """조각마다 완성된 step 을 모아 (조각 번호, step) 목록으로"""
+    out = []
+    for i, chunk in enumerate(chunks):
+        out += [(i, s) for s in parser.feed(chunk)]
+    return out
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_split_deltas_yield_each_step_once(size):
+    text = json.dumps(PLAN)
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    parser = StepStreamParser()
+    done = feed_all(parser, chunks)
+    assert [s for _, s in done] == PLAN["steps"]
+    assert parser.steps == PLAN["steps"]
+    assert parser.text() == text
+
+
+def test_step_is_emitted_as_soon_as_its_brace_closes():
+    text = json.dumps(PLAN)
+    first_end = text.index("}}") + 2
+    parser = StepStreamParser()
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [PLAN["steps"][0]]
+
+
+def test_braces_and_escapes_inside_strings():
+    steps = [
+        {"action": "say", "params": {"text": "a } b ] c { d ["}},
+        {"action": "say", "params": {"text": 'quote \\" and } brace', "path": "C:\\dir\\"}},
+        {"action": "move_arm", "params": {"targets": {"wrist_1_joint": -1.2}}},
+    ]
+    text = json.dumps({"note": "steps: [{\"fake\"}]", "steps": steps}, ensure_ascii=False)
+    parser = StepStreamParser()
+    done = feed_all(parser, list(text))  # 한 글자씩 (이스케이프 \ 와 " 가 다른 조각에 걸친다)
+    assert [s for _, s in done] == steps
+
+
+def test_key_named_steps_inside_a_string_is_not_the_array():
+    text = '{"reason": "steps", "other": [{"a": 1}], "steps": [{"b": 2}]}'
+    parser = StepStreamParser()
+    assert parser.feed(text) == [{"b": 2}]
+
+
+def test_truncated_array_keeps_completed_steps():
+    text = json.dumps(PLAN)
+    cut = text.index('"move_arm"') + 5  # 두 번째 step 중간에서 끊김
+    parser = StepStreamParser()
+    assert parser.feed(text[:cut]) == [PLAN["steps"][0]]
+    assert parser.feed("") == []
+    assert parser.steps == [PLAN["steps"][0]]
+
+
+def test_input_after_array_end_is_ignored():
+    parser = StepStreamParser()
+    parser.feed('{"steps": [{"a": 1}], "extra": [{"b": 2}]}')
+    assert parser.steps == [{"a": 1}]
+
+
+def _sse_argument_deltas(host, port, utterance):
+    """가짜 서버의 OpenAI 호환 SSE 스트림에서 tool call 인자 조각만 꺼낸다"""
+    body = {"model": "fake", "stream": True, "messages": [{"role": "user", "content": utterance}],
+            "tools": [{"type": "function", "function": {"name": "produce_plan", "parameters": {}}}]}
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    conn.request("POST", "/v1/chat/completions", json.dumps(body), {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    assert resp.status == 200
+    for line in resp:
+        line = line.decode("utf-8").strip()
+        if not line.startswith("data: ") or line == "data: [DONE]":
+            continue
+        for tc in json.loads(line[6:])["choices"][0]["delta"].get("tool_calls") or []:
+            if tc["function"].get("arguments"):
+                yield tc["function"]["arguments"]
+    conn.close()
+
+
+def test_fake_server_stream_end_to_end(fake_llm):
+    from fake_llm_server import canned_plan
+    host, port, _ = fake_llm
+    utterance = "open the gripper, move down, close and lift"
+    deltas = list(_sse_argument_deltas(host, port, utterance))
+    assert len(deltas) > 10  # chunk_chars=3 이므로 여러 조각으로 나뉘어 온다
+    parser = StepStreamParser()
+    done = feed_all(parser, deltas)
+    assert [s for _, s in done] == canned_plan(utterance)["steps"]
+    # 첫 step 은 마지막 조각보다 먼저 완성된다
+    assert done[0][0] < len(deltas) - 1
+
+
+def test_ollama_backend_stream_end_to_end(fake_llm):
+    from fake_llm_server import canned_plan
+    from llm_backend import OllamaBackend
+    host, port, _ = fake_llm
+    backend = OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+    tools = [{"type": "function", "function": {"name": "produce_plan", "parameters": {}}}]
+    parser = StepStreamParser()
+    for piece in backend.stream_tool_args([{"role": "user", "content": "home"}], tools):
+        parser.feed(piece)
+    backend.close()
+    assert parser.steps == canned_plan("home")["steps"]
+
+
+# ---------------- StepBatcher ----------------
+
+MOVES = [{"action": "move_arm", "params": {"targets": {"elbow_joint": a}}} for a in (0.5, 1.0, 1.5)]
+OPEN = {"action": "control_gripper", "params": {"action": "open"}}
+
+
+def batcher(busy):
+    batches = []
+    return StepBatcher(batches.append, hold=lambda: busy[0]), batches
+
+
+def test_batcher_passes_steps_through_while_idle():
+    b, batches = batcher([False])
+    for step in MOVES:
+        b.feed(step)
+    assert batches == [[m] for m in MOVES]
+
+
+def test_batcher_holds_consecutive_moves_while_busy():
+    busy = [True]
+    b, batches = batcher(busy)
+    b.feed(MOVES[0])
+    b.feed(MOVES[1])
+    assert batches == []
+    b.feed(OPEN)                       # 합칠 수 없는 단계가 모아 둔 단계를 함께 넘긴다
+    assert batches == [[MOVES[0], MOVES[1], OPEN]]
+    b.feed(MOVES[2])
+    busy[0] = False                    # 로봇이 놀게 되면 메인 루프가 flush
+    b.flush()
+    b.flush()
+    assert batches[1:] == [[MOVES[2]]] and b.batches == 2
+
+
+def test_streamed_moves_are_folded_by_compiler():
+    from plan_optimizer import MoveCmd, PlanCompiler
+
+    joints = ["shoulder_pan_joint", "shoulder_lift_joint", "elbow_joint",
+              "wrist_1_joint", "wrist_2_joint", "wrist_3_joint"]
+    compiler = PlanCompiler(joints, lambda n: n, initial=[0.0] * 6)
+    queued = []
+    busy = [False]
+
+    def emit(steps):
+        queued.extend(compiler.optimize(steps)[0])
+        busy[0] = True                 # 첫 명령이 실행되는 동안 나머지가 도착한다
+    b = StepBatcher(emit, hold=lambda: busy[0])
+    plan = {"steps": [MOVES[0], MOVES[1], {"action": "move_arm", "params": {"targets": {"wrist_1_joint": -1.0}}},
+                      OPEN]}
+    text = json.dumps(plan)
+    parser = StepStreamParser()
+    for i in range(0, len(text), 5):
+        for step in parser.feed(text[i:i + 5]):
+            b.feed(step)
+    b.flush()
+    assert [type(c).__name__ for c in queued] == ["MoveCmd", "MoveCmd", "GripperCmd"]
+    second = queued[1]
+    assert isinstance(second, MoveCmd)
+    assert dict(zip(second.joints, second.angles)) == {2: 1.0, 3: -1.0}
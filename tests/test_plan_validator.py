@@ -0,0 +1,198 @@
+import math
+
+import pytest
+
+from plan_validator import PlanValidator, StepGate
+
+JOINTS = ["shoulder_pan_joint", "shoulder_lift_joint", "elbow_joint",
+          "wrist_1_joint", "wrist_2_joint", "wrist_3_joint"]
+ALIAS = {"base": "shoulder_pan_joint", "shoulder": "shoulder_lift_joint", "elbow": "elbow_joint",
+         "wrist": "wrist_1_joint"}
+LIFT = {"shoulder_lift_joint": -1.0, "elbow_joint": 1.5}
+TOOLS = [{"type": "function", "function": {"name": "produce_plan", "parameters": {
+    "type": "object", "properties": {"steps": {"type": "array", "items": {
+        "type": "object",
+        "properties": {
+            "action": {"type": "string",
+                       "enum": ["move_arm", "control_gripper", "wait", "parallel", "move_to_pose"]},
+            "params": {"type": "object", "properties": {
+                "action": {"type": "string", "enum": ["open", "close"]}}},
+        },
+        "required": ["action", "params"],
+    }}},
+}}}]
+
+
+def normalize(name):
+    return ALIAS.get((name or "").lower().strip(), name)
+
+
+@pytest.fixture
+def validator():
+    return PlanValidator(TOOLS, JOINTS, normalize, default_targets=LIFT,
+                         pose_check=lambda pos, ori: math.hypot(*pos) < 1.3)
+
+
+# (입력 단계, 기대 결과)
+REPAIRS = [
+    # action / 그리퍼 동의어
+    ({"action": "gripper", "params": {"action": "열어"}},
+     {"action": "control_gripper", "params": {"action": "open"}}),
+    ({"action": "Control_Gripper", "params": {"state": "grab"}},
+     {"action": "control_gripper", "params": {"action": "close"}}),
+    ({"action": "control_gripper", "params": {"action": "release"}},
+     {"action": "control_gripper", "params": {"action": "open"}}),
+    ({"action": "sleep", "params": {"duration": "1.5"}}, {"action": "wait", "params": {"seconds": 1.5}}),
+    ({"action": "wait", "params": {"seconds": -2}}, {"action": "wait", "params": {"seconds": 0.0}}),
+    ("wait", {"action": "wait", "params": {"seconds": 0.1}}),
+    # 평평한 단계 (params 없음)
+    ({"action": "control_gripper", "state": "close"},
+     {"action": "control_gripper", "params": {"action": "close"}}),
+    # targets: 목록 → dict, 관절 별칭, 숫자 문자열
+    ({"action": "move_arm", "params": {"targets": [{"joint": "base", "angle": 0.5},
+                                                   {"joint": "Elbow Joint", "angle": "1.2"}]}},
+     {"action": "move_arm", "params": {"targets": {"shoulder_pan_joint": 0.5, "elbow_joint": 1.2}}}),
+    ({"action": "move_arm", "params": {"targets": [0, -1.57, 1.57, -1.57, 0, 0]}},
+     {"action": "move_arm", "params": {"targets": dict(zip(JOINTS, [0, -1.57, 1.57, -1.57, 0, 0]))}}),
+    ({"action": "move_arm", "params": {"targets": [["wrist", 0.3], ["wrist_3", 0.1]]}},
+     {"action": "move_arm", "params": {"targets": {"wrist_1_joint": 0.3, "wrist_3_joint": 0.1}}}),
+    ({"action": "move", "params": {}}, {"action": "move_arm", "params": {"targets": LIFT}}),
+    # 한계 밖 각도는 잘라 쓴다
+    ({"action": "move_arm", "params": {"targets": {"elbow_joint": 4.0, "shoulder_pan_joint": -9}}},
+     {"action": "move_arm", "params": {"targets": {"elbow_joint": math.pi,
+                                                   "shoulder_pan_joint": -2 * math.pi}}}),
+    # 모르는 관절만 버리고 나머지로 진행
+    ({"action": "move_arm", "params": {"targets": {"elbow": 1.0, "knee": 0.2}}},
+     {"action": "move_arm", "params": {"targets": {"elbow_joint": 1.0}}}),
+    # move_to_pose 위치 객체
+    ({"action": "move_to_pose", "params": {"position": {"x": 0.5, "y": 0.2, "z": 0.4},
+                                           "orientation": {"pitch": 3.14}}},
+     {"action": "move_to_pose", "params": {"position": [0.5, 0.2, 0.4], "orientation": [0.0, 3.14, 0.0]}}),
+    # parallel: 같은 액추에이터가 겹치면 뒤 단계는 그룹 뒤로
+    ({"action": "together", "params": {"steps": [
+        {"action": "move_arm", "params": {"targets": {"base": 1}}},
+        {"action": "gripper", "params": {"action": "open"}},
+        {"action": "move_arm", "params": {"targets": {"elbow": 1}}}]}},
+     {"action": "parallel", "params": {
+         "steps": [{"action": "move_arm", "params": {"targets": {"shoulder_pan_joint": 1.0}}},
+                   {"action": "control_gripper", "params": {"action": "open"}}],
+         "then": [{"action": "move_arm", "params": {"targets": {"elbow_joint": 1.0}}}]}}),
+]
+
+FAILURES = [
+    ({"action": "dance", "params": {}}, "unknown action"),
+    (42, "not an object"),
+    ({"action": "move_arm", "params": "up"}, "params is not an object"),
+    ({"action": "move_arm", "params": {"targets": {"knee": 1.0}}}, "unknown joint"),
+    ({"action": "move_arm", "params": {"targets": {"elbow": "up"}}}, "bad angle"),
+    ({"action": "move_arm", "params": {"targets": {"elbow": float("nan")}}}, "non-finite"),
+    ({"action": "control_gripper", "params": {"action": "wiggle"}}, "bad gripper action"),
+    ({"action": "wait", "params": {"seconds": "soon"}}, "bad wait"),
+    ({"action": "move_to_pose", "params": {"position": [0.5, 0.2]}}, "position must be"),
+    ({"action": "move_to_pose", "params": {"position": [2.0, 0.0, 0.5]}}, "unreachable"),
+    ({"action": "parallel", "params": {"steps": []}}, "non-empty steps"),
+    ({"action": "parallel", "params": {"steps": [{"action": "dance"}]}}, "parallel step 1"),
+]
+
+
+@pytest.mark.parametrize("step, expected", REPAIRS)
+def test_repairs(validator, step, expected):
+    assert validator.check_step(step)[0] == expected
+
+
+@pytest.mark.parametrize("step, error", FAILURES)
+def test_unrepairable_steps_fail(validator, step, error):
+    fixed, notes = validator.check_step(step)
+    assert fixed is None
+    assert any(error in n for n in notes), notes
+
+
+def test_valid_step_has_no_notes(validator):
+    step = {"action": "move_arm", "params": {"targets": {"elbow_joint": 1.0}}}
+    assert validator.check_step(step) == (step, [])
+
+
+def test_validate_reports_failure_indices(validator):
+    plan = [{"action": "gripper", "params": {"action": "open"}}, {"action": "dance"}, "wait"]
+    fixed, failures, repairs = validator.validate(plan)
+    assert [s["action"] for s in fixed] == ["control_gripper", "wait"]
+    assert [i for i, _, _ in failures] == [1]
+    assert all(r.startswith(("step 1:", "step 3:")) for r in repairs)
+    assert validator.validate({"steps": []})[1][0][0] == 0
+
+
+def test_enums_are_read_from_schema(validator):
+    assert validator.gripper_actions == ("open", "close")
+    assert validator.required == ("action", "params")
+    assert "move_to_pose" in validator.actions
+
+
+# ---------------- StepGate ----------------
+
+OPEN = {"action": "control_gripper", "params": {"action": "open"}}
+CLOSE = {"action": "control_gripper", "params": {"action": "close"}}
+DOWN = {"action": "move_arm", "params": {"targets": {"elbow_joint": 1.0}}}
+UP = {"action": "move_arm", "params": {"targets": {"elbow_joint": 1.5}}}
+BAD = {"action": "dance", "params": {}}
+
+
+def test_gate_emits_valid_steps_immediately(validator):
+    emitted = []
+    gate = StepGate(validator, emitted.append)
+    gate.feed({"action": "gripper", "params": {"action": "open"}})
+    assert emitted == [OPEN]
+    gate.feed(DOWN)
+    assert emitted == [OPEN, DOWN]
+    assert gate.finish() == []
+    assert gate.steps == [OPEN, DOWN] and gate.repairs
+
+
+def test_gate_holds_steps_after_failure_and_replays_in_order(validator):
+    emitted = []
+    gate = StepGate(validator, emitted.append)
+    for step in (OPEN, BAD, DOWN, {"action": "grip", "params": {"action": "grasp"}}):
+        gate.feed(step)
+    assert emitted == [OPEN]          # 실패 뒤 단계는 유효해도 붙잡아 둔다
+    assert [i for i, _, _ in gate.failures] == [1]
+    seen = []
+
+    def repair(failures):
+        seen.extend(failures)
+        return [{"action": "wait", "params": {"seconds": 0.5}}]
+    assert gate.finish(repair) == []
+    assert seen == [(1, BAD, seen[0][2])]
+    assert emitted == [OPEN, {"action": "wait", "params": {"seconds": 0.5}}, DOWN, CLOSE]
+    assert gate.steps == emitted
+
+
+def test_gate_replaces_several_failures_in_order(validator):
+    emitted = []
+    gate = StepGate(validator, emitted.append)
+    for step in (BAD, UP, dict(BAD, action="spin"), DOWN):
+        gate.feed(step)
+    assert emitted == []
+    gate.finish(lambda failures: [{"action": "gripper", "params": {"action": "open"}}, "close"])
+    # 두 번째 교체는 여전히 잘못돼 버려지고, 나머지는 원래 순서대로
+    assert emitted == [OPEN, UP, DOWN]
+
+
+def test_gate_drops_failures_without_repair(validator):
+    emitted = []
+    gate = StepGate(validator, emitted.append)
+    for step in (OPEN, BAD, CLOSE):
+        gate.feed(step)
+    dropped = gate.finish()
+    assert [(i, orig) for i, orig, _ in dropped] == [(1, BAD)]
+    assert emitted == [OPEN, CLOSE]
+
+
+def test_gate_survives_failing_repair(validator):
+    emitted = []
+    gate = StepGate(validator, emitted.append)
+    for step in (BAD, CLOSE):
+        gate.feed(step)
+
+    def repair(failures):
+        raise TimeoutError("LLM down")
+    assert len(gate.finish(repair)) == 1
+    assert emitted == [CLOSE]
@@ -0,0 +1,184 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from llm_backend import (BackendError, ChatResult, FallbackBackend, LLMBackend, OllamaBackend, RateLimited,
+                         ServiceBackend)
+from planning_service import PlanningService, make_server
+
+MOVE_ROBOT = [{"type": "function", "function": {"name": "move_robot", "parameters": {}}}]
+
+
+def ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def free_port():
+    """닫혀 있는 (아무도 듣지 않는) 포트"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class GateBackend(LLMBackend):
+    """release 될 때까지 응답을 붙잡는 백엔드. 받은 발화를 처리 순서대로 남긴다"""
+    name = "gate"
+
+    def __init__(self):
+        super().__init__("gate", 5.0)
+        self.seen = []
+        self.release = threading.Event()
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        self.seen.append(messages[-1]["content"])
+        self.release.wait(5.0)
+        return ChatResult("ok", [], self.name, 0.0)
+
+
+@pytest.fixture
+def service():
+    """service(backend, **kw) → (PlanningService, "host:port"). 빈 포트에 띄우고 끝나면 닫는다"""
+    started = []
+
+    def start(backend, **kw):
+        svc = PlanningService(backend, **kw)
+        server = make_server(svc, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append((server, svc))
+        host, port = server.server_address[:2]
+        return svc, f"{host}:{port}"
+    yield start
+    for server, svc in started:
+        server.shutdown()
+        server.server_close()
+        svc.close()
+
+
+def ollama(fake_llm):
+    host, port, _ = fake_llm
+    return OllamaBackend("fake", host=f"http://{host}:{port}", timeout=5)
+
+
+@pytest.mark.parametrize("op", ["chat", "stream"])
+def test_identical_requests_share_one_backend_call(fake_llm, service, op):
+    fake_llm[2].RequestHandlerClass.config.first_token_delay = 0.3
+    svc, address = service(ollama(fake_llm))
+    results = {}
+
+    def run(client):
+        b = ServiceBackend(address, client_id=client, timeout=5)
+        if op == "chat":
+            results[client] = b.chat(ask("앞으로 가"), MOVE_ROBOT).tool_calls[0].arguments
+        else:
+            results[client] = "".join(b.stream_tool_args(ask("앞으로 가"), MOVE_ROBOT))
+        b.close()
+    first = threading.Thread(target=run, args=("a",))
+    first.start()
+    wait_until(lambda: svc.stats()["in_flight"] == 1)
+    run("b")
+    first.join()
+    assert results["a"] == results["b"]
+    assert json.loads(results["a"])["actions"][0]["direction"] == "forward"
+    s = svc.stats()
+    assert (s["requests"], s["dispatched"], s["shared"]) == (2, 1, 1)
+
+
+def test_different_requests_are_not_shared(fake_llm, service):
+    svc, address = service(ollama(fake_llm))
+    b = ServiceBackend(address, client_id="a", timeout=5)
+    b.chat(ask("앞으로 가"), MOVE_ROBOT)
+    b.chat(ask("앞으로 가"), MOVE_ROBOT, temperature=0.5)
+    b.chat(ask("뒤로 가"), MOVE_ROBOT)
+    b.close()
+    assert svc.stats()["shared"] == 0 and svc.stats()["dispatched"] == 3
+
+
+def test_rate_limit_is_per_client(fake_llm, service):
+    svc, address = service(ollama(fake_llm), rate=0.001, burst=2)
+    a = ServiceBackend(address, client_id="a", timeout=5)
+    b = ServiceBackend(address, client_id="b", timeout=5)
+    for i in range(2):
+        a.chat(ask(f"앞으로 {i}초"), MOVE_ROBOT)
+    with pytest.raises(RateLimited):
+        a.chat(ask("앞으로 3초"), MOVE_ROBOT)
+    assert b.chat(ask("앞으로 3초"), MOVE_ROBOT).tool_calls    # 다른 로봇은 영향이 없다
+    a.close()
+    b.close()
+    s = svc.stats()
+    assert (s["rate_limited"], s["dispatched"], s["clients"]) == (1, 3, 2)
+
+
+def test_waiting_clients_are_served_round_robin(service):
+    backend = GateBackend()
+    svc, address = service(backend, concurrency=1)
+    threads = []
+
+    def send(client, text):
+        b = ServiceBackend(address, client_id=client, timeout=5)
+        t = threading.Thread(target=lambda: (b.chat(ask(text)), b.close()))
+        t.start()
+        threads.append(t)
+    send("a", "a1")
+    wait_until(lambda: backend.seen == ["a1"])
+    for n, (client, text) in enumerate([("a", "a2"), ("a", "a3"), ("a", "a4"), ("b", "b1")], start=1):
+        send(client, text)
+        wait_until(lambda: svc.stats()["waiting"] == n)
+    backend.release.set()
+    for t in threads:
+        t.join(5)
+    # 먼저 쌓인 a 의 요청이 많아도 b 는 a 의 다음 한 건 뒤에 처리된다
+    assert backend.seen == ["a1", "a2", "b1", "a3", "a4"]
+
+
+def test_service_falls_back_to_next_backend(fake_llm, service):
+    dead = OllamaBackend("fake", host=f"http://127.0.0.1:{free_port()}", timeout=1)
+    svc, address = service(FallbackBackend([dead, ollama(fake_llm)]))
+    b = ServiceBackend(address, client_id="a", timeout=5)
+    for text in ("앞으로 가", "왼쪽으로 돌아"):
+        assert b.chat(ask(text), MOVE_ROBOT).tool_calls[0].name == "move_robot"
+    b.close()
+    assert svc.stats()["errors"] == 0
+
+
+def test_backend_failure_is_reported_to_client(service):
+    dead = OllamaBackend("fake", host=f"http://127.0.0.1:{free_port()}", timeout=1)
+    svc, address = service(dead)
+    b = ServiceBackend(address, client_id="a", timeout=5)
+    with pytest.raises(BackendError, match="planning service backend"):
+        b.chat(ask("앞으로 가"), MOVE_ROBOT)
+    b.close()
+    assert svc.stats()["errors"] == 1
+
+
+def test_client_falls_back_when_service_is_down(fake_llm):
+    down = ServiceBackend(f"127.0.0.1:{free_port()}", client_id="a", timeout=1)
+    backend = FallbackBackend([down, ollama(fake_llm)])
+    assert backend.chat(ask("앞으로 가"), MOVE_ROBOT).backend == "ollama"
+    backend.close()
+
+
+def test_malformed_lines_do_not_drop_the_connection(service):
+    svc, address = service(GateBackend())
+    host, port = address.rsplit(":", 1)
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        f = sock.makefile("rwb")
+        f.write(b"not json\n\n")
+        f.write(b'{"id": 1, "op": "dance"}\n')
+        f.write(b'{"id": 2, "op": "ping"}\n')
+        f.flush()
+        replies = [json.loads(f.readline()) for _ in range(3)]
+    assert replies[0]["code"] == "bad_request" and replies[0]["error"].startswith("bad json")
+    assert replies[1] == {"id": 1, "error": "unknown op: dance", "code": "bad_request"}
+    assert replies[2]["id"] == 2 and replies[2]["done"]
+    assert svc.stats()["requests"] == 0
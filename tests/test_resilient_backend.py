@@ -0,0 +1,228 @@
+import threading
+import time
+
+import pytest
+
+from llm_backend import (BackendError, ChatResult, CircuitOpen, DeadlineExceeded, LLMBackend,
+                         RateLimited, ResilientBackend, ToolCall)
+
+PIECES = ['{"steps": [', '{"a": 1}', ", ", '{"b": 2}', "]}"]
+
+
+class StubBackend(LLMBackend):
+    """호출마다 delays 앞에서 하나씩 꺼내 그만큼 기다린다 (비면 즉시). 예외면 올린다"""
+    name = "stub"
+
+    def __init__(self, timeout=30.0):
+        super().__init__("stub", timeout)
+        self.delays = []
+        self.timeouts = []
+        self.invocations = 0
+        self.stopped = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def _next(self, timeout):
+        with self._lock:
+            self.invocations += 1
+            self.timeouts.append(timeout)
+            item = self.delays.pop(0) if self.delays else 0.0
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def chat(self, messages, tools=None, tool_choice=None, temperature=None,
+             max_tokens=None, timeout=None):
+        delay = self._next(timeout)
+        time.sleep(delay)
+        return ChatResult(None, [ToolCall("produce_plan", "{}")], self.name, delay)
+
+    def stream_tool_args(self, messages, tools, tool_choice=None, temperature=None,
+                         max_tokens=None, timeout=None, is_stale=None):
+        delay = self._next(timeout)
+        for i, piece in enumerate(PIECES):
+            time.sleep(delay if i == 0 else 0.01)
+            if is_stale and is_stale():
+                with self._lock:
+                    self.stopped += 1
+                return
+            yield piece
+        with self._lock:
+            self.completed += 1
+
+
+def make(**kw):
+    stub = StubBackend()
+    kw.setdefault("deadline", 2.0)
+    return stub, ResilientBackend(stub, **kw)
+
+
+def warm_up(backend, n, kind="chat"):
+    for _ in range(n):
+        if kind == "chat":
+            backend.chat([])
+        else:
+            list(backend.stream_tool_args([], []))
+
+
+# ---------------- 마감 시간 ----------------
+
+def test_deadline_caps_attempt_timeout():
+    stub, rb = make(deadline=0.5)
+    assert rb.timeout == 0.5
+    rb.chat([])
+    rb.chat([], timeout=0.2)
+    assert 0.4 < stub.timeouts[0] <= 0.5
+    assert 0.1 <= stub.timeouts[1] <= 0.2
+
+
+def test_deadline_exceeded_returns_before_slow_backend():
+    stub, rb = make(deadline=0.2)
+    stub.delays = [1.0]
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        rb.chat([])
+    assert time.monotonic() - t0 < 0.5
+    assert rb.stats()["deadline_exceeded"] == 1
+
+
+def test_errors_are_not_retried():
+    stub, rb = make()
+    stub.delays = [ConnectionResetError("boom")]
+    with pytest.raises(ConnectionResetError):
+        rb.chat([])
+    assert stub.invocations == 1
+
+
+# ---------------- 헤징 ----------------
+
+def test_no_hedging_before_min_samples():
+    stub, rb = make(min_samples=8)
+    warm_up(rb, 7)
+    stub.delays = [0.2]
+    rb.chat([])
+    assert rb.stats()["hedged"] == 0
+    assert stub.invocations == 8
+
+
+def test_slow_call_is_hedged_after_warm_up():
+    stub, rb = make(min_samples=8)
+    warm_up(rb, 8)
+    stub.delays = [0.5]        # 첫 시도만 느리고 헤지 요청은 바로 응답
+    t0 = time.monotonic()
+    rb.chat([])
+    assert time.monotonic() - t0 < 0.3
+    s = rb.stats()
+    assert (s["hedged"], s["hedge_wins"]) == (1, 1)
+    assert stub.invocations == 10
+
+
+def test_hedges_stay_within_budget():
+    stub, rb = make(min_samples=8, hedge_budget=0.2)
+    warm_up(rb, 8)
+    for _ in range(12):
+        stub.delays = [0.15]
+        rb.chat([])
+        s = rb.stats()
+        assert s["hedged"] <= 0.2 * s["calls"]
+    assert s["hedged"] >= 2
+
+
+@pytest.mark.parametrize("calls, hedged, allowed", [
+    (9, 0, True), (10, 1, True), (10, 2, False), (11, 2, False), (15, 2, True), (100, 20, False),
+])
+def test_hedge_budget_counts_the_new_hedge(calls, hedged, allowed):
+    stub, rb = make(hedge_budget=0.2, min_samples=8)
+    rb._latency["chat"].extend([0.01] * 8)
+    rb.calls, rb.hedged = calls, hedged
+    assert (rb._hedge_delay("chat") is not None) == allowed
+    assert rb._hedge_delay("chat") in (None, rb.min_hedge_delay)
+
+
+# ---------------- 회로 차단기 ----------------
+
+def test_breaker_opens_fails_fast_and_closes_on_probe():
+    stub, rb = make(failure_threshold=3, cooldown=0.3)
+    stub.delays = [ConnectionRefusedError("down")] * 3
+    for _ in range(3):
+        with pytest.raises(ConnectionRefusedError):
+            rb.chat([])
+    assert rb.state == "open" and not rb.available()
+    t0 = time.monotonic()
+    with pytest.raises(CircuitOpen):
+        rb.chat([])
+    assert time.monotonic() - t0 < 0.05
+    assert stub.invocations == 3          # 열린 동안은 백엔드를 부르지 않는다
+    time.sleep(0.35)
+    assert rb.available()
+    rb.chat([])                           # 시험 호출 성공 → 닫힘
+    s = rb.stats()
+    assert (s["state"], s["trips"], s["short_circuited"]) == ("closed", 1, 1)
+
+
+def test_failed_probe_reopens_immediately():
+    stub, rb = make(failure_threshold=3, cooldown=0.2)
+    stub.delays = [ConnectionRefusedError("down")] * 4
+    for _ in range(3):
+        with pytest.raises(ConnectionRefusedError):
+            rb.chat([])
+    time.sleep(0.25)
+    with pytest.raises(ConnectionRefusedError):
+        rb.chat([])
+    assert rb.state == "open" and rb.stats()["trips"] == 2
+    with pytest.raises(CircuitOpen):
+        rb.chat([])
+
+
+def test_only_one_probe_while_half_open():
+    stub, rb = make(failure_threshold=1, cooldown=0.1)
+    stub.delays = [ConnectionRefusedError("down"), 0.3]
+    with pytest.raises(ConnectionRefusedError):
+        rb.chat([])
+    time.sleep(0.15)
+    probe = threading.Thread(target=rb.chat, args=([],))
+    probe.start()
+    time.sleep(0.05)
+    assert not rb.available()
+    with pytest.raises(CircuitOpen):
+        rb.chat([])
+    probe.join()
+    assert rb.state == "closed"
+
+
+def test_rate_limits_do_not_trip_breaker():
+    stub, rb = make(failure_threshold=2)
+    stub.delays = [RateLimited("busy")] * 3
+    for _ in range(3):
+        with pytest.raises(RateLimited):
+            rb.chat([])
+    assert rb.state == "closed"
+
+
+def test_circuit_errors_are_backend_errors():
+    assert issubclass(CircuitOpen, BackendError) and issubclass(DeadlineExceeded, BackendError)
+
+
+# ---------------- 스트림 ----------------
+
+def test_losing_stream_is_stopped_via_is_stale():
+    stub, rb = make(min_samples=8)
+    warm_up(rb, 8, "stream")
+    assert stub.completed == 8
+    stub.delays = [0.3]        # 첫 시도가 늦어 헤지 요청이 먼저 첫 조각을 낸다
+    pieces = list(rb.stream_tool_args([], []))
+    assert pieces == PIECES    # 확정된 시도의 조각만, 섞이지 않고
+    assert rb.stats()["hedge_wins"] == 1
+    time.sleep(0.35)
+    assert stub.stopped == 1 and stub.completed == 9
+
+
+def test_caller_is_stale_reaches_backend():
+    stub, rb = make()
+    stale = threading.Event()
+    gen = rb.stream_tool_args([], [], is_stale=stale.is_set)
+    assert next(gen) == PIECES[0]
+    stale.set()
+    assert list(gen) == []
+    assert stub.stopped == 1
+    assert rb.state == "closed" and rb.stats()["failed"] == 0
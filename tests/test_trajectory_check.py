@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from plan_optimizer import GripperCmd, PlanCompiler  # noqa: E402
+from trajectory_check import TrajectoryChecker  # noqa: E402
+from ur10e_kinematics import UR10eKinematics  # noqa: E402
+
+JOINTS = ["shoulder_pan_joint", "shoulder_lift_joint", "elbow_joint",
+          "wrist_1_joint", "wrist_2_joint", "wrist_3_joint"]
+HOME = [0.0, -math.pi / 2, math.pi / 2, -math.pi / 2, 0.0, 0.0]
+# 상완을 수평으로 눕히고 전완을 아래로 꺾은 자세: 손목이 바닥 아래로 들어간다
+FLOOR = {"shoulder_lift_joint": 0.0, "elbow_joint": math.pi / 2}
+
+
+def compiler(**kw):
+    checker = TrajectoryChecker(UR10eKinematics(tool_length=0.15))
+    return PlanCompiler(JOINTS, lambda n: n, speed=1.0, cmd_overhead=0.0, guard=checker, **kw)
+
+
+def move(targets):
+    return {"action": "move_arm", "params": {"targets": targets}}
+
+
+def test_move_into_floor_is_trimmed_from_known_state():
+    c = compiler(initial=HOME)
+    cmds, report = c.optimize([move(FLOOR)])
+    assert [u["reason"] for u in report["unsafe"]] == ["table"]
+    assert report["unsafe"][0]["action"] == "trimmed"
+    assert c.joints[1] < 0.0            # 바닥에 닿기 전에서 멈춘다
+
+
+def test_first_move_from_unknown_state_is_not_skipped():
+    # sync() 전 (시작 상태를 모름): 바닥으로 가는 첫 이동을 검사 없이 통과시키지 않는다
+    c = compiler()
+    cmds, report = c.optimize([move(FLOOR), {"action": "control_gripper", "params": {"action": "open"}}])
+    assert cmds == [GripperCmd("open")]
+    assert report["unsafe"] == [{"index": 0, "reason": "unknown_start", "action": "rejected", "progress": 0.0}]
+    # 센서 값으로 채운 뒤에는 같은 이동을 실제로 검사한다
+    c.sync(HOME)
+    _, report = c.optimize([move(FLOOR)])
+    assert [u["reason"] for u in report["unsafe"]] == ["table"]
+
+
+def test_partially_known_state_rejects_every_move():
+    c = compiler(initial=[0.0, None, 0.0, 0.0, 0.0, 0.0])
+    cmds, report = c.optimize([move({"elbow_joint": 0.5}), move({"shoulder_pan_joint": 0.3}),
+                               {"action": "wait", "params": {"seconds": 0.5}},
+                               move({"wrist_1_joint": -1.0})])
+    assert all(u["reason"] == "unknown_start" for u in report["unsafe"])
+    assert all(not hasattr(cmd, "joints") for cmd in cmds)
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ur10e_kinematics import UR10eKinematics, pose_matrix  # noqa: E402
+
+HOME = [0.0, -math.pi / 2, math.pi / 2, -math.pi / 2, 0.0, 0.0]
+
+
+def wrap(a):
+    return (np.asarray(a) + math.pi) % (2 * math.pi) - math.pi
+
+
+def random_configs(n, seed=0):
+    """특이점(팔꿈치가 펴짐, 손목 θ5 ≈ 0/π, 손목 중심이 θ1 축 근처)을 피한 무작위 관절 각도"""
+    rng = np.random.default_rng(seed)
+    kin = UR10eKinematics()
+    q = rng.uniform(-math.pi, math.pi, size=(n * 4, 6))
+    keep = (np.abs(np.sin(q[:, 2])) > 0.15) & (np.abs(np.sin(q[:, 4])) > 0.15)
+    q = q[keep]
+    T = kin.fk(q)
+    p05 = T[:, :3, 3] - 0.11655 * T[:, :3, 2]
+    keep = np.hypot(p05[:, 0], p05[:, 1]) > 0.174 + 0.05
+    return q[keep][:n]
+
+
+@pytest.mark.parametrize("tool_length", [0.0, 0.15])
+def test_fk_ik_round_trip(tool_length):
+    kin = UR10eKinematics(tool_length=tool_length)
+    q = random_configs(200)
+    assert len(q) == 200
+    T = kin.fk(q)
+    sols, ok = kin.ik_all(T)
+    # 원래 q 가 8개 가지 중 하나에 (2π 차이를 무시하고) 있어야 한다
+    err = np.abs(wrap(sols - q[:, None, :])).max(axis=-1)
+    err = np.where(ok, err, np.inf)
+    assert (err.min(axis=1) < 1e-6).all(), err.min(axis=1).max()
+    # 유효하다고 한 가지는 모두 같은 자세를 만든다
+    Ts = kin.fk(sols)
+    pose_err = np.abs(Ts - T[:, None]).max(axis=(-1, -2))
+    assert (pose_err[ok] < 1e-6).all()
+
+
+def test_unreachable_pose_has_no_branch():
+    kin = UR10eKinematics()
+    _, ok = kin.ik_all(pose_matrix([[2.0, 0.0, 0.5]]))
+    assert not ok.any()
+    assert not kin.reachable([2.0, 0.0, 0.5])
+    assert kin.reachable([0.6, 0.2, 0.4])
+
+
+def test_ik_picks_branch_closest_to_seed():
+    kin = UR10eKinematics()
+    q = random_configs(50, seed=1)
+    T = kin.fk(q)
+    sols, ok = kin.ik_all(T)
+    for i in range(len(q)):
+        for b in np.flatnonzero(ok[i]):
+            picked, found = kin.select(sols[i:i + 1, :], ok[i:i + 1, :], sols[i, b])
+            assert found[0]
+            assert np.allclose(kin.fk(picked[0]), T[i], atol=1e-6)
+            assert np.allclose(wrap(picked[0] - sols[i, b]), 0.0, atol=1e-9)
+
+
+def test_select_moves_each_joint_to_nearest_2pi_equivalent():
+    kin = UR10eKinematics()
+    q = np.array([-0.2, -1.2, 1.4, 1.5, 0.8, 3.0])
+    seed = q + np.array([2 * math.pi, 0.0, 0.0, -2 * math.pi, 0.0, 0.3])
+    picked, found = kin.ik(kin.fk(q), seed)
+    assert found[0]
+    expected = q + np.array([2 * math.pi, 0.0, 0.0, -2 * math.pi, 0.0, 0.0])
+    assert np.allclose(picked[0], expected, atol=1e-6)
+    assert np.allclose(kin.fk(picked[0]), kin.fk(q), atol=1e-6)
+
+
+def test_select_wraps_back_into_joint_limits():
+    # 관절 6 은 ±π 로 제한: seed 쪽 등가각 (3.0 + 2π 근처) 이 한계 밖이면 반대쪽으로
+    limits = [(-2 * math.pi, 2 * math.pi)] * 5 + [(-math.pi, math.pi)]
+    kin = UR10eKinematics(limits=limits)
+    q = np.array([0.3, -1.2, 1.4, -1.5, 0.8, 3.0])
+    seed = q.copy()
+    seed[5] = 3.0 + 2 * math.pi - 0.1
+    picked, found = kin.ik(kin.fk(q), seed)
+    assert found[0]
+    assert -math.pi <= picked[0, 5] <= math.pi
+    assert math.isclose(picked[0, 5], 3.0, abs_tol=1e-6)
+
+
+def test_select_reports_not_found_when_limits_exclude_all_branches():
+    limits = [(-0.1, 0.1)] * 6
+    kin = UR10eKinematics(limits=limits)
+    T = UR10eKinematics().fk(np.array([1.0, -1.2, 1.4, -1.5, 0.8, 1.0]))
+    _, found = kin.ik(T, np.zeros(6))
+    assert not found[0]
+
+
+def test_branch_cache_reuses_solutions():
+    kin = UR10eKinematics()
+    T = kin.fk(np.array(HOME))
+    kin.ik(T, HOME)
+    kin.ik(T, np.zeros(6))
+    assert kin.stats() == {"size": 1, "hits": 1, "misses": 1}
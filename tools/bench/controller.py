@@ -0,0 +1,335 @@
+"""Webots `controller` 모듈 대역 (벤치마크/헤드리스 실행용).
+
+Webots 없이 컨트롤러 스크립트를 그대로 import 해서 돌릴 수 있도록 컨트롤러가 쓰는
+API 만 흉내 낸다. 물리는 없고, 모터는 setVelocity 속도로 목표 위치를 향해 움직이며
+(위치가 ±inf 이면 속도 제어) PositionSensor 는 그 위치를 돌려준다.
+
+환경 변수 (또는 configure()) 로 조정한다.
+  WEBOTS_FAKE_STEPS       step() 이 -1 을 돌려주기까지의 스텝 수 (기본 1000)
+  WEBOTS_FAKE_STEP_COST   step() 한 번에 소비할 시뮬레이터 시간 (초, busy-wait, 기본 0)
+  WEBOTS_FAKE_TIMESTEP    basicTimeStep (ms, 기본 16)
+  WEBOTS_FAKE_MESSAGES    [[스텝, "메시지"], ...] JSON. 해당 스텝부터 wwiReceiveText 로 전달
+  WEBOTS_FAKE_DISTANCE    DistanceSensor 기본 값 (기본 1000)
+  WEBOTS_FAKE_STOP_AFTER  모든 메시지가 첫 동작을 만든 뒤 이 스텝 수가 지나면 종료 (기본 끔)
+
+trace 에 메시지 수신 시각과 그 뒤 첫 액추에이터 명령 시각을 기록한다
+(벤치마크의 명령 → 첫 동작 지연 측정용).
+"""
+import json
+import math
+import os
+import time
+
+INF = float("inf")
+
+_config = {}
+trace = {"received": [], "first_motion": [], "sent": [], "step_calls": 0,
+         "first_step": None, "last_step": None}
+
+
+def configure(steps=None, step_cost=None, timestep=None, messages=None, distance=None, stop_after=None):
+    """환경 변수 대신 코드에서 설정 (Robot 생성 전에 호출)"""
+    for k, v in (("steps", steps), ("step_cost", step_cost), ("timestep", timestep),
+                 ("messages", messages), ("distance", distance), ("stop_after", stop_after)):
+        if v is not None:
+            _config[k] = v
+
+
+def _cfg(key, env, default, cast):
+    if key in _config:
+        return _config[key]
+    raw = os.getenv(env)
+    return cast(raw) if raw is not None else default
+
+
+def _actuated():
+    """메시지 수신 뒤 처음 들어온 액추에이터 명령이면 시각을 기록"""
+    if len(trace["first_motion"]) < len(trace["received"]):
+        trace["first_motion"].append(time.perf_counter())
+
+
+class Node:
+    NO_NODE = 0
+    DISTANCE_SENSOR = 1
+    POSITION_SENSOR = 2
+    ROTATIONAL_MOTOR = 3
+    LED = 4
+    KEYBOARD = 5
+
+    def __init__(self, name="robot"):
+        self.name = name
+        self.translation = [0.0, 0.0, 0.0]
+        self.rotation = [0.0, 0.0, 1.0, 0.0]
+
+    def getPosition(self):
+        return list(self.translation)
+
+    def getField(self, name):
+        return Field(self, name)
+
+    def getDef(self):
+        return self.name
+
+
+class Field:
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    def getSFRotation(self):
+        return list(self.node.rotation)
+
+    def getSFVec3f(self):
+        return list(self.node.translation)
+
+    def setSFRotation(self, value):
+        self.node.rotation = list(value)
+
+    def setSFVec3f(self, value):
+        self.node.translation = list(value)
+
+
+class Device:
+    node_type = Node.NO_NODE
+
+    def __init__(self, robot, name):
+        self.robot = robot
+        self.name = name
+
+    def getName(self):
+        return self.name
+
+    def getNodeType(self):
+        return self.node_type
+
+
+class Sensor(Device):
+    def __init__(self, robot, name):
+        super().__init__(robot, name)
+        self.period = 0
+
+    def enable(self, period):
+        self.period = period
+
+    def disable(self):
+        self.period = 0
+
+    def getSamplingPeriod(self):
+        return self.period
+
+
+class PositionSensor(Sensor):
+    node_type = Node.POSITION_SENSOR
+
+    def __init__(self, robot, name, motor=None):
+        super().__init__(robot, name)
+        self.motor = motor
+
+    def getValue(self):
+        return self.motor.position if self.motor is not None else 0.0
+
+
+class DistanceSensor(Sensor):
+    node_type = Node.DISTANCE_SENSOR
+
+    def __init__(self, robot, name, value=None):
+        super().__init__(robot, name)
+        self.value = _cfg("distance", "WEBOTS_FAKE_DISTANCE", 1000.0, float) if value is None else value
+
+    def getValue(self):
+        return self.value(self.robot) if callable(self.value) else self.value
+
+    def getLookupTable(self):
+        return [0.0, 0.0, 0.0, 2.0, 2000.0, 0.0]
+
+    def getMinValue(self):
+        return 0.0
+
+    def getMaxValue(self):
+        return 2000.0
+
+
+class Motor(Device):
+    node_type = Node.ROTATIONAL_MOTOR
+
+    def __init__(self, robot, name, min_position=-2 * math.pi, max_position=2 * math.pi, max_velocity=3.14):
+        super().__init__(robot, name)
+        self.position = 0.0
+        self.target = 0.0
+        self.velocity = max_velocity
+        self.min_position = min_position
+        self.max_position = max_position
+        self.max_velocity = max_velocity
+        self.sensor = PositionSensor(robot, name + "_sensor", self)
+
+    def setPosition(self, position):
+        self.target = position
+        _actuated()
+
+    def setVelocity(self, velocity):
+        self.velocity = velocity
+        _actuated()
+
+    def setAcceleration(self, acceleration):
+        pass
+
+    def getTargetPosition(self):
+        return self.target
+
+    def getVelocity(self):
+        return self.velocity
+
+    def getMaxVelocity(self):
+        return self.max_velocity
+
+    def getMinPosition(self):
+        return self.min_position
+
+    def getMaxPosition(self):
+        return self.max_position
+
+    def getPositionSensor(self):
+        return self.sensor
+
+    def _advance(self, dt):
+        if math.isinf(self.target):
+            self.position += self.velocity * dt
+            return
+        limit = abs(self.velocity) * dt
+        self.position += max(-limit, min(limit, self.target - self.position))
+        if self.min_position != self.max_position:
+            self.position = max(self.min_position, min(self.max_position, self.position))
+
+
+class LED(Device):
+    node_type = Node.LED
+
+    def __init__(self, robot, name):
+        super().__init__(robot, name)
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class Keyboard(Sensor):
+    node_type = Node.KEYBOARD
+
+    def __init__(self, robot=None, name="keyboard"):
+        super().__init__(robot, name)
+        self.keys = []
+
+    def getKey(self):
+        return self.keys.pop(0) if self.keys else -1
+
+
+def _make_device(robot, name):
+    low = name.lower()
+    if low.startswith("ds") or "distance" in low:
+        return DistanceSensor(robot, name)
+    if low.endswith("_sensor"):
+        return PositionSensor(robot, name)
+    if "led" in low:
+        return LED(robot, name)
+    if "finger" in low:
+        return Motor(robot, name, 0.0, 0.8, 2.0)  # 그리퍼 손가락: 제한 있는 짧은 관절
+    return Motor(robot, name)
+
+
+class Robot:
+    def __init__(self):
+        self.timestep = _cfg("timestep", "WEBOTS_FAKE_TIMESTEP", 16, int)
+        self.max_steps = _cfg("steps", "WEBOTS_FAKE_STEPS", 1000, int)
+        self.step_cost = _cfg("step_cost", "WEBOTS_FAKE_STEP_COST", 0.0, float)
+        messages = _cfg("messages", "WEBOTS_FAKE_MESSAGES", [], json.loads)
+        self.messages = sorted((int(s), str(m)) for s, m in messages)
+        self.stop_after = _cfg("stop_after", "WEBOTS_FAKE_STOP_AFTER", 0, int)
+        self.steps = 0
+        self.time = 0.0
+        self.devices = {}
+        self._stop_at = None
+        self.keyboard = Keyboard(self)
+        self.mode = 1
+        self.name = os.getenv("WEBOTS_ROBOT_NAME", "robot")
+
+    def step(self, duration=None):
+        duration = self.timestep if duration is None else duration
+        n = max(1, int(round(duration / self.timestep)))
+        now = time.perf_counter()
+        if trace["first_step"] is None:
+            trace["first_step"] = now
+        trace["last_step"] = now
+        trace["step_calls"] += 1
+        if (self.stop_after and self._stop_at is None and not self.messages
+                and trace["received"] and len(trace["first_motion"]) >= len(trace["received"])):
+            self._stop_at = self.steps + self.stop_after
+        for _ in range(n):
+            if self.steps >= self.max_steps or (self._stop_at is not None and self.steps >= self._stop_at):
+                return -1
+            self.steps += 1
+            self.time += self.timestep / 1000.0
+            if self.step_cost > 0:
+                end = time.perf_counter() + self.step_cost
+                while time.perf_counter() < end:
+                    pass
+            for d in self.devices.values():
+                if isinstance(d, Motor):
+                    d._advance(self.timestep / 1000.0)
+        return 0
+
+    def getBasicTimeStep(self):
+        return float(self.timestep)
+
+    def getTime(self):
+        return self.time
+
+    def getName(self):
+        return self.name
+
+    def getDevice(self, name):
+        if name not in self.devices:
+            self.devices[name] = _make_device(self, name)
+        return self.devices[name]
+
+    def getNumberOfDevices(self):
+        return len(self.devices)
+
+    def getDeviceByIndex(self, index):
+        return list(self.devices.values())[index]
+
+    def getKeyboard(self):
+        return self.keyboard
+
+    def wwiReceiveText(self):
+        if self.messages and self.messages[0][0] <= self.steps:
+            trace["received"].append(time.perf_counter())
+            return self.messages.pop(0)[1]
+        return None
+
+    def wwiSendText(self, text):
+        trace["sent"].append((time.perf_counter(), text))
+
+
+class Supervisor(Robot):
+    SIMULATION_MODE_PAUSE = 0
+    SIMULATION_MODE_REAL_TIME = 1
+    SIMULATION_MODE_FAST = 2
+
+    def __init__(self):
+        super().__init__()
+        self.node = Node(self.name)
+
+    def getSelf(self):
+        return self.node
+
+    def getFromDef(self, name):
+        return Node(name)
+
+    def simulationSetMode(self, mode):
+        self.mode = mode
+
+    def simulationGetMode(self):
+        return self.mode
@@ -0,0 +1,224 @@
+"""로컬 가짜 LLM 서버 (OpenAI Chat Completions / Ollama /api/chat 호환).
+
+네트워크 없이 플래너 지연/스트리밍 동작을 재현하기 위한 개발용 서버.
+요청의 첫 번째 tool(produce_plan 또는 move_robot)에 맞는 tool call 을 돌려주며,
+stream=true 이면 인자 문자열을 --chunk-chars 글자씩 흘려보낸다
+(OpenAI 는 SSE, Ollama 는 NDJSON).
+
+    python tools/fake_llm_server.py --port 8765 --token-delay 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake LLM_BACKEND=openai
+    OLLAMA_HOST=http://127.0.0.1:8765 LLM_BACKEND=ollama
+"""
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOME = {"shoulder_pan_joint": 0.0, "shoulder_lift_joint": -1.57, "elbow_joint": 1.57,
+        "wrist_1_joint": -1.57, "wrist_2_joint": 0.0, "wrist_3_joint": 0.0}
+LIFT = {"shoulder_lift_joint": -1.0, "elbow_joint": 1.5}
+DOWN = {"shoulder_lift_joint": -0.6, "elbow_joint": 1.0}
+
+
+def canned_plan(utterance: str):
+    """발화 키워드로 고정 계획을 만든다. 해당 없으면 4단계 pick 예시."""
+    t = (utterance or "").lower()
+    steps = []
+    if "home" in t or "홈" in t:
+        steps.append({"action": "move_arm", "params": {"targets": HOME}})
+    if "open" in t or "열" in t:
+        steps.append({"action": "control_gripper", "params": {"action": "open"}})
+    if "down" in t or "내려" in t:
+        steps.append({"action": "move_arm", "params": {"targets": DOWN}})
+    if "close" in t or "닫" in t:
+        steps.append({"action": "control_gripper", "params": {"action": "close"}})
+    if "lift" in t or "들어" in t:
+        steps.append({"action": "move_arm", "params": {"targets": LIFT}})
+    if not steps:
+        steps = [
+            {"action": "control_gripper", "params": {"action": "open"}},
+            {"action": "move_arm", "params": {"targets": DOWN}},
+            {"action": "control_gripper", "params": {"action": "close"}},
+            {"action": "move_arm", "params": {"targets": LIFT}},
+        ]
+    return {"steps": steps}
+
+
+WHEEL_WORDS = [
+    ("forward", ("forward", "앞", "전진", "직진")),
+    ("backward", ("back", "뒤", "후진")),
+    ("left", ("left", "왼", "좌")),
+    ("right", ("right", "오른", "우")),
+    ("stop", ("stop", "멈", "정지")),
+]
+
+
+def canned_actions(utterance: str):
+    t = (utterance or "").lower()
+    hits = []
+    for direction, words in WHEEL_WORDS:
+        pos = [t.find(w) for w in words if w in t]
+        if pos:
+            hits.append((min(pos), direction))
+    return {"actions": [{"direction": d} for _, d in sorted(hits)] or [{"direction": "stop"}]}
+
+
+def canned_call(req):
+    """요청 → (tool 이름, 인자 JSON 문자열)"""
+    user = next((m.get("content", "") for m in reversed(req.get("messages", []))
+                 if m.get("role") == "user"), "")
+    tools = req.get("tools") or []
+    name = tools[0]["function"]["name"] if tools else "produce_plan"
+    args = canned_actions(user) if name == "move_robot" else canned_plan(user)
+    return name, json.dumps(args, ensure_ascii=False)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # 헤더/본문 분할 전송 시 delayed-ACK 지연 방지
+    config = None
+
+    def log_message(self, fmt, *args):
+        if self.config.verbose:
+            super().log_message(fmt, *args)
+
+    def _read_json(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}")
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path.endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "fake", "object": "model"}]})
+        elif path.endswith("/api/tags"):
+            self._send_json({"models": [{"name": "fake"}]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if not path.endswith(("/chat/completions", "/api/chat", "/api/generate")):
+            self._send_json({"error": "not found"}, 404)
+            return
+        req = self._read_json()
+        if path.endswith("/api/generate"):  # 모델 로드(warm-up) 요청
+            self._send_json({"model": req.get("model", "fake"), "response": "", "done": True})
+            return
+        name, args = canned_call(req)
+        time.sleep(self.config.first_token_delay)
+        ollama = path.endswith("/api/chat")
+        if req.get("stream", ollama):  # Ollama 는 stream 기본값이 true
+            (self._stream_ollama if ollama else self._stream_completion)(req, name, args)
+        else:
+            time.sleep(self.config.token_delay * (len(args) // self.config.chunk_chars))
+            self._send_json(self._ollama_message(req, name, args) if ollama
+                            else self._completion(req, name, args))
+
+    # ---------------- 응답 생성 ----------------
+
+    @staticmethod
+    def _ollama_message(req, name, args, done=True):
+        return {
+            "model": req.get("model", "fake"), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "message": {"role": "assistant", "content": "",
+                        "tool_calls": [{"function": {"name": name, "arguments": json.loads(args)}}]},
+            "done": done,
+        }
+
+    def _stream_ollama(self, req, name, args):
+        # Ollama 는 tool call 을 한 덩어리로 보내므로 생성 시간만큼 기다렸다가 한 번에 보낸다
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def emit(obj):
+            line = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        time.sleep(self.config.token_delay * (len(args) // self.config.chunk_chars))
+        emit(self._ollama_message(req, name, args, done=False))
+        emit({"model": req.get("model", "fake"), "message": {"role": "assistant", "content": ""},
+              "done": True, "done_reason": "stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    @staticmethod
+    def _completion(req, name, args):
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+            "created": int(time.time()), "model": req.get("model", "fake"),
+            "choices": [{
+                "index": 0, "finish_reason": "tool_calls",
+                "message": {"role": "assistant", "content": None, "tool_calls": [{
+                    "id": "call_0", "type": "function",
+                    "function": {"name": name, "arguments": args},
+                }]},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(args), "total_tokens": len(args)},
+        }
+
+    def _stream_completion(self, req, name, args):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": req.get("model", "fake")}
+
+        def emit(delta, finish=None):
+            chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish}])
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        emit({"role": "assistant", "content": None, "tool_calls": [{
+            "index": 0, "id": "call_0", "type": "function",
+            "function": {"name": name, "arguments": ""}}]})
+        step = self.config.chunk_chars
+        for i in range(0, len(args), step):
+            time.sleep(self.config.token_delay)
+            emit({"tool_calls": [{"index": 0, "function": {"arguments": args[i:i + step]}}]})
+        emit({}, finish="tool_calls")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def make_server(host="127.0.0.1", port=8765, token_delay=0.02, first_token_delay=0.1,
+                chunk_chars=4, verbose=False):
+    config = argparse.Namespace(token_delay=token_delay, first_token_delay=first_token_delay,
+                                chunk_chars=max(1, chunk_chars), verbose=verbose)
+    handler = type("Handler", (FakeLLMHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--token-delay", type=float, default=0.02, help="청크 사이 지연 (초)")
+    ap.add_argument("--first-token-delay", type=float, default=0.1, help="첫 응답까지 지연 (초)")
+    ap.add_argument("--chunk-chars", type=int, default=4, help="청크당 인자 글자 수")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    a = ap.parse_args()
+    server = make_server(a.host, a.port, a.token_delay, a.first_token_delay, a.chunk_chars, a.verbose)
+    print(f"fake LLM server on http://{a.host}:{a.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
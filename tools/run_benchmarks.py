@@ -0,0 +1,293 @@
+"""컨트롤러 벤치마크 (Webots 없이 tools/bench/controller.py 대역으로 실행).
+
+측정 항목
+  step_loop        컨트롤러별 스텝 루프 오버헤드 (µs/step, 가짜 시뮬레이터 비용 0)
+  queue            ActionExecutor 명령 처리량, PlanCompiler 계획 최적화 처리량
+  plan_latency     명령 수신 → 첫 액추에이터 명령까지 지연 (가짜 LLM 서버, ms)
+  logging          RunLogger.log() 호출 비용과 기록 처리량 (동기 JSONL 쓰기와 비교)
+
+컨트롤러는 실제 스크립트를 자식 프로세스에서 그대로 실행한다. 결과는 JSON 으로
+출력하며 --baseline 으로 이전 결과를 주면 수치 항목마다 변화율(%)을 함께 남긴다.
+
+    python tools/run_benchmarks.py --out bench.json
+    python tools/run_benchmarks.py --only plan_latency --repeat 10 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from queue import Queue
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TOOLS_DIR)
+BENCH_DIR = os.path.join(TOOLS_DIR, "bench")
+LIB_DIR = os.path.join(ROOT, "libraries", "python")
+CONTROLLERS = {
+    "rule_based": os.path.join(ROOT, "controllers", "rule_based", "rule_based.py"),
+    "llm_based": os.path.join(ROOT, "controllers", "llm_based", "llm_based.py"),
+    "vlm_controller": os.path.join(ROOT, "controllers", "vlm_controller", "vlm_controller.py"),
+}
+
+
+def _pct(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def _summary(values, scale=1.0, digits=3):
+    if not values:
+        return {"n": 0}
+    return {"n": len(values), "mean": round(statistics.fmean(values) * scale, digits),
+            "p50": round(_pct(values, 50) * scale, digits), "p95": round(_pct(values, 95) * scale, digits),
+            "min": round(min(values) * scale, digits), "max": round(max(values) * scale, digits)}
+
+
+# ---------------- 자식 프로세스: 컨트롤러 한 번 실행 ----------------
+
+def run_child(script, result_path):
+    sys.path[:0] = [BENCH_DIR, LIB_DIR, os.path.dirname(script)]
+    import controller  # tools/bench/controller.py
+    t0 = time.perf_counter()
+    error = None
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        pass
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - t0
+    tr = controller.trace
+    loop = (tr["last_step"] - tr["first_step"]) if tr["first_step"] is not None else 0.0
+    with open(result_path, "w") as f:
+        json.dump({
+            "wall_s": wall, "loop_s": loop, "step_calls": tr["step_calls"],
+            "first_motion_s": [m - r for r, m in zip(tr["received"], tr["first_motion"])],
+            "received": len(tr["received"]), "replies": len(tr["sent"]), "error": error,
+        }, f)
+
+
+def spawn(name, env, timeout=120.0):
+    """컨트롤러를 자식 프로세스로 실행하고 결과 dict 를 돌려준다"""
+    script = CONTROLLERS[name]
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as tmp:
+        result = os.path.join(tmp, "result.json")
+        child_env = dict(os.environ, PLAN_CACHE_PATH=os.path.join(tmp, "cache.json"),
+                         PLAN_LOG_DIR=os.path.join(tmp, "logs"), WEBOTS_ROBOT_NAME=name)
+        child_env.update({k: str(v) for k, v in env.items()})
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--child", script, result],
+                           cwd=os.path.dirname(script), env=child_env, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+        except subprocess.TimeoutExpired:
+            return {"error": f"timeout after {timeout}s"}
+        if not os.path.exists(result):
+            return {"error": "child produced no result"}
+        with open(result) as f:
+            return json.load(f)
+
+
+# ---------------- 벤치마크 ----------------
+
+def bench_step_loop(args, llm_env):
+    out = {}
+    for name in CONTROLLERS:
+        runs = [spawn(name, dict(llm_env, WEBOTS_FAKE_STEPS=args.steps, WEBOTS_FAKE_STEP_COST=0))
+                for _ in range(args.repeat)]
+        ok = [r for r in runs if not r.get("error") and r["step_calls"] > 1]
+        per_step = [r["loop_s"] / (r["step_calls"] - 1) for r in ok]
+        out[name] = {"steps": args.steps, "us_per_step": _summary(per_step, 1e6, 2),
+                     "startup_ms": _summary([r["wall_s"] - r["loop_s"] for r in ok], 1e3, 1)}
+        errors = sorted({r["error"] for r in runs if r.get("error")})
+        if errors:
+            out[name]["errors"] = errors
+    return out
+
+
+def bench_queue(args):
+    sys.path[:0] = [LIB_DIR, os.path.join(ROOT, "controllers", "vlm_controller")]
+    from action_executor import ActionExecutor, StepAction
+    from plan_optimizer import PlanCompiler
+
+    n = args.queue_items
+    q = Queue()
+    executor = ActionExecutor(q, lambda cmd: StepAction(cmd, name="bench"))
+    for _ in range(n):
+        q.put(0)
+    ticks = 0
+    t0 = time.perf_counter()
+    while not q.empty() or executor.busy:
+        executor.tick()
+        ticks += 1
+    dt = time.perf_counter() - t0
+
+    joints = ["shoulder_pan_joint", "shoulder_lift_joint", "elbow_joint",
+              "wrist_1_joint", "wrist_2_joint", "wrist_3_joint"]
+    plan = []
+    for i in range(20):
+        plan.append({"action": "move_arm", "params": {"targets": {joints[i % 6]: 0.1 * i, "elbow": 1.0}}})
+        plan.append({"action": "control_gripper", "params": {"action": "open" if i % 2 else "close"}})
+        plan.append({"action": "wait", "params": {"seconds": 0.05}})
+    compiler = PlanCompiler(joints, lambda s: s if s in joints else "elbow_joint" if s == "elbow" else s,
+                            initial=[0.0] * 6)
+    rounds = max(1, n // 100)
+    t1 = time.perf_counter()
+    for _ in range(rounds):
+        compiler.sync([0.0] * 6)
+        compiler.optimize(plan)
+    dc = time.perf_counter() - t1
+    return {
+        "executor": {"commands": n, "ticks": ticks, "commands_per_s": round(n / dt),
+                     "us_per_tick": round(dt / ticks * 1e6, 3)},
+        "compiler": {"plan_steps": len(plan), "plans_per_s": round(rounds / dc, 1),
+                     "us_per_plan": round(dc / rounds * 1e6, 1)},
+    }
+
+
+def bench_plan_latency(args, llm_env):
+    cases = {
+        "vlm_controller": ("vlm_controller", "open the gripper and go down slowly"),
+        "vlm_controller_preset": ("vlm_controller", "home"),
+        "llm_based": ("llm_based", "앞으로 가다가 왼쪽으로 돌아"),
+    }
+    out = {}
+    for case, (name, utterance) in cases.items():
+        lat, errors = [], set()
+        for i in range(args.repeat):
+            # 반복마다 문구를 바꿔 계획 캐시를 피한다 (프리셋은 그대로)
+            text = utterance if case.endswith("preset") else f"{utterance} #{i}"
+            r = spawn(name, dict(llm_env, WEBOTS_FAKE_STEPS=args.latency_steps,
+                                 WEBOTS_FAKE_STEP_COST=args.step_cost, WEBOTS_FAKE_STOP_AFTER=5,
+                                 WEBOTS_FAKE_MESSAGES=json.dumps([[10, text]], ensure_ascii=False)))
+            if r.get("error"):
+                errors.add(r["error"])
+            lat.extend(r.get("first_motion_s", []))
+        out[case] = {"first_motion_ms": _summary(lat, 1e3, 2), "missed": args.repeat - len(lat)}
+        if errors:
+            out[case]["errors"] = sorted(errors)
+    return out
+
+
+def bench_logging(args):
+    sys.path.insert(0, LIB_DIR)
+    from run_logger import RunLogger
+
+    n = args.log_events
+    event = {"input": "open the gripper and go down", "plan": [{"action": "move_arm", "params": {
+        "targets": {"shoulder_lift_joint": -0.6, "elbow_joint": 1.0}}}] * 4, "latency": 0.123}
+    with tempfile.TemporaryDirectory(prefix="bench_log_") as tmp:
+        logger = RunLogger(os.path.join(tmp, "async"), capacity=n + 1)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            logger.log("plan", event)
+        call = time.perf_counter() - t0
+        logger.close()
+        total = time.perf_counter() - t0
+
+        # 비교 기준: 이벤트마다 파일을 열어 동기로 한 줄씩 쓰는 방식
+        path = os.path.join(tmp, "sync.jsonl")
+        t1 = time.perf_counter()
+        for _ in range(n):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": time.time(), "type": "plan", "data": event}, ensure_ascii=False) + "\n")
+        sync = time.perf_counter() - t1
+    return {
+        "events": n,
+        "run_logger": {"us_per_call": round(call / n * 1e6, 3), "events_per_s": round(n / total)},
+        "sync_jsonl": {"us_per_call": round(sync / n * 1e6, 3), "events_per_s": round(n / sync)},
+    }
+
+
+# ---------------- 실행 ----------------
+
+def compare(current, baseline):
+    """수치 항목마다 (현재 - 기준) / 기준 * 100"""
+    if isinstance(current, dict) and isinstance(baseline, dict):
+        out = {k: compare(v, baseline[k]) for k, v in current.items() if k in baseline}
+        return {k: v for k, v in out.items() if v not in (None, {})}
+    if isinstance(current, (int, float)) and isinstance(baseline, (int, float)) \
+            and not isinstance(current, bool) and baseline:
+        return round((current - baseline) / abs(baseline) * 100.0, 1)
+    return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3])
+        return
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--only", default="step_loop,queue,plan_latency,logging", help="쉼표로 구분한 벤치마크 목록")
+    ap.add_argument("--repeat", type=int, default=3, help="컨트롤러 실행 반복 횟수")
+    ap.add_argument("--steps", type=int, default=2000, help="step_loop 스텝 수")
+    ap.add_argument("--latency-steps", type=int, default=3000, help="plan_latency 최대 스텝 수")
+    ap.add_argument("--step-cost", type=float, default=0.001, help="plan_latency 의 가짜 스텝 비용 (초)")
+    ap.add_argument("--queue-items", type=int, default=20000)
+    ap.add_argument("--log-events", type=int, default=20000)
+    ap.add_argument("--llm-first-token", type=float, default=0.05, help="가짜 LLM 첫 응답 지연 (초)")
+    ap.add_argument("--llm-token-delay", type=float, default=0.002, help="가짜 LLM 청크 지연 (초)")
+    ap.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    ap.add_argument("--out", help="결과를 저장할 파일 (없으면 stdout, 있으면 stderr 에 한 줄 요약만)")
+    args = ap.parse_args()
+
+    sys.path.insert(0, TOOLS_DIR)
+    from fake_llm_server import make_server
+    server = make_server(port=0, token_delay=args.llm_token_delay, first_token_delay=args.llm_first_token)
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    llm_env = {"LLM_BACKEND": "ollama", "OLLAMA_HOST": f"http://127.0.0.1:{server.server_address[1]}",
+               "PLANNING_SERVICE": "", "FAST_FORWARD": "0"}
+
+    selected = [s.strip() for s in args.only.split(",") if s.strip()]
+    runners = {
+        "step_loop": lambda: bench_step_loop(args, llm_env),
+        "queue": lambda: bench_queue(args),
+        "plan_latency": lambda: bench_plan_latency(args, llm_env),
+        "logging": lambda: bench_logging(args),
+    }
+    results = {}
+    for name in selected:
+        if name not in runners:
+            ap.error(f"unknown benchmark: {name}")
+        t0 = time.perf_counter()
+        results[name] = runners[name]()
+        print(f"{name}: {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    server.shutdown()
+
+    report = {
+        "meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")}},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        report["meta"]["baseline_commit"] = base.get("meta", {}).get("commit")
+        report["change_pct"] = compare(results, base.get("results", {}))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        # 파일로 저장하면 전체 보고서는 다시 찍지 않고 한 줄 요약만
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"wrote {args.out}: {', '.join(results)} @ {report['meta']['commit']}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()